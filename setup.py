@@ -14,7 +14,8 @@ setup(
     license = "Boost Software License - Version 1.0 - August 17th, 2003",
     keywords = "django rest data server client",
     packages = [
-        'slumber', 'slumber.connector', 'slumber.operations', 'slumber.server',
+        'slumber', 'slumber.changes', 'slumber.connector',
+        'slumber.operations', 'slumber.server',
         'slumber_test'],
     long_description = read('README.markdown'),
     install_requires = ['simplejson', 'httplib2'],
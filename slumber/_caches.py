@@ -1,8 +1,15 @@
 """
     Some caches used in the implementation of the Slumber client or server.
 """
+from collections import deque
 
 
+# Stores the server applications for given application paths
+APP_PATH_TO_SLUMBER_APP = {}
+# Stores the applications that the server exposes keyed by their paths.
+# It's filled with all of them at once and `loaded` is set when it has been
+EXPOSED_APPS = type('cache', (dict,), {})()
+EXPOSED_APPS.loaded = False
 # Stores the server model for a given Django model in the server
 DJANGO_MODEL_TO_SLUMBER_MODEL = {}
 # Stores the slumber models for given model URLs
@@ -13,3 +20,21 @@ MODEL_URL_TO_SLUMBER_MODEL = {}
 CLIENT_INSTANCE_CACHE = type('cache', (dict,), {})()
 # Leave the cache off by default
 CLIENT_INSTANCE_CACHE.enabled = False
+# Stores the instance URL, display and fields found by unique key lookups
+CLIENT_LOOKUP_CACHE = type('cache', (dict,), {})()
+# The keys in the order they were added so the oldest can be evicted
+CLIENT_LOOKUP_CACHE.order = deque()
+# Stores the instance proxy type for each client model connector
+CLIENT_INSTANCE_TYPES = {}
+# Stores the replica that holds each replicated model's instances keyed by
+# the model URL
+CLIENT_REPLICAS = {}
+# Stores the server pools for services with several servers keyed by the
+# primary server's directory URL
+CLIENT_BACKENDS = {}
+# Stores the circuit breaker for each remote host
+CLIENT_CIRCUIT_BREAKERS = {}
+# Stores the expiry time and permission data for each user URL
+CLIENT_PERMISSION_CACHE = type('cache', (dict,), {})()
+# The keys in the order they were added so the oldest can be evicted
+CLIENT_PERMISSION_CACHE.order = deque()
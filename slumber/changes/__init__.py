@@ -0,0 +1,5 @@
+"""
+    Records the changes made to the models that Slumber exposes so that
+    clients can find out what they need to refresh. Add `slumber.changes`
+    to `INSTALLED_APPS` to turn this on.
+"""
@@ -0,0 +1,104 @@
+"""
+    The change log and the signal handlers that fill it.
+"""
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import models
+from django.db.models import signals
+try:
+    from django.db.models import Count, Max
+except ImportError:
+    # Django 1.0 has no aggregation support
+    Count = Max = None
+
+from slumber.server import get_slumber_model
+from slumber.server.signals import bulk_updated
+
+
+CREATED, UPDATED, DELETED = 'c', 'u', 'd'
+# Marks the newest change that was removed because it was too old. Clients
+# that have not seen changes up to this one have to start again.
+EXPIRED = 'x'
+
+
+class Change(models.Model):
+    """A change to an instance of a model that Slumber exposes. The primary
+    key is the sequence number.
+    """
+    model = models.CharField(max_length=255)
+    instance = models.CharField(max_length=255)
+    kind = models.CharField(max_length=1, choices=[(CREATED, 'Created'),
+        (UPDATED, 'Updated'), (DELETED, 'Deleted'), (EXPIRED, 'Expired')])
+    time = models.DateTimeField(default=datetime.now, db_index=True)
+
+    class Meta:
+        ordering = ['id']
+
+
+def compact():
+    """Remove the changes that are older than the retention period and all
+    but the newest change for each instance.
+    """
+    retention = getattr(settings, 'SLUMBER_CHANGES_RETENTION', 7 * 24 * 3600)
+    expired = Change.objects.filter(
+        time__lt=datetime.now() - timedelta(seconds=retention)).exclude(
+        kind=EXPIRED).order_by('-id')
+    if expired.count():
+        newest = expired[0]
+        Change.objects.filter(id__lte=newest.id).exclude(
+            id=newest.id).delete()
+        Change.objects.filter(id=newest.id).update(kind=EXPIRED)
+    if Max:
+        # The default ordering has to be removed or it breaks the grouping
+        duplicates = Change.objects.exclude(kind=EXPIRED).order_by().values(
+            'model', 'instance').annotate(last=Max('id'), changes=Count('id')
+            ).filter(changes__gt=1)
+    else:
+        last = {}
+        for change in Change.objects.exclude(kind=EXPIRED).values(
+                'model', 'instance', 'id'):
+            key = (change['model'], change['instance'])
+            last[key] = max(last.get(key, 0), change['id'])
+        duplicates = [dict(model=m, instance=i, last=l)
+            for (m, i), l in last.items()]
+    for duplicate in duplicates:
+        Change.objects.filter(model=duplicate['model'],
+            instance=duplicate['instance'], id__lt=duplicate['last']).exclude(
+            kind=EXPIRED).delete()
+
+
+def _record(sender, kind, pks):
+    """Record the changes if the sender is exposed through Slumber.
+    """
+    model = get_slumber_model(sender)
+    if model and pks:
+        for pk in pks:
+            change = Change(model=model.path, instance=unicode(pk), kind=kind)
+            change.save()
+        if change.id % getattr(settings,
+                'SLUMBER_CHANGES_COMPACT_EVERY', 1000) < len(pks):
+            compact()
+
+
+def _saved(sender, instance, created=False, **_kwargs):
+    """Record that an instance was created or updated.
+    """
+    _record(sender, CREATED if created else UPDATED, [instance.pk])
+# This receiver records set based updates itself
+_saved.handles_bulk_updates = True
+signals.post_save.connect(_saved, dispatch_uid='slumber.changes')
+
+
+def _bulk_updated(sender, pks, **_kwargs):
+    """Record the instances changed by a bulk update.
+    """
+    _record(sender, UPDATED, pks)
+bulk_updated.connect(_bulk_updated, dispatch_uid='slumber.changes')
+
+
+def _deleted(sender, instance, **_kwargs):
+    """Record that an instance was deleted.
+    """
+    _record(sender, DELETED, [instance.pk])
+signals.post_delete.connect(_deleted, dispatch_uid='slumber.changes')
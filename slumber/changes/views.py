@@ -0,0 +1,45 @@
+"""
+    The change feed.
+"""
+from django.conf import settings
+from django.http import Http404
+
+from slumber.server import get_slumber_root
+from slumber.server.http import view_handler
+
+
+@view_handler
+def get_changes(request, response):
+    """Return the changes after the sequence number given as `since`, in
+    order. If `reset` is true then some changes the client hasn't seen have
+    been removed and it must throw away everything it knows. A `since` of
+    `latest` returns no changes, only the current position in the feed.
+    """
+    if 'slumber.changes' not in settings.INSTALLED_APPS:
+        raise Http404
+    # The models can only be imported if the application is installed
+    from slumber.changes.models import Change, EXPIRED
+    if request.GET.get('since', None) == 'latest':
+        latest = Change.objects.order_by('-id')[:1]
+        response.update(changes=[], reset=False, more=False,
+            last=latest[0].id if latest else 0)
+        return
+    try:
+        since = int(request.GET.get('since', 0))
+        limit = min(int(request.GET.get('limit', 100)), 1000)
+    except ValueError:
+        response['_meta'].update(status=400, message="Invalid since or limit")
+        return
+    root = get_slumber_root()
+    expired = Change.objects.filter(kind=EXPIRED).order_by('-id')[:1]
+    response['reset'] = bool(expired) and since < expired[0].id
+    changes = list(Change.objects.filter(id__gt=since).exclude(
+        kind=EXPIRED).order_by('id')[:limit + 1])
+    response['changes'] = [dict(seq=c.id, kind=c.kind,
+            model=root + c.model,
+            identity=root + c.model + 'data/%s/' % c.instance)
+        for c in changes[:limit]]
+    response['last'] = response['changes'][-1]['seq'] \
+        if response['changes'] else max(since, expired[0].id
+            if expired else 0)
+    response['more'] = len(changes) > limit
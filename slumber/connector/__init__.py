@@ -6,11 +6,16 @@ from django.conf import settings
 from urllib import urlencode
 from urlparse import urljoin
 
-from slumber._caches import CLIENT_INSTANCE_CACHE, \
+from slumber._caches import CLIENT_INSTANCE_CACHE, CLIENT_LOOKUP_CACHE, \
     MODEL_URL_TO_SLUMBER_MODEL
+from slumber.connector.backends import add_pool
+from slumber.connector.batch import Batch
+from slumber.connector.changes import ChangeFeed
 from slumber.connector.dictobject import DictObject
 from slumber.connector.json import from_json_data
 from slumber.connector.model import ModelConnector
+from slumber.connector.replica import Replica
+from slumber.connector.unitofwork import UnitOfWork
 from slumber.connector.ua import get
 
 
@@ -21,7 +26,34 @@ class Client(object):
         if not directory:
             directory = getattr(settings, 'SLUMBER_DIRECTORY',
                 'http://localhost:8000/slumber/')
+        if not isinstance(directory, basestring):
+            # A list of equivalent servers with the primary first
+            directory = add_pool(directory)
         self._directory = directory
+        self._changes = ChangeFeed(directory)
+        self._replica = None
+
+    def batch(self, transaction=False):
+        """Return a batch that can be used to send many requests to the
+        directory's server at once.
+        """
+        return Batch(self._directory, transaction)
+
+    def unit_of_work(self, transaction=True):
+        """Return a unit of work that saves the changes made to remote
+        instances while it is active. Use it as a context manager.
+        """
+        return UnitOfWork(self._directory, transaction)
+
+    def replicate(self, *models):
+        """Keep a local copy of all of the instances of the models (which
+        must come from this client's directory) and serve reads of them
+        from it. Returns the replica.
+        """
+        if not self._replica:
+            self._replica = Replica(self._directory)
+        self._replica.add(*models)
+        return self._replica
 
     @classmethod
     def _flush_client_instance_cache(cls):
@@ -29,6 +61,17 @@ class Client(object):
         """
         CLIENT_INSTANCE_CACHE.clear()
         CLIENT_INSTANCE_CACHE.enabled = True
+        CLIENT_LOOKUP_CACHE.clear()
+        CLIENT_LOOKUP_CACHE.order.clear()
+
+    def _poll_changes(self):
+        """Bring the (global) instance cache up to date with the changes on
+        the server and make sure it is turned on.
+        """
+        self._changes.poll()
+        if self._replica:
+            self._replica.refresh()
+        CLIENT_INSTANCE_CACHE.enabled = True
 
     def __getattr__(self, attr_name):
         """Fetch the application list from the Slumber directory on request.
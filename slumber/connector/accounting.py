@@ -0,0 +1,119 @@
+"""
+    Accounts for the Slumber requests that the client makes while handling
+    a Django request and notices when the same kind of request is made over
+    and over (an N+1 pattern).
+"""
+from django.conf import settings
+
+from logging import getLogger
+from re import compile as regex
+from threading import local
+
+
+# Holds the account that is active in each thread
+_ACTIVE = local()
+# Matches the operation name and primary key in instance operation URLs
+_INSTANCE = regex(r'/(data|update|delete|has-permission|permissions)/[^/]+/')
+LOGGER = getLogger('slumber.accounting')
+
+
+class RepeatedRequests(AssertionError):
+    """Too many requests with the same pattern were made for one Django
+    request.
+    """
+
+
+def current():
+    """Return the account that is active in this thread, or None.
+    """
+    return getattr(_ACTIVE, 'account', None)
+
+
+def pattern(url):
+    """Return the pattern of a request URL. Requests for different
+    instances of the same model, or with different query strings, have the
+    same pattern.
+    """
+    return _INSTANCE.sub(r'/\1/{pk}/', url.split('?')[0], 1)
+
+
+class Account(object):
+    """The number of requests, the bytes received, the time taken and the
+    cache hits and misses for the Slumber client while it is active.
+
+        with Account() as account:
+            ...
+        print account.requests
+
+    If more than `SLUMBER_REPEATED_REQUESTS` (default 10) requests have
+    the same pattern then a warning is logged. When
+    `SLUMBER_REPEATED_REQUESTS_FAIL` is True then `RepeatedRequests` is
+    raised instead, which makes the problem fail tests.
+    """
+    def __init__(self):
+        self.requests, self.bytes, self.seconds = 0, 0, 0.0
+        self.hits, self.misses = 0, 0
+        self.patterns = {}
+        self._previous = None
+
+    def request(self, url, seconds, size):
+        """Count a request made to a Slumber server.
+        """
+        self.requests += 1
+        self.seconds += seconds
+        self.bytes += size
+        key = pattern(url)
+        count = self.patterns[key] = self.patterns.get(key, 0) + 1
+        if count == getattr(settings, 'SLUMBER_REPEATED_REQUESTS', 10) + 1:
+            if getattr(settings, 'SLUMBER_REPEATED_REQUESTS_FAIL', False):
+                raise RepeatedRequests(key, count)
+            LOGGER.warning("More than %s Slumber requests for %s",
+                count - 1, key)
+
+    def repeated(self):
+        """Return the patterns that have been requested more than
+        `SLUMBER_REPEATED_REQUESTS` times with their counts.
+        """
+        limit = getattr(settings, 'SLUMBER_REPEATED_REQUESTS', 10)
+        return dict([(k, c) for k, c in self.patterns.items() if c > limit])
+
+    def summary(self):
+        """Return a one line description of the account.
+        """
+        return 'requests=%s bytes=%s time=%.3f hits=%s misses=%s' % (
+            self.requests, self.bytes, self.seconds, self.hits, self.misses)
+
+    def __enter__(self):
+        self._previous = current()
+        _ACTIVE.account = self
+        return self
+
+    def __exit__(self, _type, _value, _traceback):
+        _ACTIVE.account = self._previous
+
+
+def activate(account):
+    """Make the account active in this thread. This is used to carry the
+    account across to the threads that make hedged requests.
+    """
+    _ACTIVE.account = account
+
+
+def request(url, seconds, size):
+    """Count a request against the active account, if there is one.
+    """
+    account = current()
+    if account:
+        account.request(url, seconds, size)
+
+
+def cache(hit):
+    """Count a client cache hit or miss against the active account, if
+    there is one.
+    """
+    account = current()
+    if account:
+        if hit:
+            account.hits += 1
+        else:
+            account.misses += 1
@@ -0,0 +1,112 @@
+"""
+    Spreads the reads for a Slumber service over several equivalent
+    servers and stops using servers that fail.
+"""
+from django.conf import settings
+
+from threading import Lock
+from time import time
+
+from slumber._caches import CLIENT_BACKENDS
+
+
+# The weight given to each new latency measurement in the moving average
+_LATENCY_WEIGHT = 0.3
+
+
+class Backend(object):
+    """One of the servers for a service.
+    """
+    def __init__(self, url):
+        self.url = url
+        self.outstanding = 0
+        # Moving average of the request time in seconds
+        self.latency = 0.0
+        self.ejected_until = 0
+        self.requests, self.failures = 0, 0
+
+
+class Pool(object):
+    """The servers for a service. The first URL is the primary, which
+    gets all of the writes and the reads when no replica is available.
+    The rest are read replicas which must serve the same paths. All of the
+    client's URLs use the primary's address and are moved onto whichever
+    server is chosen.
+    """
+    def __init__(self, urls):
+        self.primary = Backend(urls[0])
+        self.replicas = [Backend(url) for url in urls[1:]]
+        self._lock = Lock()
+
+    def candidates(self):
+        """Return the servers to try for a read in order of preference. The
+        replicas with the fewest requests in progress come first, using
+        their latency to break ties. Replicas that have been ejected are
+        left out until their ejection runs out.
+        """
+        now = time()
+        self._lock.acquire()
+        try:
+            live = [b for b in self.replicas if b.ejected_until <= now]
+            live.sort(key=lambda b: (b.outstanding, b.latency))
+            return live + [self.primary]
+        finally:
+            self._lock.release()
+
+    def start(self, backend):
+        """Record the start of a request to the server. Returns the start
+        time to pass to `finish`.
+        """
+        self._lock.acquire()
+        try:
+            backend.outstanding += 1
+        finally:
+            self._lock.release()
+        return time()
+
+    def cancel(self, backend):
+        """Record that a request which was started wasn't made after all.
+        """
+        self._lock.acquire()
+        try:
+            backend.outstanding -= 1
+        finally:
+            self._lock.release()
+
+    def finish(self, backend, started, succeeded):
+        """Record the end of a request. A server whose request failed is
+        ejected for `SLUMBER_BACKEND_EJECT_TIME` seconds, after which it's
+        tried again.
+        """
+        now = time()
+        self._lock.acquire()
+        try:
+            backend.outstanding -= 1
+            if succeeded:
+                backend.requests += 1
+                backend.latency += \
+                    (now - started - backend.latency) * _LATENCY_WEIGHT
+            else:
+                backend.failures += 1
+                backend.ejected_until = now + getattr(settings,
+                    'SLUMBER_BACKEND_EJECT_TIME', 30)
+        finally:
+            self._lock.release()
+
+
+def add_pool(urls):
+    """Register the servers for a service, the primary first. Returns the
+    primary's URL, which the client uses for everything.
+    """
+    if not CLIENT_BACKENDS.has_key(urls[0]):
+        CLIENT_BACKENDS[urls[0]] = Pool(urls)
+    return urls[0]
+
+
+def find_pool(url):
+    """Return the pool that serves a URL, or None.
+    """
+    for primary, pool in CLIENT_BACKENDS.items():
+        if url.startswith(primary):
+            return pool
+    return None
@@ -0,0 +1,119 @@
+"""
+    Allows the client to send many Slumber requests to a server in a single
+    HTTP request.
+"""
+from simplejson import dumps
+from urlparse import urljoin, urlparse
+
+from slumber.connector.ua import post
+
+
+class BatchResult(object):
+    """The result of one of the requests in a batch. The JSON is only
+    available once the batch has been sent.
+    """
+    def __init__(self, url, loaded=None):
+        self.url = url
+        self._json = None
+        # Called with the JSON when the batch is sent to work out `value`
+        self._loaded, self._value = loaded, None
+
+    @property
+    def json(self):
+        """The JSON the server returned for this request.
+        """
+        assert self._json is not None, \
+            "The batch containing %s has not been sent yet" % self.url
+        assert self._json['_meta']['status'] == 200, (self.url, self._json)
+        return self._json
+
+    @property
+    def value(self):
+        """What a `get_instance` or `fetch` request found, worked out when
+        the batch was sent.
+        """
+        assert self._loaded, "%s doesn't have a value" % self.url
+        # Reading the JSON checks that the request was sent and worked
+        # pylint: disable=W0104
+        self.json
+        return self._value
+
+
+class Batch(object):
+    """Queues up requests to a Slumber server and then sends them all at
+    once. It can be used as a context manager, in which case the requests
+    are sent when the block finishes without an exception.
+
+        with client.batch() as batch:
+            pizza = batch.get(pizza_url)
+        print pizza.json['display']
+    """
+    def __init__(self, directory, transaction=False):
+        self._url = urljoin(directory, '_batch/')
+        self._transaction = transaction
+        self._requests, self._results = [], []
+
+    def _queue(self, method, url, params, body, loaded=None):
+        """Add a request to the queue and return the result placeholder.
+        """
+        parts = urlparse(url)
+        item = dict(method=method, path=parts.path + (
+            '?' + parts.query if parts.query else ''), params=params)
+        if body is not None:
+            item['body'] = body
+        self._requests.append(item)
+        self._results.append(BatchResult(url, loaded))
+        return self._results[-1]
+
+    def get(self, url, **params):
+        """Queue a GET request.
+        """
+        return self._queue('GET', url, params, None)
+
+    def post(self, url, body=None, **params):
+        """Queue a POST request. The parameters are sent as form fields and
+        any body as JSON.
+        """
+        return self._queue('POST', url, params, body)
+
+    def get_instance(self, model, **kwargs):
+        """Queue the model connector's `get` for the instance that matches
+        the lookups. When the batch is sent the instance goes into the
+        client's caches and becomes the result's `value`.
+        """
+        # We're inside Slumber so the private access is ok.
+        # pylint: disable=W0212
+        return model._batch_get(self, kwargs)
+
+    def fetch(self, instance):
+        """Queue loading the data for an instance so that reading its
+        fields later doesn't need a request of its own. The result's
+        `value` is the instance.
+        """
+        # We're inside Slumber so the private access is ok.
+        # pylint: disable=W0212
+        return instance._batch_fetch(self)
+
+    def send(self):
+        """Send all of the queued requests to the server.
+        """
+        if not self._requests:
+            return
+        requests, results = self._requests, self._results
+        self._requests, self._results = [], []
+        _, json = post(self._url, dumps(dict(requests=requests,
+                transaction=self._transaction), default=unicode),
+            'application/json')
+        for result, response in zip(results, json['responses']):
+            # We're inside Slumber so the private access is ok.
+            # pylint: disable=W0212
+            result._json = response
+            if result._loaded and response['_meta']['status'] == 200:
+                result._value = result._loaded(response)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, _value, _traceback):
+        if not exception_type:
+            self.send()
@@ -0,0 +1,53 @@
+"""
+    Uses a Slumber server's change feed to keep the client caches fresh.
+"""
+from urlparse import urljoin
+
+from slumber._caches import CLIENT_INSTANCE_CACHE, CLIENT_LOOKUP_CACHE
+from slumber.connector.ua import get
+
+
+def forget(url):
+    """Remove an instance from the client caches.
+    """
+    if CLIENT_INSTANCE_CACHE.has_key(url):
+        del CLIENT_INSTANCE_CACHE[url]
+    for key, found in CLIENT_LOOKUP_CACHE.items():
+        if found[0] == url:
+            del CLIENT_LOOKUP_CACHE[key]
+            CLIENT_LOOKUP_CACHE.order.remove(key)
+
+
+class ChangeFeed(object):
+    """Follows the change feed of a Slumber server.
+    """
+    def __init__(self, directory):
+        self._url = urljoin(directory, '_changes/')
+        self.since = None
+        # True if the last poll emptied the caches
+        self.reset = False
+
+    def poll(self):
+        """Fetch the changes since the last poll and remove the changed
+        instances from the caches. The first poll, which only finds the
+        current position in the feed, or one where the server has thrown
+        away changes we haven't seen, empties the caches. Returns the list
+        of changes.
+        """
+        changes, self.reset = [], False
+        while True:
+            _, json = get(self._url + '?since=%s' % (
+                'latest' if self.since is None else self.since))
+            if self.since is None or json['reset']:
+                self.reset = True
+                CLIENT_INSTANCE_CACHE.clear()
+                CLIENT_LOOKUP_CACHE.clear()
+                CLIENT_LOOKUP_CACHE.order.clear()
+            for change in json['changes']:
+                change['model'] = urljoin(self._url, change['model'])
+                change['identity'] = urljoin(self._url, change['identity'])
+                forget(change['identity'])
+            changes += json['changes']
+            self.since = json['last']
+            if not json['more']:
+                return changes
@@ -0,0 +1,150 @@
+"""
+    Hedged GET requests. If the answer to a request hasn't arrived by the
+    time that most requests have finished then a second copy is sent, and
+    whichever answers first is used.
+"""
+from django.conf import settings
+
+from collections import deque
+from Queue import Queue
+from threading import Lock, Thread, Timer
+from time import time
+
+from slumber.connector import accounting
+from slumber.connector.retry import RetryBudget
+
+
+# Statistics about the hedging
+STATS = dict(requests=0, hedged=0, wins=0)
+# Protects STATS
+_STATS_LOCK = Lock()
+# Limits the hedges to a fraction of the requests
+BUDGET = RetryBudget('SLUMBER_HEDGE_BUDGET', 0.05)
+
+
+def _count(name):
+    """Add one to a statistic.
+    """
+    _STATS_LOCK.acquire()
+    try:
+        STATS[name] += 1
+    finally:
+        _STATS_LOCK.release()
+
+
+class Latencies(object):
+    """The times taken by the most recent requests, used to work out how
+    long to wait before hedging.
+    """
+    def __init__(self, size=1000, minimum=20):
+        self.samples = deque(maxlen=size)
+        self.minimum = minimum
+        # Sorting is only worth doing every so often
+        self._delay, self._added = None, 0
+        self._lock = Lock()
+
+    def add(self, seconds):
+        """Record how long a successful request took.
+        """
+        self._lock.acquire()
+        try:
+            self.samples.append(seconds)
+            self._added += 1
+        finally:
+            self._lock.release()
+
+    def delay(self):
+        """Return how long to wait before hedging, which is the
+        `SLUMBER_HEDGE_PERCENTILE` (default 95) of the request times but at
+        least `SLUMBER_HEDGE_MIN_DELAY` seconds. Returns None when there
+        aren't enough request times yet.
+        """
+        self._lock.acquire()
+        try:
+            if len(self.samples) < self.minimum:
+                return None
+            if self._delay is None or self._added >= 50:
+                ordered = sorted(self.samples)
+                percentile = getattr(settings,
+                    'SLUMBER_HEDGE_PERCENTILE', 95)
+                index = min(len(ordered) - 1,
+                    int(len(ordered) * percentile / 100.0))
+                self._delay = max(ordered[index],
+                    getattr(settings, 'SLUMBER_HEDGE_MIN_DELAY', 0.005))
+                self._added = 0
+            return self._delay
+        finally:
+            self._lock.release()
+
+LATENCIES = Latencies()
+
+
+def _run(queue, attempt, url, hedge, account):
+    """Make one of the requests and put the outcome on the queue. The
+    request is counted against the account of the thread that wanted it.
+    """
+    accounting.activate(account)
+    start = time()
+    try:
+        result = attempt(url)
+    # The error is passed back to the thread that is waiting
+    # pylint: disable=W0703
+    except Exception, error:
+        queue.put((hedge, False, error))
+    else:
+        LATENCIES.add(time() - start)
+        queue.put((hedge, True, result))
+
+
+def hedged(attempt, url):
+    """Call `attempt(url)` and, if it is slow, call it again. The first
+    successful result is returned. If both fail then the last error is
+    raised.
+    """
+    _count('requests')
+    BUDGET.deposit()
+    queue, account = Queue(), accounting.current()
+    # The attempts that haven't answered and whether we've stopped waiting.
+    # The lock makes sure that a hedge either starts before we decide
+    # whether to wait for it or not at all
+    state, lock = dict(outstanding=1, finished=False), Lock()
+    first = Thread(target=_run, args=(queue, attempt, url, False, account))
+    first.setDaemon(True)
+    first.start()
+    def hedge():
+        """Send the second request if it's still wanted and allowed.
+        """
+        lock.acquire()
+        try:
+            if state['finished'] or not BUDGET.withdraw():
+                return
+            state['outstanding'] += 1
+        finally:
+            lock.release()
+        _count('hedged')
+        _run(queue, attempt, url, True, account)
+    delay = LATENCIES.delay()
+    timer = None
+    if delay is not None:
+        timer = Timer(delay, hedge)
+        timer.setDaemon(True)
+        timer.start()
+    try:
+        while True:
+            is_hedge, succeeded, result = queue.get()
+            lock.acquire()
+            try:
+                state['outstanding'] -= 1
+                finished = state['finished'] = \
+                    succeeded or not state['outstanding']
+            finally:
+                lock.release()
+            if succeeded:
+                if is_hedge:
+                    _count('wins')
+                return result
+            elif finished:
+                raise result
+    finally:
+        if timer:
+            timer.cancel()
@@ -4,7 +4,8 @@
 from urlparse import urljoin
 
 from slumber._caches import CLIENT_INSTANCE_CACHE, \
-    MODEL_URL_TO_SLUMBER_MODEL
+    CLIENT_INSTANCE_TYPES, CLIENT_REPLICAS, MODEL_URL_TO_SLUMBER_MODEL
+from slumber.connector import accounting, unitofwork
 from slumber.connector.dictobject import DictObject
 from slumber.connector.ua import get
 from slumber.connector.json import from_json_data
@@ -13,8 +14,12 @@ from slumber.connector.json import from_json_data
 def get_instance(model, instance_url, display_name, **fields):
     """Return an instance of the specified model etc.
     """
-    instance_type = type(model.module + '.' + model.name,
-        (_InstanceProxy,), {})
+    instance_type = CLIENT_INSTANCE_TYPES.get(model, None)
+    if not instance_type:
+        # The empty __slots__ stops the sub-class from adding a __dict__
+        instance_type = type(model.module + '.' + model.name,
+            (_InstanceProxy,), {'__slots__': ()})
+        CLIENT_INSTANCE_TYPES[model] = instance_type
     return instance_type(instance_url, display_name, **fields)
 
 
@@ -23,10 +28,14 @@ class _InstanceProxy(object):
     by the application code and the underlying object. This allows us to
     better handle the cache.
     """
+    # There can be a great many proxies so don't give them a __dict__
+    __slots__ = ('_url', '_display', '_fields', '_instance')
+
     def __init__(self, url, display, **fields):
         self._url = url
         self._display = display
-        self._fields = fields
+        # Most proxies come from data arrays and have no fields
+        self._fields = fields or None
         self._instance = None
 
     def _fetch_instance(self):
@@ -35,12 +44,28 @@ class _InstanceProxy(object):
         if not self._instance:
             # Try to find it in the cache
             self._instance = CLIENT_INSTANCE_CACHE.get(self._url, None)
+            accounting.cache(self._instance is not None)
         if not self._instance:
             # We now have a cache miss so construct a new connector
             self._instance = _InstanceConnector(
-                self._url, **self._fields)
+                self._url, **(self._fields or {}))
             if CLIENT_INSTANCE_CACHE.enabled:
                 CLIENT_INSTANCE_CACHE[self._url] = self._instance
+        # The connector now holds the field values
+        self._fields = None
+
+    def _batch_fetch(self, batch):
+        """Queue loading the instance data in the batch. See `Batch.fetch`.
+        """
+        # We're inside Slumber so the private access is ok.
+        # pylint: disable=W0212
+        def loaded(json):
+            """Put the data into the instance connector.
+            """
+            self._fetch_instance()
+            self._instance._load(json)
+            return self
+        return batch._queue('GET', self._url, {}, None, loaded)
 
     def __getattr__(self, name):
         """Fetch the underlying instance from the cache if necessary and
@@ -50,11 +75,15 @@ class _InstanceProxy(object):
         return getattr(self._instance, name)
 
     def __setattr__(self, name, value):
-        """Write the attribute through to the underlying instance.
+        """Write the attribute through to the underlying instance. If there
+        is a unit of work active then it records the change.
         """
         if name.startswith('_'):
             return super(_InstanceProxy, self).__setattr__(name, value)
         self._fetch_instance()
+        work = unitofwork.current()
+        if work:
+            work.record(self, name, value)
         return setattr(self._instance, name, value)
 
     def __unicode__(self):
@@ -93,12 +122,35 @@ class _InstanceConnector(DictObject):
     """
     def __init__(self, url, **kwargs):
         self._url = url
+        # Set to the data array URLs once the instance data has been loaded
+        self._data_arrays = None
         super(_InstanceConnector, self).__init__(**kwargs)
 
-    def __getattr__(self, name):
-        _, json = get(self._url)
+    def _load(self, json):
+        """Set the fields and data array URLs from the instance data.
+        """
         for k, v in json['fields'].items():
             setattr(self, k, from_json_data(self._url, v))
-        if name in json['fields'].keys():
-            return getattr(self, name)
-        return _return_data_array(self._url, json['data_arrays'], self, name)
+        self._data_arrays = json['data_arrays']
+
+    def __getattr__(self, name):
+        # Private and special names are never fields so don't fetch for them
+        if name.startswith('_'):
+            raise AttributeError(name)
+        replica = CLIENT_REPLICAS.get(
+            self._url[:self._url.rfind('/data/') + 1], None)
+        if self._data_arrays is None:
+            json = replica.instance_data(self._url) if replica else None
+            if not json:
+                _, json = get(self._url)
+            self._load(json)
+            if name in json['fields'].keys():
+                return getattr(self, name)
+        # All of the fields are now attributes so anything else must be a
+        # data array that hasn't been fetched yet
+        if replica and name in self._data_arrays.keys():
+            data_array = replica.data_array(self._url, name)
+            if data_array is not None:
+                setattr(self, name, data_array)
+                return data_array
+        return _return_data_array(self._url, self._data_arrays, self, name)
@@ -1,8 +1,11 @@
 """
     Middleware to help manage the Slumber client.
 """
+from django.conf import settings
+
 from slumber import client
 from slumber._caches import CLIENT_INSTANCE_CACHE
+from slumber.connector.accounting import Account, LOGGER
 
 
 class Cache(object):
@@ -25,3 +28,48 @@ class Cache(object):
         # pylint: disable=W0212
         client._flush_client_instance_cache()
         return response
+
+
+class ChangeFeedCache(object):
+    """This middleware keeps the Slumber client cache between requests and
+    uses the server's change feed at the start of each request to remove
+    the instances that have changed. The server must have `slumber.changes`
+    installed.
+    """
+
+    # Django defines this as a method
+    # pylint: disable=R0201
+    def process_request(self, _request):
+        """Bring the cache up to date before any other processing is done.
+        """
+        # We're inside Slumber so the private access is ok.
+        # pylint: disable=W0212
+        client._poll_changes()
+
+
+class Accounting(object):
+    """This middleware counts the Slumber requests, bytes, time and client
+    cache hits and misses for each request. The account is available as
+    `request.slumber_account`. When `SLUMBER_ACCOUNTING_HEADER` is True
+    the summary is sent in the `X-Slumber-Requests` response header, and
+    when `SLUMBER_ACCOUNTING_LOG` is True it is logged.
+    """
+
+    # Django defines this as a method
+    # pylint: disable=R0201
+    def process_request(self, request):
+        """Start counting.
+        """
+        request.slumber_account = Account().__enter__()
+
+    def process_response(self, request, response):
+        """Stop counting and report.
+        """
+        account = getattr(request, 'slumber_account', None)
+        if account:
+            account.__exit__(None, None, None)
+            if getattr(settings, 'SLUMBER_ACCOUNTING_HEADER', False):
+                response['X-Slumber-Requests'] = account.summary()
+            if getattr(settings, 'SLUMBER_ACCOUNTING_LOG', False):
+                LOGGER.info("%s %s", request.path, account.summary())
+        return response
@@ -1,14 +1,20 @@
 """
     Code for the Slumber model connector.
 """
+from django.conf import settings
+
+from simplejson import dumps
 from urllib import urlencode
 from urlparse import urljoin, urlparse
 
-from slumber._caches import MODEL_URL_TO_SLUMBER_MODEL
+from slumber._caches import CLIENT_INSTANCE_CACHE, CLIENT_LOOKUP_CACHE, \
+    CLIENT_REPLICAS, MODEL_URL_TO_SLUMBER_MODEL
+from slumber.connector import accounting
 from slumber.connector.dictobject import DictObject
 from slumber.connector.instance import get_instance
 from slumber.connector.json import from_json_data
-from slumber.connector.ua import get
+from slumber.connector.query import Query
+from slumber.connector.ua import get, post, stream
 
 
 def _ensure_absolute(url):
@@ -24,6 +30,18 @@ def get_model(url):
     return MODEL_URL_TO_SLUMBER_MODEL[url]
 
 
+def _remember_lookup(key, value):
+    """Store the result of a lookup in the lookup cache, evicting the oldest
+    entries once there are too many.
+    """
+    size = getattr(settings, 'SLUMBER_LOOKUP_CACHE_SIZE', 1000)
+    if not CLIENT_LOOKUP_CACHE.has_key(key):
+        CLIENT_LOOKUP_CACHE.order.append(key)
+    CLIENT_LOOKUP_CACHE[key] = value
+    while len(CLIENT_LOOKUP_CACHE.order) > size:
+        del CLIENT_LOOKUP_CACHE[CLIENT_LOOKUP_CACHE.order.popleft()]
+
+
 class ModelConnector(DictObject):
     """Handles the connection to a Django model.
     """
@@ -50,9 +68,126 @@ class ModelConnector(DictObject):
         """
         assert len(kwargs), \
             "You must supply kwargs to filter on to fetch the instance"
-        url = urljoin(self._url, 'get/')
-        _, json = get(url + '?' + urlencode(kwargs))
-        return get_instance(self,
-            urljoin(self._url, json['identity']), json['display'],
-            **dict([(k, from_json_data(self._url, j))
+        replica = CLIENT_REPLICAS.get(self._url, None)
+        if replica:
+            instance = replica.get(self, **kwargs)
+            if instance:
+                accounting.cache(True)
+                return instance
+        # The lookup cache lives exactly as long as the instance cache
+        key = self._lookup_key(kwargs)
+        found = CLIENT_LOOKUP_CACHE.get(key, None) \
+            if CLIENT_INSTANCE_CACHE.enabled else None
+        accounting.cache(found is not None)
+        if not found:
+            _, json = get(self._get_url(kwargs))
+            found = self._found(key, json)
+        instance_url, display, fields = found
+        return get_instance(self, instance_url, display, **fields)
+
+    def _lookup_key(self, kwargs):
+        """Return the lookup cache key for a `get`.
+        """
+        return (self._url, tuple(sorted(
+            [(k, unicode(v)) for k, v in kwargs.items()])))
+
+    def _get_url(self, kwargs):
+        """Return the URL for a `get`.
+        """
+        return urljoin(self._url, 'get/') + '?' + urlencode(kwargs)
+
+    def _found(self, key, json):
+        """Work out the instance URL, display and fields from the response
+        to a `get` and remember them in the lookup cache.
+        """
+        found = (urljoin(self._url, json['identity']), json['display'],
+            dict([(k, from_json_data(self._url, j))
                 for k, j in json['fields'].items()]))
+        if CLIENT_INSTANCE_CACHE.enabled:
+            _remember_lookup(key, found)
+        return found
+
+    def _batch_get(self, batch, kwargs):
+        """Queue a `get` in the batch. See `Batch.get_instance`.
+        """
+        # We're inside Slumber so the private access is ok.
+        # pylint: disable=W0212
+        assert len(kwargs), \
+            "You must supply kwargs to filter on to fetch the instance"
+        key = self._lookup_key(kwargs)
+        def loaded(json):
+            """Put the instance into the caches.
+            """
+            instance_url, display, fields = self._found(key, json)
+            instance = get_instance(self, instance_url, display, **fields)
+            instance._fetch_instance()
+            return instance
+        return batch._queue('GET', self._get_url(kwargs), {}, None, loaded)
+
+    def filter(self, **lookups):
+        """Return a lazy query for the instances that match the lookups.
+        """
+        return Query(self, lookups)
+
+    def aggregate(self, group_by=(), **aggregates):
+        """Calculate aggregates over all of the instances. See
+        `Query.aggregate` for the arguments.
+        """
+        return Query(self).aggregate(group_by, **aggregates)
+
+    def export(self, **lookups):
+        """Generate every instance (or those matching the filter lookups)
+        with all of its field data. The instances are streamed from the
+        server as they're needed, so the whole table is never held in
+        memory unless the caller keeps them.
+        """
+        url = urljoin(self._url, 'export/')
+        if lookups:
+            url += '?' + urlencode(lookups)
+        for json in stream(url):
+            yield get_instance(self,
+                urljoin(self._url, json['identity']), json['display'],
+                **dict([(k, from_json_data(self._url, j))
+                    for k, j in json['fields'].items()]))
+
+    def create_many(self, instances):
+        """Create many instances in one request. The instances are given as
+        a list of dicts of field values, with foreign keys given as primary
+        keys. Returns the new instances in the same order, with None for any
+        that couldn't be created, together with the server's list of errors.
+        """
+        _, json = post(urljoin(self._url, 'bulk-create/'),
+            dumps(instances, default=unicode), 'application/json')
+        created = [None] * len(instances)
+        for item in json['created']:
+            created[item['index']] = get_instance(self,
+                urljoin(self._url, item['identity']), item['display'])
+        return created, json['errors']
+
+    def _bulk(self, operation, body, pks, lookups):
+        """Send a request for a bulk operation that chooses its instances
+        either by primary key or with a filter.
+        """
+        assert pks is not None or lookups, \
+            "You must give either the pks or a filter for the instances"
+        if pks is not None:
+            body['pks'] = list(pks)
+        else:
+            body['filter'] = lookups
+        _, json = post(urljoin(self._url, operation + '/'),
+            dumps(body, default=unicode), 'application/json')
+        return json
+
+    def update_many(self, changes, pks=None, **lookups):
+        """Apply the same changes to all of the instances with the given
+        primary keys, or that match the filter lookups. Returns the number
+        of instances changed.
+        """
+        return self._bulk('bulk-update', dict(changes=changes),
+            pks, lookups)['updated']
+
+    def delete_many(self, pks=None, **lookups):
+        """Delete all of the instances with the given primary keys, or that
+        match the filter lookups. Returns the number of instances deleted.
+        """
+        return self._bulk('bulk-delete', {}, pks, lookups)['deleted']
@@ -0,0 +1,79 @@
+"""
+    Client side permission checks. All of a user's permissions are fetched
+    in one request and kept for a while so that checking many permissions
+    doesn't need a request for each.
+"""
+from django.conf import settings
+
+from time import time
+
+from slumber._caches import CLIENT_PERMISSION_CACHE
+from slumber.connector import accounting
+from slumber.connector.ua import get
+
+
+def _permissions(user):
+    """Return the permission data for a user, which is either a client
+    instance or the user's instance URL. The data is fetched at most once
+    every `SLUMBER_PERMISSION_CACHE_TTL` seconds.
+    """
+    url = getattr(user, '_url', user)
+    expires, json = CLIENT_PERMISSION_CACHE.get(url, (0, None))
+    fresh = expires >= time()
+    accounting.cache(fresh)
+    if not fresh:
+        index = url.rindex('/data/')
+        _, json = get(url[:index] + '/permissions/' + url[index + 6:])
+        _remember(url, json)
+    return json
+
+
+def _remember(url, json):
+    """Store a user's permission data, evicting the oldest users once there
+    are more than `SLUMBER_PERMISSION_CACHE_SIZE`.
+    """
+    size = getattr(settings, 'SLUMBER_PERMISSION_CACHE_SIZE', 1000)
+    if not CLIENT_PERMISSION_CACHE.has_key(url):
+        CLIENT_PERMISSION_CACHE.order.append(url)
+    CLIENT_PERMISSION_CACHE[url] = (time() +
+        getattr(settings, 'SLUMBER_PERMISSION_CACHE_TTL', 60), json)
+    while len(CLIENT_PERMISSION_CACHE.order) > size:
+        del CLIENT_PERMISSION_CACHE[CLIENT_PERMISSION_CACHE.order.popleft()]
+
+
+def get_all_permissions(user):
+    """Return the set of permission names that the user has.
+    """
+    return set(_permissions(user)['permissions'])
+
+
+def has_perm(user, permission):
+    """Return True if the user has the permission. This follows Django's
+    rules, so active superusers have every permission and inactive users
+    have none.
+    """
+    json = _permissions(user)
+    if not json['is_active']:
+        return False
+    return json['is_superuser'] or permission in json['permissions']
+
+
+def has_perms(user, permissions):
+    """Return True if the user has all of the permissions.
+    """
+    for permission in permissions:
+        if not has_perm(user, permission):
+            return False
+    return True
+
+
+def forget(user=None):
+    """Remove a user's permissions, or everybody's, from the cache.
+    """
+    if user is None:
+        CLIENT_PERMISSION_CACHE.clear()
+        CLIENT_PERMISSION_CACHE.order.clear()
+    else:
+        url = getattr(user, '_url', user)
+        if CLIENT_PERMISSION_CACHE.pop(url, None):
+            CLIENT_PERMISSION_CACHE.order.remove(url)
@@ -0,0 +1,87 @@
+"""
+    Implements lazy queries against a remote model.
+"""
+from urllib import urlencode
+from urlparse import urljoin
+
+from slumber.connector.instance import get_instance
+from slumber.connector.ua import get
+
+
+class Query(object):
+    """A lazy query for the instances of a remote model. Like a Django
+    query set, `filter` and `order_by` return new queries and nothing is
+    fetched until the query is iterated over. The filtering and ordering
+    are done by the server, one page at a time.
+    """
+    def __init__(self, model, lookups=None, ordering=()):
+        self._model = model
+        self._lookups = lookups or {}
+        self._ordering = tuple(ordering)
+
+    def filter(self, **lookups):
+        """Return a new query that also has these filter lookups.
+        """
+        return Query(self._model, dict(self._lookups, **lookups),
+            self._ordering)
+
+    def order_by(self, *ordering):
+        """Return a new query with this ordering.
+        """
+        return Query(self._model, self._lookups, ordering)
+
+    def _params(self):
+        """The query string parameters for the lookups and ordering.
+        """
+        params = []
+        for key, value in self._lookups.items():
+            if isinstance(value, (list, tuple)):
+                value = ','.join([unicode(v) for v in value])
+            params.append((key, unicode(value).encode('utf-8')))
+        if self._ordering:
+            params.append(('order_by', ','.join(self._ordering)))
+        return params
+
+    def aggregate(self, group_by=(), **aggregates):
+        """Calculate aggregates over the matching instances in the server's
+        database. The aggregates are given as `function=field` (or a list of
+        fields) where the function is one of count, sum, min, max or avg,
+        and `count=True` counts the instances. Returns a dict keyed by
+        `field__function` (or `count`), or a list of these with the group
+        field values if `group_by` is given.
+        """
+        # We're inside Slumber so the private access is ok.
+        # pylint: disable=W0212
+        params = self._params()
+        for function, fields in aggregates.items():
+            if fields is True:
+                fields = ''
+            elif isinstance(fields, (list, tuple)):
+                fields = ','.join(fields)
+            params.append((function, fields))
+        if group_by:
+            params.append(('group_by', ','.join(group_by)))
+        _, json = get(urljoin(self._model._url, 'aggregate/') + '?' +
+            urlencode(params))
+        return json['groups'] if group_by else json['aggregates']
+
+    def count(self):
+        """Return the number of matching instances.
+        """
+        return self.aggregate(count=True)['count']
+
+    def __iter__(self):
+        """Fetch the pages of matching instances as they're needed.
+        """
+        # We're inside Slumber so the private access is ok.
+        # pylint: disable=W0212
+        url = urljoin(self._model._url, 'filter/')
+        _, data = get(url + '?' + urlencode(self._params()))
+        while True:
+            for obj in data['page']:
+                yield get_instance(self._model,
+                    urljoin(url, obj['data']), obj['display'])
+            if data.has_key('next_page'):
+                _, data = get(urljoin(url, data['next_page']))
+            else:
+                break
@@ -0,0 +1,285 @@
+"""
+    Keeps a local SQLite copy of the instances of remote models so that
+    reading them doesn't need a request to the server.
+"""
+from django.conf import settings
+
+import sqlite3
+from simplejson import dumps, loads
+from threading import Lock
+from time import time
+from urllib import urlencode
+from urlparse import urljoin
+
+from slumber._caches import CLIENT_REPLICAS
+from slumber.connector.changes import ChangeFeed
+from slumber.connector.instance import get_instance
+from slumber.connector.json import from_json_data
+from slumber.connector.ua import get, stream
+
+
+# The most primary keys that are re-fetched in one export request
+_REFETCH_SIZE = 100
+
+
+def _pk(instance_url):
+    """Return the primary key from an instance data URL.
+    """
+    return instance_url.rstrip('/').split('/')[-1]
+
+
+def _pk_order(row):
+    """Sort key that puts numeric primary keys in numeric order.
+    """
+    if row[1].isdigit():
+        return (0, int(row[1]))
+    return (1, row[1])
+
+
+def _text(json):
+    """Return the text of a field value that lookups are compared with.
+    Foreign keys are compared by primary key.
+    """
+    if json['data'] is None:
+        return None
+    elif json['kind'] == 'object':
+        return _pk(json['data']['data'])
+    return unicode(json['data'])
+
+
+class _Table(object):
+    """The replica table for one model.
+    """
+    def __init__(self, model, json):
+        self.model = model
+        self.name = json['module'] + '.' + json['name']
+        self.fields = sorted(json['fields'].keys())
+        self.data_arrays = json['data_arrays']
+        self.relations = json.get('data_array_relations', {})
+
+    def column(self, lookup):
+        """Return the column that holds the text for a lookup, or None if
+        the lookup can't be done against the replica.
+        """
+        if lookup == 'pk':
+            return 'pk'
+        elif lookup in self.fields:
+            return 'f_' + lookup
+        return None
+
+
+class Replica(object):
+    """A local SQLite database that holds copies of all of the instances of
+    some remote models. Reads of those models are served from the replica
+    and it is kept up to date from the server's change feed, so the server
+    must have `slumber.changes` installed. Writes still go to the server
+    and show up in the replica once it has been refreshed.
+    """
+    def __init__(self, directory, database=None):
+        if not database:
+            database = getattr(settings, 'SLUMBER_REPLICA_DATABASE',
+                ':memory:')
+        self._db = sqlite3.connect(database, check_same_thread=False)
+        # Protects the database. The requests to the server are made
+        # without holding it so that reads don't wait on them
+        self._lock = Lock()
+        # Held by the thread that is bringing the replica up to date
+        self._refreshing = Lock()
+        self._feed = ChangeFeed(directory)
+        self._tables = {}
+        self.refreshed = None
+
+    def add(self, *models):
+        """Start replicating the models (which are client model
+        connectors). All of their instances are copied from the server.
+        """
+        self._refreshing.acquire()
+        self._lock.acquire()
+        try:
+            if self._feed.since is None:
+                # Find our place in the change feed before the copy is made
+                # so that no change can be missed
+                self._feed.poll()
+                self.refreshed = time()
+            for model in models:
+                _, json = get(model._url)
+                # Save the model connector from asking for these again
+                model.name, model.module = json['name'], json['module']
+                table = _Table(model, json)
+                columns = ['f_' + f for f in table.fields]
+                self._db.execute('DROP TABLE IF EXISTS "%s"' % table.name)
+                self._db.execute('CREATE TABLE "%s" (url TEXT PRIMARY KEY, '
+                    'pk TEXT, display TEXT, fields TEXT%s)' % (table.name,
+                        ''.join([', "%s" TEXT' % c for c in columns])))
+                for column in ['pk'] + columns:
+                    self._db.execute('CREATE INDEX "%s.%s" ON "%s" ("%s")' % (
+                        table.name, column, table.name, column))
+                self._tables[model._url] = table
+                self._insert(table, self._fetch(table))
+                CLIENT_REPLICAS[model._url] = self
+            self._db.commit()
+        finally:
+            self._lock.release()
+            self._refreshing.release()
+
+    def _fetch(self, table, **lookups):
+        """Return the rows for the instances that match the lookups, fetched
+        from the server.
+        """
+        url = urljoin(table.model._url, 'export/')
+        if lookups:
+            url += '?' + urlencode(lookups)
+        rows = []
+        for json in stream(url):
+            instance_url = urljoin(table.model._url, json['identity'])
+            rows.append([instance_url, _pk(instance_url), json['display'],
+                    dumps(json['fields'])] +
+                [_text(json['fields'][f]) for f in table.fields])
+        return rows
+
+    def _insert(self, table, rows):
+        """Put the rows into the table. The lock must be held.
+        """
+        self._db.executemany('INSERT OR REPLACE INTO "%s" VALUES (%s)' % (
+            table.name, ', '.join(['?'] * (4 + len(table.fields)))), rows)
+
+    def refresh(self):
+        """Apply the changes made on the server since the last refresh. The
+        replica can still be read while this happens.
+        """
+        self._refreshing.acquire()
+        try:
+            self._refresh()
+        finally:
+            self._refreshing.release()
+
+    def _refresh(self):
+        """Apply the changes. The refreshing lock must be held. If anything
+        fails then the replica is left as it was, and the changes will be
+        fetched again by the next refresh.
+        """
+        since = self._feed.since
+        try:
+            changes = self._feed.poll()
+            # Each replacement is the table, the primary keys to replace
+            # (None for all of them) and the new rows
+            replacements = []
+            if self._feed.reset:
+                # Changes we haven't seen are gone so copy everything again
+                for table in self._tables.values():
+                    replacements.append((table, None, self._fetch(table)))
+            else:
+                changed = {}
+                for change in changes:
+                    if self._tables.has_key(change['model']):
+                        changed.setdefault(change['model'], set()).add(
+                            _pk(change['identity']))
+                for model_url, pks in changed.items():
+                    table, pks = self._tables[model_url], sorted(pks)
+                    for start in range(0, len(pks), _REFETCH_SIZE):
+                        chunk = pks[start:start + _REFETCH_SIZE]
+                        replacements.append((table, chunk,
+                            self._fetch(table, pk__in=','.join(chunk))))
+        # The error is re-raised once the feed has been put back
+        # pylint: disable=W0702
+        except:
+            self._feed.since = since
+            raise
+        self._lock.acquire()
+        try:
+            for table, pks, rows in replacements:
+                if pks is None:
+                    self._db.execute('DELETE FROM "%s"' % table.name)
+                else:
+                    # Deleted instances won't come back from the export
+                    self._db.execute('DELETE FROM "%s" WHERE pk IN (%s)' % (
+                        table.name, ', '.join(['?'] * len(pks))), pks)
+                self._insert(table, rows)
+            self._db.commit()
+        finally:
+            self._lock.release()
+        self.refreshed = time()
+
+    def _select(self, table, where, params):
+        """Return the rows that match. If the replica is older than
+        `SLUMBER_REPLICA_MAX_AGE` seconds it is refreshed first. If that
+        can't be done, because it fails or another thread is already doing
+        it, then None is returned and the server must be asked.
+        """
+        max_age = getattr(settings, 'SLUMBER_REPLICA_MAX_AGE', 10)
+        if max_age is not None and time() - self.refreshed > max_age:
+            if not self._refreshing.acquire(False):
+                return None
+            try:
+                self._refresh()
+            # Whatever went wrong the server can still answer the read
+            # pylint: disable=W0703
+            except Exception:
+                return None
+            finally:
+                self._refreshing.release()
+        self._lock.acquire()
+        try:
+            return self._db.execute(
+                'SELECT url, pk, display, fields FROM "%s" WHERE %s' % (
+                    table.name, where), params).fetchall()
+        finally:
+            self._lock.release()
+
+    def _instance(self, table, row):
+        """Return the client instance for a row.
+        """
+        url, _, display, fields = row
+        return get_instance(table.model, url, display,
+            **dict([(str(k), from_json_data(table.model._url, j))
+                for k, j in loads(fields).items()]))
+
+    def get(self, model, **kwargs):
+        """Return the instance of the model that matches the lookups. If
+        the replica can't do the lookups, or doesn't find exactly one
+        instance, then None is returned and the server must be asked.
+        """
+        table = self._tables[model._url]
+        where, params = [], []
+        for lookup, value in kwargs.items():
+            column = table.column(lookup)
+            if not column:
+                return None
+            where.append('"%s" = ?' % column)
+            params.append(unicode(value))
+        rows = self._select(table, ' AND '.join(where), params)
+        if rows is None or len(rows) != 1:
+            return None
+        return self._instance(table, rows[0])
+
+    def instance_data(self, instance_url):
+        """Return the instance data in the same form as the server's data
+        operation, or None if the replica doesn't have it.
+        """
+        table = self._tables[instance_url[:instance_url.rindex('/data/') + 1]]
+        rows = self._select(table, 'url = ?', [instance_url])
+        if not rows:
+            return None
+        return dict(fields=loads(rows[0][3]),
+            data_arrays=dict([(name, instance_url + name + '/')
+                for name in table.data_arrays]))
+
+    def data_array(self, instance_url, name):
+        """Return the instances in a data array, or None if the model that
+        makes up the data array isn't replicated or the replica can't be
+        brought up to date. They're in the same order
+        that the server uses.
+        """
+        table = self._tables[instance_url[:instance_url.rindex('/data/') + 1]]
+        relation = table.relations.get(name, None)
+        related = self._tables.get(
+            urljoin(table.model._url, relation['type']), None) \
+                if relation else None
+        if not related:
+            return None
+        rows = self._select(related, '"f_%s" = ?' % relation['field'],
+            [_pk(instance_url)])
+        if rows is None:
+            return None
+        rows.sort(key=_pk_order, reverse=True)
+        return [self._instance(related, row) for row in rows]
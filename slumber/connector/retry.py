@@ -0,0 +1,119 @@
+"""
+    Retry budgets, back off and circuit breakers so that a slow or broken
+    Slumber server doesn't tie up the client.
+"""
+from django.conf import settings
+
+from random import uniform
+from threading import Lock
+from time import time
+from urlparse import urlparse
+
+from slumber._caches import CLIENT_CIRCUIT_BREAKERS
+
+
+class RetryBudget(object):
+    """Limits retries to a fraction of the requests made so that retrying
+    can't multiply the load on servers that are already struggling. Every
+    request adds the fraction to the balance and every retry takes one
+    away. The balance starts with enough for a few retries and can't grow
+    without limit. The fraction is read from the named setting.
+    """
+    def __init__(self, setting='SLUMBER_RETRY_BUDGET', fraction=0.1,
+            balance=10.0, limit=100.0):
+        self.setting, self.fraction = setting, fraction
+        self.balance = balance
+        self.limit = limit
+        self._lock = Lock()
+
+    def deposit(self):
+        """Record a request.
+        """
+        self._lock.acquire()
+        try:
+            self.balance = min(self.limit, self.balance +
+                getattr(settings, self.setting, self.fraction))
+        finally:
+            self._lock.release()
+
+    def withdraw(self):
+        """Return True and take a retry from the budget if there is one.
+        """
+        self._lock.acquire()
+        try:
+            if self.balance < 1:
+                return False
+            self.balance -= 1
+            return True
+        finally:
+            self._lock.release()
+
+
+def backoff(attempt):
+    """Return how many seconds to wait before a retry. The wait grows
+    exponentially from `SLUMBER_RETRY_BACKOFF` seconds but is jittered over
+    the whole range so that clients don't retry in lock step.
+    """
+    base = getattr(settings, 'SLUMBER_RETRY_BACKOFF', 0.05)
+    return uniform(0, min(1.0, base * 2 ** attempt))
+
+
+class CircuitOpen(AssertionError):
+    """The circuit breaker for a host is open so no request was made.
+    """
+
+
+class CircuitBreaker(object):
+    """Stops requests to a host after `SLUMBER_CIRCUIT_FAILURES` failures
+    in a row. Once `SLUMBER_CIRCUIT_RESET` seconds have passed a single
+    trial request is let through, which closes the circuit again if it
+    succeeds.
+    """
+    def __init__(self, host):
+        self.host = host
+        self.failures = 0
+        self.opened = None
+        self.trial = False
+        self._lock = Lock()
+
+    def allow(self):
+        """Raise CircuitOpen unless a request may be made now.
+        """
+        self._lock.acquire()
+        try:
+            if self.opened is None:
+                return
+            reset = getattr(settings, 'SLUMBER_CIRCUIT_RESET', 30)
+            if not self.trial and time() - self.opened >= reset:
+                self.trial = True
+                return
+        finally:
+            self._lock.release()
+        raise CircuitOpen(self.host)
+
+    def record(self, succeeded):
+        """Record the result of a request that was allowed.
+        """
+        self._lock.acquire()
+        try:
+            self.trial = False
+            if succeeded:
+                self.failures, self.opened = 0, None
+            else:
+                self.failures += 1
+                if self.opened is not None or self.failures >= getattr(
+                        settings, 'SLUMBER_CIRCUIT_FAILURES', 5):
+                    self.opened = time()
+        finally:
+            self._lock.release()
+
+
+def get_breaker(url):
+    """Return the circuit breaker for the host that serves the URL.
+    """
+    host = urlparse(url)[1]
+    breaker = CLIENT_CIRCUIT_BREAKERS.get(host, None)
+    if not breaker:
+        breaker = CLIENT_CIRCUIT_BREAKERS.setdefault(host,
+            CircuitBreaker(host))
+    return breaker
@@ -3,15 +3,58 @@
     servers.
 """
 from django.conf import settings
-from django.test.client import Client as FakeClient
 
-from httplib2 import Http
+from httplib2 import Http, HttpLib2Error
 from simplejson import loads
+from socket import error as SocketError
+from threading import Event, Lock
+from time import sleep, time
+from urllib import urlencode
+from urllib2 import HTTPError, Request, URLError, urlopen
 from urlparse import parse_qs
+from uuid import uuid4
 
+from slumber.connector import accounting
+from slumber.connector.backends import find_pool
+from slumber.connector.hedge import hedged
+from slumber.connector.retry import backoff, CircuitOpen, get_breaker, \
+    RetryBudget
 
-_fake = FakeClient()
-_http = Http()
+
+# The transports are only created when they're first needed. The HTTP
+# clients aren't thread safe so each request takes an idle one from the
+# pool and puts it back when it's done.
+_fake, _http = None, []
+
+
+class ServerError(AssertionError):
+    """A remote server gave a 5xx response.
+    """
+
+# The errors that mean that a server isn't working
+_SERVER_ERRORS = (ServerError, SocketError, HttpLib2Error, URLError)
+# Limits the retries made by all of the GETs
+RETRY_BUDGET = RetryBudget()
+# Identifies this client to the servers so that they can make sure it sees
+# its own writes
+SESSION = uuid4().hex
+
+
+class _Flight(object):
+    """A GET request that is currently outstanding. Other callers that want
+    the same URL wait on this rather than issuing their own request.
+    """
+    def __init__(self):
+        self.done = Event()
+        self.result = None
+        self.error = None
+
+# Stores the flights that are in progress keyed by URL
+_IN_FLIGHT = {}
+# Protects _IN_FLIGHT and the statistics below
+_IN_FLIGHT_LOCK = Lock()
+# Statistics about the request coalescing
+STATS = dict(requests=0, coalesced=0)
 
 
 def _parse_qs(url):
@@ -20,27 +63,281 @@ def _parse_qs(url):
     """
     if url.find('?') >= 0:
         path, query_string = url.split('?')
-        return path, parse_qs(query_string)
+        return path, parse_qs(query_string, keep_blank_values=True)
     else:
         return url, {}
 
 
-def get(url):
-    """Perform a GET request against a Slumber server.
+def _fake_client():
+    """Return the Django test client used for local requests.
+    """
+    # The global is needed to create the client on first use
+    # pylint: disable=W0603
+    global _fake
+    if not _fake:
+        from django.test.client import Client as FakeClient
+        _fake = FakeClient()
+    return _fake
+
+
+def _http_client():
+    """Return an idle HTTP client for a remote request. It must be given
+    back to the pool once the request has finished.
+    """
+    try:
+        return _http.pop()
+    except IndexError:
+        return Http(timeout=getattr(settings, 'SLUMBER_TIMEOUT', 10))
+
+
+def _request(url, *args, **kwargs):
+    """Make a request to a remote server through its circuit breaker. The
+    arguments are passed on to the HTTP client.
+    """
+    breaker = get_breaker(url)
+    breaker.allow()
+    http = _http_client()
+    try:
+        response, content = http.request(url, *args, **kwargs)
+    # Whatever went wrong the breaker must hear about it, or a trial
+    # request would leave it open for good
+    # pylint: disable=W0703
+    except Exception:
+        breaker.record(False)
+        raise
+    finally:
+        _http.append(http)
+    breaker.record(response.status < 500)
+    if response.status >= 500:
+        raise ServerError(url, response.status)
+    return response, content
+
+
+def _fetch(url):
+    """Perform the actual GET request. We ask the server to give us the body
+    of any resource it would redirect to, but still follow redirects for
+    servers that don't support that.
     """
     # Pylint gets confused by the fake HTTP client
     # pylint: disable=E1103
+    started = time()
     slumber_local = getattr(settings, 'SLUMBER_LOCAL', 'http://localhost:8000/')
     if url.startswith(slumber_local):
         url_fragment = url[len(slumber_local) - 1:]
         file_spec, query = _parse_qs(url_fragment)
-        response = _fake.get(file_spec, query,
-            HTTP_HOST='localhost:8000')
+        response = _fake_client().get(file_spec, query,
+            HTTP_HOST='localhost:8000', HTTP_X_SLUMBER_INLINE='1',
+            HTTP_X_SLUMBER_SESSION=SESSION)
         if response.status_code in [301, 302]:
             return get(response['location'])
         assert response.status_code == 200, (url_fragment, response)
         content = response.content
     else:
-        response, content = _http.request(url)
+        response, content = _request(url,
+            headers={'X-Slumber-Inline': '1', 'X-Slumber-Session': SESSION})
         assert response.status == 200, url
+    accounting.request(url, time() - started, len(content))
     return response, loads(content)
+
+
+def _attempt(url, fetch=_fetch):
+    """Make one attempt at the GET request using `fetch`. If the service
+    has several servers then the request goes to the best one, moving on to
+    the next if it fails or its circuit breaker is open. CircuitOpen is only
+    raised if every server's breaker is open.
+    """
+    pool = find_pool(url)
+    if not pool:
+        return fetch(url)
+    path = url[len(pool.primary.url):]
+    failure = opened = None
+    for backend in pool.candidates():
+        started = pool.start(backend)
+        try:
+            result = fetch(backend.url + path)
+        except CircuitOpen, opened:
+            # The breaker is already keeping requests away from the server
+            pool.cancel(backend)
+        except _SERVER_ERRORS, failure:
+            pool.finish(backend, started, False)
+        else:
+            pool.finish(backend, started, True)
+            return result
+    raise failure or opened
+
+
+def _retried(attempt, url):
+    """Call `attempt(url)`. Attempts that fail because of the server are
+    retried after a back off, up to `SLUMBER_RETRIES` times, while the retry
+    budget allows it and the `SLUMBER_DEADLINE` (in seconds) for the whole
+    request hasn't passed. A host whose circuit breaker is open fails
+    straight away.
+    """
+    deadline = time() + getattr(settings, 'SLUMBER_DEADLINE', 30)
+    retries = getattr(settings, 'SLUMBER_RETRIES', 2)
+    RETRY_BUDGET.deposit()
+    attempt_number = 0
+    while True:
+        try:
+            return attempt(url)
+        except CircuitOpen:
+            raise
+        except _SERVER_ERRORS:
+            wait = backoff(attempt_number)
+            if attempt_number >= retries or time() + wait >= deadline or \
+                    not RETRY_BUDGET.withdraw():
+                raise
+            sleep(wait)
+            attempt_number += 1
+
+
+def _get(url):
+    """Perform the GET request without any coalescing, retrying it as
+    `_retried` describes.
+
+    When `SLUMBER_HEDGE` is on, remote attempts are hedged. Because the
+    first request is still outstanding the hedge goes to a different
+    replica if the service has any.
+    """
+    slumber_local = getattr(settings, 'SLUMBER_LOCAL', 'http://localhost:8000/')
+    if getattr(settings, 'SLUMBER_HEDGE', False) and \
+            not url.startswith(slumber_local):
+        return _retried(lambda u: hedged(_attempt, u), url)
+    return _retried(_attempt, url)
+
+
+def get(url):
+    """Perform a GET request against a Slumber server.
+
+    If another thread is already fetching the same URL then we wait for
+    that request to finish and share its result.
+    """
+    _IN_FLIGHT_LOCK.acquire()
+    try:
+        flight = _IN_FLIGHT.get(url, None)
+        if flight:
+            STATS['coalesced'] += 1
+            leader = False
+        else:
+            flight = _IN_FLIGHT[url] = _Flight()
+            STATS['requests'] += 1
+            leader = True
+    finally:
+        _IN_FLIGHT_LOCK.release()
+    if not leader:
+        flight.done.wait()
+        if flight.error:
+            raise flight.error
+        return flight.result
+    try:
+        try:
+            flight.result = _get(url)
+        except Exception, error:
+            flight.error = error
+            raise
+        return flight.result
+    finally:
+        _IN_FLIGHT_LOCK.acquire()
+        try:
+            del _IN_FLIGHT[url]
+        finally:
+            _IN_FLIGHT_LOCK.release()
+        flight.done.set()
+
+
+def post(url, data, content_type=None):
+    """Perform a POST request against a Slumber server. The data is either
+    a dict of form fields or, if a content type is given, the request body.
+    """
+    # Pylint gets confused by the fake HTTP client
+    # pylint: disable=E1103
+    started = time()
+    slumber_local = getattr(settings, 'SLUMBER_LOCAL', 'http://localhost:8000/')
+    if url.startswith(slumber_local):
+        url_fragment = url[len(slumber_local) - 1:]
+        if content_type:
+            response = _fake_client().post(url_fragment, data, content_type,
+                HTTP_HOST='localhost:8000', HTTP_X_SLUMBER_INLINE='1',
+                HTTP_X_SLUMBER_SESSION=SESSION)
+        else:
+            response = _fake_client().post(url_fragment, data,
+                HTTP_HOST='localhost:8000', HTTP_X_SLUMBER_INLINE='1',
+                HTTP_X_SLUMBER_SESSION=SESSION)
+        assert response.status_code == 200, (url_fragment, response)
+        content = response.content
+    else:
+        if not content_type:
+            data, content_type = urlencode(data), \
+                'application/x-www-form-urlencoded'
+        response, content = _request(url, 'POST', body=data,
+            headers={'Content-Type': content_type, 'X-Slumber-Inline': '1',
+                'X-Slumber-Session': SESSION})
+        assert response.status == 200, url
+    accounting.request(url, time() - started, len(content))
+    return response, loads(content)
+
+
+def _split_lines(chunks):
+    """Join up the chunks of a response body and split them into lines.
+    """
+    partial = ''
+    for chunk in chunks:
+        lines = (partial + chunk).split('\n')
+        partial = lines.pop()
+        for line in lines:
+            yield line
+    if partial:
+        yield partial
+
+
+def _open(url):
+    """Open a remote streaming response through the server's circuit
+    breaker.
+    """
+    breaker = get_breaker(url)
+    breaker.allow()
+    try:
+        response = urlopen(Request(url,
+                headers={'X-Slumber-Session': SESSION}),
+            timeout=getattr(settings, 'SLUMBER_TIMEOUT', 10))
+    except HTTPError, error:
+        breaker.record(error.code < 500)
+        if error.code >= 500:
+            raise ServerError(url, error.code)
+        raise AssertionError(url, error.code)
+    # Whatever went wrong the breaker must hear about it, or a trial
+    # request would leave it open for good
+    # pylint: disable=W0703
+    except Exception:
+        breaker.record(False)
+        raise
+    breaker.record(True)
+    return response
+
+
+def stream(url):
+    """Perform a GET request against a Slumber server that returns newline
+    delimited JSON and generate the decoded lines as they arrive. Opening
+    the response fails over and is retried like `get`, but once lines have
+    arrived an error is passed on to the caller.
+    """
+    # Pylint gets confused by the fake HTTP client
+    # pylint: disable=E1103
+    started, size = time(), 0
+    slumber_local = getattr(settings, 'SLUMBER_LOCAL', 'http://localhost:8000/')
+    if url.startswith(slumber_local):
+        url_fragment = url[len(slumber_local) - 1:]
+        file_spec, query = _parse_qs(url_fragment)
+        response = _fake_client().get(file_spec, query,
+            HTTP_HOST='localhost:8000', HTTP_X_SLUMBER_SESSION=SESSION)
+        assert response.status_code == 200, (url_fragment, response)
+        chunks = getattr(response, 'streaming_content', response)
+    else:
+        response = _retried(lambda u: _attempt(u, _open), url)
+        assert response.getcode() == 200, url
+        chunks = iter(lambda: response.read(8192), '')
+    for line in _split_lines(chunks):
+        size += len(line) + 1
+        if line.strip():
+            yield loads(line)
+    accounting.request(url, time() - started, size)
@@ -0,0 +1,125 @@
+"""
+    Collects the attribute changes made to remote instances and saves them
+    together.
+"""
+from threading import local
+
+from slumber._caches import CLIENT_INSTANCE_CACHE
+from slumber.connector.batch import Batch
+from slumber.connector.json import from_json_data
+from slumber.connector.ua import post
+
+
+# Holds the unit of work that is active in each thread
+_ACTIVE = local()
+
+
+def current():
+    """Return the unit of work that is active in this thread, or None.
+    """
+    return getattr(_ACTIVE, 'work', None)
+
+
+def _form_value(value):
+    """Return the form value used to send a change. Remote instances are
+    sent as their primary key and None as an empty value.
+    """
+    # We're inside Slumber so the private access is ok.
+    # pylint: disable=W0212
+    if value is None:
+        return ''
+    elif hasattr(type(value), '_fetch_instance'):
+        return value._url.rstrip('/').split('/')[-1]
+    return unicode(value)
+
+
+class UnitOfWork(object):
+    """Tracks the fields that are changed on remote instances while it is
+    active and then saves only those fields. The updates for instances on
+    the directory's server are sent in one batch, in a transaction if asked
+    for. Updates for instances on other servers are sent after it, so the
+    unit of work is only atomic for each server. The instance data that
+    comes back replaces what the client had, so nothing needs to be fetched
+    again.
+
+        with client.unit_of_work():
+            pizza.name = 'Margherita'
+            shop.name = 'Pizza Place'
+    """
+    def __init__(self, directory, transaction=True):
+        self._directory = directory
+        self._transaction = transaction
+        # The changed fields and the proxies for each instance URL
+        self._changes, self._proxies = {}, {}
+        self._previous = None
+
+    def record(self, instance, name, value):
+        """Remember that a field of the instance has been changed.
+        """
+        # We're inside Slumber so the private access is ok.
+        # pylint: disable=W0212
+        self._changes.setdefault(instance._url, {})[name] = value
+        proxies = self._proxies.setdefault(instance._url, [])
+        if instance not in proxies:
+            proxies.append(instance)
+
+    def flush(self):
+        """Save all of the changes made so far. The batch for the
+        directory's server is sent first and then the updates for other
+        servers one at a time. Only the batch is atomic, so if something
+        fails then the changes already saved are forgotten and the rest
+        stay recorded.
+        """
+        if not self._changes:
+            return
+        batch = Batch(self._directory, self._transaction)
+        batched, others = [], []
+        for url, changes in self._changes.items():
+            index = url.rindex('/data/')
+            update = url[:index] + '/update/' + url[index + 6:]
+            params = dict([(k, _form_value(v)) for k, v in changes.items()])
+            if url.startswith(self._directory):
+                batched.append((url, batch.post(update, **params)))
+            else:
+                others.append((url, update, params))
+        if batched:
+            batch.send()
+            for url, result in batched:
+                self._saved(url, result.json)
+        for url, update, params in others:
+            self._saved(url, post(update, params)[1])
+
+    def _saved(self, url, json):
+        """Forget the changes for the instance now that they're saved and
+        put the instance data that came back into the client.
+        """
+        self._refresh(url, json)
+        del self._changes[url]
+        del self._proxies[url]
+
+    def _refresh(self, url, json):
+        """Put the instance data from an update into the client.
+        """
+        # We're inside Slumber so the private access is ok.
+        # pylint: disable=W0212
+        connectors = [p._instance for p in self._proxies[url]]
+        if CLIENT_INSTANCE_CACHE.has_key(url):
+            connectors.append(CLIENT_INSTANCE_CACHE[url])
+        fields = dict([(k, from_json_data(url, j))
+            for k, j in json['fields'].items()])
+        for connector in connectors:
+            for name, value in fields.items():
+                setattr(connector, name, value)
+            connector._data_arrays = json['data_arrays']
+        for proxy in self._proxies[url]:
+            proxy._display = json['display']
+
+    def __enter__(self):
+        self._previous = current()
+        _ACTIVE.work = self
+        return self
+
+    def __exit__(self, exception_type, _value, _traceback):
+        _ACTIVE.work = self._previous
+        if not exception_type:
+            self.flush()
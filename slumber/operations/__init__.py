@@ -3,6 +3,9 @@
 """
 from django.core.urlresolvers import reverse
 
+from slumber.server.routing import pin_session
+
+
 def _forbidden(_request, response, *_):
     """Return an error to say that the method type is not allowed.
     """
@@ -22,6 +25,8 @@ class ModelOperation(object):
         """Perform the requested operation in the server.
         """
         if request.method in ['GET', 'POST', 'PUT', 'DELETE']:
+            if request.method != 'GET':
+                pin_session(request)
             return getattr(self, request.method.lower(), _forbidden)(
                 request, response, *args)
         else:
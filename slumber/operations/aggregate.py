@@ -0,0 +1,70 @@
+"""
+    Implements aggregates (counts, sums etc.) over a model's instances.
+"""
+from django.db.models import DecimalField, FloatField, IntegerField
+try:
+    from django.db.models import Avg, Count, Max, Min, Sum
+    AGGREGATES = dict(count=Count, sum=Sum, min=Min, max=Max, avg=Avg)
+except ImportError:
+    # Django 1.0 has no aggregation support
+    AGGREGATES = {}
+
+from slumber.operations import ModelOperation
+from slumber.operations.bulk import bad_request
+from slumber.operations.query import build_filter, QueryError
+from slumber.server.routing import read_objects
+
+
+class AggregateInstances(ModelOperation):
+    """Calculates aggregates in the database. Each of the `count`, `sum`,
+    `min`, `max` and `avg` query parameters gives a comma separated list
+    of the fields to aggregate over. `count` may be empty to count the
+    instances. Only numeric fields can be summed or averaged. `group_by`
+    gives the fields to group on and any other query parameters are filter
+    lookups.
+    """
+    def _aggregates(self, request):
+        """Return the Django aggregates that the request asks for.
+        """
+        # We have to access _meta
+        # pylint: disable=W0212
+        fields = self.model.fields
+        aggregates = {}
+        for name, function in AGGREGATES.items():
+            for names in request.GET.getlist(name):
+                for field in names.split(','):
+                    if not field and name == 'count':
+                        aggregates['count'] = Count('pk')
+                    elif fields.has_key(field) and (
+                            name in ['count', 'min', 'max'] or isinstance(
+                                self.model.model._meta.get_field(field),
+                                (DecimalField, FloatField, IntegerField))):
+                        aggregates[str('%s__%s' % (field, name))] = \
+                            function(field)
+                    else:
+                        raise QueryError("Can't %s %s" % (name, field))
+        return aggregates
+
+    def get(self, request, response, _appname, _modelname):
+        """Run the aggregates, grouped if asked for, as a single query.
+        """
+        lookups = dict([(k, request.GET[k]) for k in request.GET.keys()
+            if k not in AGGREGATES.keys() + ['group_by', '_inline']])
+        group_by = [str(f) for f in
+            request.GET.get('group_by', '').split(',') if f]
+        try:
+            aggregates = self._aggregates(request)
+            query = read_objects(request, self.model.model).filter(
+                **build_filter(self.model, lookups))
+            for field in group_by:
+                if not self.model.fields.has_key(field):
+                    raise QueryError("Can't group by %s" % field)
+        except QueryError, error:
+            return bad_request(response, unicode(error))
+        if not aggregates:
+            return bad_request(response, "No aggregates were asked for")
+        if group_by:
+            response['groups'] = list(query.values(*group_by).annotate(
+                **aggregates).order_by(*group_by))
+        else:
+            response['aggregates'] = query.aggregate(**aggregates)
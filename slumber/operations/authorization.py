@@ -1,7 +1,12 @@
 """
     Implements authorization checks for users.
 """
+from django.http import HttpResponseNotModified
+from hashlib import md5
+from simplejson import dumps
+
 from slumber.operations import InstanceOperation
+from slumber.server.routing import read_objects
 
 
 class PermissionCheck(InstanceOperation):
@@ -11,8 +16,35 @@ class PermissionCheck(InstanceOperation):
         super(PermissionCheck, self).__init__(*args, **kwargs)
         self.regex = '([^/]+)/([^/]+)/'
 
-    def get(self, _request, response, _appname, _modelname, pk, permission):
+    def get(self, request, response, _appname, _modelname, pk, permission):
         """Implements the permission lookup.
         """
-        user = self.model.model.objects.get(pk=pk)
+        user = read_objects(request, self.model.model).get(pk=pk)
         response['is-allowed'] = user.has_perm(permission.replace('-', '.'))
+
+
+class UserPermissions(InstanceOperation):
+    """Returns all of a user's permissions so that a client can answer its
+    own permission checks. Any `permission` query parameters are also
+    checked with `has_perm`, which takes every authentication backend into
+    account. The response has an ETag so that HTTP caches and clients
+    other than Slumber's, which keeps the data for a fixed time, can
+    revalidate it.
+    """
+    def get(self, request, response, _appname, _modelname, pk):
+        """Implements the permission listing.
+        """
+        user = read_objects(request, self.model.model).get(pk=pk)
+        response['is_active'] = user.is_active
+        response['is_superuser'] = user.is_superuser
+        response['permissions'] = sorted(user.get_all_permissions())
+        checks = request.GET.getlist('permission')
+        if checks:
+            response['is-allowed'] = dict([(p, user.has_perm(p))
+                for p in checks])
+        etag = '"%s"' % md5(dumps(dict([(k, v)
+                for k, v in response.items() if k != '_meta']),
+            sort_keys=True)).hexdigest()
+        if request.META.get('HTTP_IF_NONE_MATCH', None) == etag:
+            return HttpResponseNotModified()
+        response['_meta']['headers'] = {'ETag': etag}
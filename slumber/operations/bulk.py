@@ -0,0 +1,95 @@
+"""
+    Helpers for the operations that work on many instances at once.
+"""
+from django.conf import settings
+from django.db import transaction
+from simplejson import loads
+
+from slumber.operations.query import build_filter, QueryError
+
+
+def bad_request(response, message):
+    """Mark the response as a bad request with the given reason.
+    """
+    response['_meta']['status'] = 400
+    response['_meta']['message'] = message
+
+
+def read_json_body(request):
+    """Return the JSON data that was sent as the request body. Returns None
+    if the body isn't valid JSON.
+    """
+    # Django 1.4 renamed raw_post_data
+    body = getattr(request, 'body', None) or request.raw_post_data
+    try:
+        return loads(body)
+    except ValueError:
+        return None
+
+
+def chunks(items):
+    """Split a list of items into lists no longer than the bulk chunk size.
+    """
+    size = getattr(settings, 'SLUMBER_BULK_CHUNK_SIZE', 500)
+    return [items[start:start + size]
+        for start in xrange(0, len(items), size)]
+
+
+def in_transaction(function, *args, **kwargs):
+    """Call the function inside a transaction that is committed if it
+    returns normally and rolled back if it throws. Inside a transaction
+    that is already being managed, such as a transactional batch, a
+    savepoint is used instead so that the outer transaction decides what
+    is committed.
+    """
+    if not transaction.is_managed():
+        return transaction.commit_on_success(function)(*args, **kwargs)
+    # Leaving commit_on_success would commit the outer transaction too
+    savepoint = transaction.savepoint()
+    # The error is re-raised once the savepoint has been rolled back
+    # pylint: disable=W0702
+    try:
+        result = function(*args, **kwargs)
+    except:
+        transaction.savepoint_rollback(savepoint)
+        raise
+    transaction.savepoint_commit(savepoint)
+    return result
+
+
+def has_listeners(signal, model):
+    """Return True if anything listens to the signal for the model. Receivers
+    that have `handles_bulk_updates` set are ignored because they listen to
+    the `bulk_updated` signal instead.
+    """
+    # Django's public API can't tell us which receivers there are
+    # pylint: disable=W0212
+    from django.dispatch.dispatcher import _make_id
+    return bool([r for r in signal._live_receivers(_make_id(model))
+        if not getattr(r, 'handles_bulk_updates', False)])
+
+
+def select_instances(model, request, response):
+    """Return the query set for the instances that the JSON body of a bulk
+    request describes, either through a list of primary keys or a filter,
+    together with the body. Returns None for the query set, and marks the
+    response as a bad request, if the request is invalid.
+    """
+    body = read_json_body(request)
+    if not isinstance(body, dict):
+        bad_request(response, "The request body must be a JSON object")
+        return None, body
+    if body.has_key('pks'):
+        if not isinstance(body['pks'], list):
+            bad_request(response, "The pks must be a list")
+            return None, body
+        return model.model.objects.filter(pk__in=body['pks']), body
+    elif body.get('filter', None):
+        try:
+            return model.model.objects.filter(
+                **build_filter(model, body['filter'])), body
+        except QueryError, error:
+            bad_request(response, unicode(error))
+            return None, body
+    bad_request(response, "Either pks or a filter must be given")
+    return None, body
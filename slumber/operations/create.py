@@ -1,7 +1,18 @@
 """
     Implements creation of an object.
 """
+try:
+    from django.core.exceptions import ValidationError
+except ImportError:
+    # Django 1.0 raises the validators' error
+    from django.core.validators import ValidationError
+from django.db.models import ForeignKey
+from django.db.models.fields import FieldDoesNotExist
+
 from slumber.operations import ModelOperation
+from slumber.operations.bulk import bad_request, read_json_body, chunks, \
+    in_transaction
+from slumber.server import get_slumber_root
 
 
 class CreateInstance(ModelOperation):
@@ -15,3 +26,74 @@ class CreateInstance(ModelOperation):
         instance.save()
         response['created'] = True
         response['pk'] = instance.pk
+
+
+class CreateInstances(ModelOperation):
+    """Allows many new instances to be created in one request. The request
+    body is a JSON list of objects describing the new instances. Foreign
+    keys are given as the primary key of the related instance.
+    """
+    def _build(self, values):
+        """Construct and validate a new instance. Returns the instance and
+        a dict of errors, one of which will be None.
+        """
+        # We have to access _meta
+        # pylint: disable=W0212
+        attributes = {}
+        for name, value in values.items():
+            try:
+                field = self.model.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                return None, {name: ['Not a field']}
+            if isinstance(field, ForeignKey):
+                attributes[field.attname] = value
+            else:
+                attributes[str(name)] = value
+        instance = self.model.model(**attributes)
+        if hasattr(instance, 'full_clean'):
+            # Fields that weren't given take their defaults, as they do for
+            # the single create, so only validate the ones we have
+            try:
+                instance.full_clean(exclude=[f.name
+                    for f in self.model.model._meta.fields
+                        if not values.has_key(f.name)])
+            except ValidationError, error:
+                return None, error.message_dict
+        return instance, None
+
+    def post(self, request, response, _appname, _modelname):
+        """Validate and then create the instances in batches.
+        """
+        items = read_json_body(request)
+        if not isinstance(items, list) or \
+                [i for i in items if not isinstance(i, dict)]:
+            return bad_request(response,
+                "The request body must be a JSON list of objects")
+        response['created'], response['errors'] = [], []
+        valid = []
+        for index, values in enumerate(items):
+            instance, errors = self._build(values)
+            if errors:
+                response['errors'].append(dict(index=index, errors=errors))
+            else:
+                valid.append((index, instance))
+        def save(chunk):
+            """Save a batch of instances.
+            """
+            for _, instance in chunk:
+                instance.save()
+        root = get_slumber_root()
+        for chunk in chunks(valid):
+            try:
+                in_transaction(save, chunk)
+            # Any database error fails the whole batch
+            # pylint: disable=W0703
+            except Exception, error:
+                response['errors'] += [dict(index=index,
+                        errors={'__all__': [unicode(error)]})
+                    for index, _ in chunk]
+                continue
+            response['created'] += [dict(index=index, pk=instance.pk,
+                    display=unicode(instance),
+                    identity=root + self.model.path + 'data/%s/' % instance.pk)
+                for index, instance in chunk]
@@ -1,7 +1,8 @@
 """
     Implements creation of an object.
 """
-from slumber.operations import InstanceOperation
+from slumber.operations import InstanceOperation, ModelOperation
+from slumber.operations.bulk import chunks, in_transaction, select_instances
 
 
 class DeleteInstance(InstanceOperation):
@@ -13,3 +14,24 @@ class DeleteInstance(InstanceOperation):
         instance = self.model.model.objects.get(pk=pk)
         instance.delete()
         response['deleted'] = True
+
+
+class DeleteInstances(ModelOperation):
+    """Removes many instances. The request body is a JSON object with either
+    a list of `pks` or a `filter` to choose the instances.
+    """
+    def post(self, request, response, _appname, _modelname):
+        """Delete the instances in batches. Django takes care of the related
+        instances and the delete signals.
+        """
+        query, _ = select_instances(self.model, request, response)
+        if query is None:
+            return
+        def delete(pks):
+            """Delete a batch of instances.
+            """
+            self.model.model.objects.filter(pk__in=pks).delete()
+        pks = list(query.values_list('pk', flat=True))
+        for chunk in chunks(pks):
+            in_transaction(delete, chunk)
+        response['deleted'] = len(pks)
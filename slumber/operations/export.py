@@ -0,0 +1,69 @@
+"""
+    Implements a streaming export of all of a model's instances.
+"""
+from django.conf import settings
+from django.http import HttpResponse
+from simplejson import dumps
+
+from slumber.operations import ModelOperation
+from slumber.operations.bulk import bad_request
+from slumber.operations.query import build_filter, QueryError
+from slumber.server import get_slumber_root
+from slumber.server.http import _proxyEncoder
+from slumber.server.json import to_json_data
+from slumber.server.routing import read_objects
+
+try:
+    from django.http import StreamingHttpResponse
+except ImportError:
+    # Before Django 1.5 a normal response can be given an iterator
+    StreamingHttpResponse = HttpResponse
+
+
+class ExportInstances(ModelOperation):
+    """Streams the full data of every instance (or those matching the filter
+    lookups in the query string) as newline delimited JSON. The instances
+    are read in primary key order one batch at a time so the server's
+    memory use doesn't depend on the size of the table.
+    """
+    def _lines(self, query):
+        """Generate the JSON lines for the instances.
+        """
+        root = get_slumber_root()
+        fields = self.model.fields
+        size = getattr(settings, 'SLUMBER_EXPORT_CHUNK_SIZE', 1000)
+        related = [str(f) for f, m in fields.items() if m['kind'] == 'object']
+        if related:
+            query = query.select_related(*related)
+        last = None
+        while True:
+            batch = query.order_by('pk')
+            if last is not None:
+                batch = batch.filter(pk__gt=last)
+            count = 0
+            for instance in batch[:size].iterator():
+                count, last = count + 1, instance.pk
+                yield dumps(dict(
+                        identity=root + self.model.path +
+                            'data/%s/' % instance.pk,
+                        display=unicode(instance),
+                        fields=dict([(field, dict(
+                                data=to_json_data(self.model, instance,
+                                    field, meta),
+                                kind=meta['kind'], type=meta['type']))
+                            for field, meta in fields.items()])),
+                    cls=_proxyEncoder) + '\n'
+            if count < size:
+                break
+
+    def get(self, request, response, _appname, _modelname):
+        """Start the export.
+        """
+        try:
+            query = read_objects(request, self.model.model).filter(
+                **build_filter(self.model, dict([(k, request.GET[k])
+                    for k in request.GET.keys() if k != '_inline'])))
+        except QueryError, error:
+            return bad_request(response, unicode(error))
+        return StreamingHttpResponse(self._lines(query),
+            'application/x-ndjson')
@@ -3,19 +3,20 @@
 """
 from django.core.urlresolvers import reverse
 
-from slumber._caches import DJANGO_MODEL_TO_SLUMBER_MODEL
 from slumber.operations import InstanceOperation
+from slumber.server import get_slumber_model
 from slumber.server.json import to_json_data
+from slumber.server.routing import read_objects
 
 
 class InstanceData(InstanceOperation):
     """Return the instance data.
     """
-    def get(self, _request, response, _appname, _modelname, pk):
+    def get(self, request, response, _appname, _modelname, pk):
         """Implement the fetching of attribute data for an instance.
         """
         root = reverse('slumber.server.views.get_applications')
-        instance = self.model.model.objects.get(pk=pk)
+        instance = read_objects(request, self.model.model).get(pk=pk)
         response['identity'] = root + self.model.path + \
             '%s/%s/' % (self.name, instance.pk)
         response['display'] = unicode(instance)
@@ -45,7 +46,7 @@ class InstanceDataArray(InstanceOperation):
         """Return one page of the array data.
         """
         root = reverse('slumber.server.views.get_applications')
-        instance = self.model.model.objects.get(pk=pk)
+        instance = read_objects(request, self.model.model).get(pk=pk)
         response['instance'] = root + self.model.path + '%s/%s/%s/' % (
             self.name, str(pk), self.field)
 
@@ -59,7 +60,7 @@ class InstanceDataArray(InstanceOperation):
 
         response['page'] = []
         for obj in query[:10]:
-            model = DJANGO_MODEL_TO_SLUMBER_MODEL[type(obj)]
+            model = get_slumber_model(type(obj))
             response['page'].append(dict(
                     type=root + model.path,
                     pk=obj.pk, display=unicode(obj),
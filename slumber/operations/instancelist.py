@@ -3,6 +3,7 @@
 """
 from slumber.operations import ModelOperation
 from slumber.server import get_slumber_root
+from slumber.server.routing import read_objects
 
 
 class InstanceList(ModelOperation):
@@ -14,7 +15,7 @@ class InstanceList(ModelOperation):
         root = get_slumber_root()
         response['model'] = root + self.model.path
 
-        query = self.model.model.objects.order_by('-pk')
+        query = read_objects(request, self.model.model).order_by('-pk')
         if request.GET.has_key('start_after'):
             query = query.filter(pk__lt=request.GET['start_after'])
 
@@ -0,0 +1,93 @@
+"""
+    Builds database queries from the filters that clients send. Only a
+    whitelisted set of lookups on the model's own fields is allowed.
+"""
+try:
+    from django.core.exceptions import ValidationError
+except ImportError:
+    # Django 1.0 raises the validators' error
+    from django.core.validators import ValidationError
+from django.db.models.fields import FieldDoesNotExist
+
+
+# The lookups that a client may use
+LOOKUPS = ['exact', 'iexact', 'contains', 'icontains',
+    'startswith', 'istartswith', 'endswith', 'iendswith',
+    'gt', 'gte', 'lt', 'lte', 'in', 'isnull']
+# The lookups whose values are converted to the field's type. The others
+# match text
+_CONVERTED = ['exact', 'gt', 'gte', 'lt', 'lte', 'in']
+
+
+class QueryError(Exception):
+    """Raised when a client asks for a query that isn't allowed.
+    """
+
+
+def _convert(model, name, value):
+    """Convert a value from the query string to the type of the named field.
+    Foreign keys are given as the primary key of the related instance.
+    """
+    # We have to access _meta
+    # pylint: disable=W0212
+    if name == 'pk':
+        field = model.model._meta.pk
+    else:
+        field = model.model._meta.get_field(name)
+    if getattr(field, 'rel', None):
+        field = field.rel.get_related_field()
+    try:
+        return field.to_python(value)
+    except ValidationError, error:
+        raise QueryError("%s: %s" % (name, '; '.join(error.messages)))
+
+
+def build_filter(model, lookups):
+    """Convert the client's lookups (a dict of `field__lookup` to value) for
+    the Slumber model into keyword arguments for `QuerySet.filter`. The
+    values are converted to the field's type so that, for example, 'False'
+    matches false values.
+    """
+    fields = model.fields
+    query = {}
+    for key, value in lookups.items():
+        parts = key.split('__')
+        if len(parts) == 1:
+            parts.append('exact')
+        if len(parts) != 2 or parts[1] not in LOOKUPS or \
+                (parts[0] != 'pk' and not fields.has_key(parts[0])):
+            raise QueryError("The filter %s is not allowed" % key)
+        if parts[1] == 'in' and not isinstance(value, list):
+            value = unicode(value).split(',')
+        elif parts[1] == 'isnull' and not isinstance(value, bool):
+            value = unicode(value).lower() in ['1', 'true']
+        if parts[1] == 'in':
+            value = [_convert(model, parts[0], v) for v in value]
+        elif parts[1] in _CONVERTED:
+            value = _convert(model, parts[0], value)
+        query[str(key)] = value
+    return query
+
+
+def build_ordering(model, names):
+    """Check the ordering the client asked for only uses indexed fields and
+    return it with the primary key added so that the order is stable.
+    """
+    # We have to access _meta
+    # pylint: disable=W0212
+    ordering = []
+    for name in names:
+        field_name = name.lstrip('-')
+        if field_name != 'pk':
+            try:
+                field = model.model._meta.get_field(field_name)
+            except FieldDoesNotExist:
+                field = None
+            if not field or not (
+                    field.primary_key or field.unique or field.db_index):
+                raise QueryError("Can't order by %s" % name)
+        ordering.append(str(name))
+    if not [n for n in ordering if n.lstrip('-') in ['pk',
+            model.model._meta.pk.name]]:
+        ordering.append('pk')
+    return ordering
@@ -2,25 +2,72 @@
     Allows the data URL to be found for a given object.
 """
 from django.http import HttpResponseRedirect, HttpResponseNotFound
+from urllib import urlencode
 
 from slumber.operations import ModelOperation
+from slumber.operations.bulk import bad_request
+from slumber.operations.instancedata import InstanceData
+from slumber.operations.query import build_filter, build_ordering, QueryError
 from slumber.server import get_slumber_root
+from slumber.server.http import wants_inline
+from slumber.server.routing import read_objects
 
 
 class DereferenceInstance(ModelOperation):
     """Given a primary key (or other unique set of attributes) redirects
     to the instance item.
     """
-    def get(self, request, _response, _appname, _modelname):
+    def get(self, request, response, appname, modelname):
         """Work out the correct data URL for an instance we're going to
         search for.
         """
         root = get_slumber_root()
         try:
-            instance = self.model.model.objects.get(
+            instance = read_objects(request, self.model.model).get(
                 **dict([(k, request.GET[k])
-                    for k in request.GET.keys()]))
+                    for k in request.GET.keys() if k != '_inline']))
+            if wants_inline(request):
+                return InstanceData(self.model, 'data').get(
+                    request, response, appname, modelname, instance.pk)
             return HttpResponseRedirect(
                 root + self.model.path + 'data/%s/' % instance.pk)
         except self.model.model.DoesNotExist:
             return HttpResponseNotFound()
+
+
+class FilterInstances(ModelOperation):
+    """Returns a page of the instances that match a filter. Any query
+    parameters other than `order_by`, `start` and `limit` are filter
+    lookups. Ordering is only allowed on indexed fields.
+    """
+    def get(self, request, response, _appname, _modelname):
+        """Return a page of the matching instances.
+        """
+        root = get_slumber_root()
+        response['model'] = root + self.model.path
+        lookups = dict([(k, request.GET[k]) for k in request.GET.keys()
+            if k not in ['order_by', 'start', 'limit', '_inline']])
+        try:
+            start = int(request.GET.get('start', 0))
+            limit = min(int(request.GET.get('limit', 10)), 100)
+            if start < 0 or limit < 1:
+                raise QueryError("The start can't be negative and the "
+                    "limit must be positive")
+            query = read_objects(request, self.model.model).filter(
+                **build_filter(self.model, lookups)).order_by(
+                *build_ordering(self.model, [o for o in
+                    request.GET.get('order_by', '').split(',') if o]))
+        except (QueryError, ValueError), error:
+            return bad_request(response, unicode(error))
+        # Fetch one more than we need to find out if there's another page
+        instances = list(query[start:start + limit + 1])
+        response['page'] = [
+                dict(pk=o.pk, display=unicode(o),
+                    data=root + self.model.path + 'data/%s/' % o.pk)
+            for o in instances[:limit]]
+        if len(instances) > limit:
+            params = [(k, v) for k, v in request.GET.items() if k != 'start']
+            params.append(('start', start + limit))
+            response['next_page'] = root + self.model.path + \
+                '%s/?%s' % (self.name, urlencode(
+                    [(k, unicode(v).encode('utf-8')) for k, v in params]))
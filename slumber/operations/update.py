@@ -1,21 +1,118 @@
 """
     Implements updating of instances.
 """
+try:
+    from django.core.exceptions import ValidationError
+except ImportError:
+    # Django 1.0 raises the validators' error
+    from django.core.validators import ValidationError
+from django.db.models import ForeignKey, signals
+from django.db.models.fields import FieldDoesNotExist
 from django.http import HttpResponseRedirect
 
 from slumber.server import get_slumber_root
-from slumber.operations import InstanceOperation
+from slumber.server.http import wants_inline
+from slumber.server.signals import bulk_updated
+from slumber.operations import InstanceOperation, ModelOperation
+from slumber.operations.bulk import bad_request, chunks, has_listeners, \
+    in_transaction, select_instances
+from slumber.operations.instancedata import InstanceData
 
 
 class UpdateInstance(InstanceOperation):
     """Update the attributes of a given instance.
     """
-    def post(self, request, _response, _appname, _modelname, pk):
-        """Perform the update.
+    def post(self, request, response, appname, modelname, pk):
+        """Perform the update. Values for model fields are converted to the
+        field's type, with an empty value meaning None for nullable fields
+        and foreign keys given as the primary key.
         """
+        # We have to access _meta
+        # pylint: disable=W0212
         instance = self.model.model.objects.get(pk=pk)
         for k, v in request.POST.items():
-            setattr(instance, k, v)
+            try:
+                field = self.model.model._meta.get_field(k)
+            except FieldDoesNotExist:
+                setattr(instance, k, v)
+                continue
+            try:
+                value = None if v == '' and field.null else field.to_python(v)
+            except ValidationError, error:
+                return bad_request(response, "%s: %s" % (k,
+                    '; '.join(error.messages)))
+            setattr(instance, field.attname, value)
         instance.save()
+        if wants_inline(request):
+            return InstanceData(self.model, 'data').get(
+                request, response, appname, modelname, instance.pk)
         return HttpResponseRedirect(
             get_slumber_root() + self.model.path + 'data/%s/' % instance.pk)
+
+
+class UpdateInstances(ModelOperation):
+    """Apply the same changes to many instances. The request body is a JSON
+    object with the `changes` to make and either a list of `pks` or a
+    `filter` to choose the instances.
+    """
+    def _fields(self, changes):
+        """Return the model fields that are to be changed, or None if any
+        of them can't be.
+        """
+        # We have to access _meta
+        # pylint: disable=W0212
+        fields = []
+        for name in changes.keys():
+            try:
+                field = self.model.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                return None
+            if field.primary_key:
+                return None
+            fields.append(field)
+        return fields
+
+    def post(self, request, response, _appname, _modelname):
+        """Perform the update as a single query if nothing needs to see the
+        instances being saved, otherwise save them in batches.
+        """
+        query, body = select_instances(self.model, request, response)
+        if query is None:
+            return
+        changes = body.get('changes', None)
+        fields = self._fields(changes) \
+            if isinstance(changes, dict) and changes else None
+        if not fields:
+            return bad_request(response,
+                "The changes must be given and can only be to non-key fields")
+        if has_listeners(signals.pre_save, self.model.model) or \
+                has_listeners(signals.post_save, self.model.model):
+            def save(pks):
+                """Save the changes to a batch of instances.
+                """
+                for instance in self.model.model.objects.filter(pk__in=pks):
+                    for field in fields:
+                        setattr(instance, field.attname
+                                if isinstance(field, ForeignKey)
+                                else field.name,
+                            changes[field.name])
+                    instance.save()
+            pks = list(query.values_list('pk', flat=True))
+            for chunk in chunks(pks):
+                in_transaction(save, chunk)
+            response['updated'] = len(pks)
+        elif bulk_updated.receivers:
+            # The receivers need to know which instances changed
+            def update(pks):
+                """Update a batch of instances.
+                """
+                self.model.model.objects.filter(pk__in=pks).update(
+                    **dict([(str(k), v) for k, v in changes.items()]))
+                bulk_updated.send(sender=self.model.model, pks=pks)
+            pks = list(query.values_list('pk', flat=True))
+            for chunk in chunks(pks):
+                in_transaction(update, chunk)
+            response['updated'] = len(pks)
+        else:
+            response['updated'] = in_transaction(query.update,
+                **dict([(str(k), v) for k, v in changes.items()]))
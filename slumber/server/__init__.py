@@ -3,8 +3,26 @@
 """
 from django.core.urlresolvers import reverse
 
+from slumber._caches import DJANGO_MODEL_TO_SLUMBER_MODEL
+
 
 def get_slumber_root():
     """Returns the location of the Slumber on this server.
     """
     return reverse('slumber.server.views.get_applications')
+
+
+def get_slumber_model(django_model):
+    """Returns the Slumber model wrapper for a Django model. The model
+    wrappers are only built when an application's models are first used so
+    this may need to build them. Returns None if the model's application
+    isn't exposed through Slumber.
+    """
+    if not DJANGO_MODEL_TO_SLUMBER_MODEL.has_key(django_model):
+        # Importing here avoids a circular import
+        from slumber.server.meta import applications
+        for app in applications():
+            if app.models and \
+                    DJANGO_MODEL_TO_SLUMBER_MODEL.has_key(django_model):
+                break
+    return DJANGO_MODEL_TO_SLUMBER_MODEL.get(django_model, None)
@@ -5,17 +5,33 @@ from slumber.server.model import DjangoModel
 
 
 class DjangoApp(object):
-    """Describes a Django application.
+    """Describes a Django application. The application's models are only
+    imported when they are first needed.
     """
     def __init__(self, appname):
-        self.name = appname
+        self.name = appname.replace('/', '.')
         self.path = appname.replace('.', '/')
-        self.module = __import__(appname.replace('/', '.'), globals(), locals(),
-            ['models'])
-        self.models = {}
-        if hasattr(self.module, 'models'):
-            for name in self.module.models.__dict__.keys():
-                potential = getattr(self.module.models, name)
-                if hasattr(potential, '_meta'):
-                    model = DjangoModel(self, potential)
-                    self.models[name] = model
+        self._module, self._models = None, None
+
+    @property
+    def module(self):
+        """The Python module for the application.
+        """
+        if not self._module:
+            self._module = __import__(self.name, globals(), locals(),
+                ['models'])
+        return self._module
+
+    @property
+    def models(self):
+        """The Slumber model wrappers for the application's models.
+        """
+        if self._models is None:
+            self._models = {}
+            if hasattr(self.module, 'models'):
+                for name in self.module.models.__dict__.keys():
+                    potential = getattr(self.module.models, name)
+                    if hasattr(potential, '_meta'):
+                        model = DjangoModel(self, potential)
+                        self._models[name] = model
+        return self._models
@@ -0,0 +1,138 @@
+"""
+    Allows many Slumber requests to be made in a single HTTP request.
+"""
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.http import HttpRequest, QueryDict
+from simplejson import dumps
+from urlparse import parse_qs
+
+from slumber.operations.bulk import bad_request, in_transaction, \
+    read_json_body
+from slumber.server import get_slumber_root
+from slumber.server.http import view_handler
+from slumber.server.instrumentation import observe
+from slumber.server.signals import operation_performed
+from slumber.server.views import find_view
+
+
+class _Rollback(Exception):
+    """Used to roll back a transaction when a request in it fails.
+    """
+
+
+def _query_dict(params):
+    """Build a QueryDict from a dict whose values may be lists.
+    """
+    query = QueryDict('', mutable=True)
+    for key, value in params.items():
+        query.setlist(key, value if isinstance(value, list) else [value])
+    return query
+
+
+def _sub_request(request, method, path, params, body):
+    """Build the request object for one of the requests in the batch.
+    """
+    sub = HttpRequest()
+    sub.method = method
+    sub.path = sub.path_info = path
+    sub.META = dict(request.META, REQUEST_METHOD=method,
+        HTTP_X_SLUMBER_INLINE='1')
+    if method == 'GET':
+        sub.GET, sub.POST = _query_dict(params), QueryDict('')
+    else:
+        sub.GET, sub.POST = QueryDict(''), _query_dict(params)
+    # The name of the attribute Django reads the body from has changed
+    # between versions
+    # pylint: disable=W0201
+    sub._raw_post_data = sub._body = '' if body is None else dumps(body)
+    return sub
+
+
+def _call(view, sub, response, args):
+    """Call the view for one of the requests in the batch, putting the
+    status of anything that goes wrong into its response.
+    """
+    try:
+        http_response = view.view(sub, response, *args)
+    except ObjectDoesNotExist, error:
+        response['_meta'].update(status=404, message=unicode(error))
+        return response
+    except ValueError, error:
+        # Values that can't be converted, like a primary key that isn't a
+        # number
+        response['_meta'].update(status=400, message=unicode(error))
+        return response
+    # One failed request mustn't lose the responses to the ones before it
+    # pylint: disable=W0703
+    except Exception, error:
+        # The database connection may not be usable until the failed
+        # statement is rolled back. In a transaction the whole batch is
+        transaction.rollback_unless_managed()
+        response['_meta'].update(status=500, message=unicode(error))
+        return response
+    if http_response:
+        response['_meta']['status'] = http_response.status_code
+        if http_response.has_header('Location'):
+            response['_meta']['location'] = http_response['Location']
+    return response
+
+
+def _perform(request, item):
+    """Perform one of the requests from the batch and return its response.
+    An error is reported in the response's status rather than failing the
+    whole batch. Each request is measured for `operation_performed`, but
+    its size isn't known because it is part of the batch's response.
+    """
+    response = {'_meta': dict(status=200, message='OK')}
+    root = get_slumber_root()
+    path, _, query = item.get('path', '').partition('?')
+    params = parse_qs(query)
+    params.update(item.get('params', {}))
+    if not path.startswith(root):
+        path = root + path.lstrip('/')
+    view, args = find_view(path[len(root):])
+    if not view:
+        response['_meta'].update(status=404, message='Not found')
+        return response
+    sub = _sub_request(request, item.get('method', 'GET').upper(),
+        path, params, item.get('body', None))
+    if not operation_performed.receivers:
+        return _call(view, sub, response, args)
+    return observe(lambda: _call(view, sub, response, args), view.view,
+        view.operation, sub.method,
+        lambda result: (result['_meta']['status'], None))
+
+
+@view_handler
+def batch(request, response):
+    """Perform all of the requests given in the JSON body and return their
+    responses in the same order. If `transaction` is true then they are all
+    done inside a single transaction which is rolled back if any of them
+    fail.
+    """
+    if request.method != 'POST':
+        response['_meta']['status'] = 403
+        return
+    body = read_json_body(request)
+    if not isinstance(body, dict) or \
+            not isinstance(body.get('requests', None), list):
+        return bad_request(response,
+            "The request body must be a JSON object with a list of requests")
+    def perform():
+        """Perform each request in turn.
+        """
+        response['responses'] = []
+        for item in body['requests']:
+            response['responses'].append(_perform(request, item))
+            if body.get('transaction', False) and \
+                    response['responses'][-1]['_meta']['status'] != 200:
+                raise _Rollback()
+    if body.get('transaction', False):
+        try:
+            in_transaction(perform)
+        except _Rollback:
+            response['_meta'].update(status=409,
+                message="A request failed so the transaction was rolled back")
+    else:
+        perform()
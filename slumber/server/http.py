@@ -6,6 +6,10 @@ from simplejson import dumps, JSONEncoder
 
 from django.http import HttpResponse
 
+from slumber.server import profiling
+from slumber.server.instrumentation import measure
+from slumber.server.signals import operation_performed
+
 
 class _proxyEncoder(JSONEncoder):
     """If we don't know how to deal with the attribute type we'll just
@@ -17,18 +21,49 @@ class _proxyEncoder(JSONEncoder):
         return unicode(obj)
 
 
-def view_handler(view):
+def wants_inline(request):
+    """Return True if the client has asked for the body of the resource that
+    would otherwise be the target of a redirect. This saves the client a
+    second round trip.
+    """
+    return request.META.has_key('HTTP_X_SLUMBER_INLINE') or \
+        request.GET.has_key('_inline')
+
+
+def view_handler(view, operation=None):
     """Wrap a view function so it can return either JSON, HTML or some
-    other response.
+    other response. Any `headers` the view puts in the `_meta` are sent as
+    HTTP headers. If anything is connected to `operation_performed` then
+    it is sent after each request, with the names taken from the Slumber
+    operation if there is one. Requests picked by `slumber.server.profiling`
+    are run under the profiler.
     """
-    def wrapper(request, *args, **kwargs):
+    def handle(request, *args, **kwargs):
         """The decorated implementation.
         """
         response = {'_meta': dict(status=200, message='OK')}
         http_response = view(request, response, *args, **kwargs)
         if http_response:
             return http_response
-        return HttpResponse(dumps(response, indent=4,
+        headers = response['_meta'].pop('headers', {})
+        http_response = HttpResponse(dumps(response, indent=4,
                 cls=_proxyEncoder), 'text/plain',
             status=response['_meta']['status'])
+        for header, value in headers.items():
+            http_response[header] = value
+        return http_response
+    def wrapper(request, *args, **kwargs):
+        """Profile the request if it's wanted and measure it if anything
+        wants to know about it.
+        """
+        handler = handle
+        if profiling.ENABLED:
+            reason = profiling.wanted(request)
+            if reason:
+                handler = profiling.profiled(handle, view, operation, reason)
+        if not operation_performed.receivers:
+            return handler(request, *args, **kwargs)
+        return measure(handler, view, operation, request, args, kwargs)
+    # Allows the view to be called without the HTTP conversion
+    wrapper.view, wrapper.operation = view, operation
     return wrapper
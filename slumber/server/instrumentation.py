@@ -0,0 +1,85 @@
+"""
+    Measures the Slumber requests for the `operation_performed` signal.
+"""
+from django.conf import settings
+
+from time import time
+
+try:
+    from django.db import connections
+    _connections = connections.all
+except ImportError:
+    # Django 1.0 only has one database
+    from django.db import connection
+    _connections = lambda: [connection]
+
+from slumber.server.signals import operation_performed
+
+
+def _size(response):
+    """Return the size of the response body, or None if it is streamed.
+    """
+    # The attributes that tell us if the response is streamed are private
+    # before Django 1.5
+    # pylint: disable=W0212
+    if getattr(response, 'streaming', False) or \
+            not getattr(response, '_is_string', True):
+        return None
+    return len(response.content)
+
+
+def _send(view, operation, method, status, duration, queries, size):
+    """Send `operation_performed`. The view is used for the name when there
+    is no operation.
+    """
+    if operation:
+        sender, app, model, name = operation.model.model, \
+            operation.model.app.name, operation.model.name, operation.name
+    else:
+        sender, app, model, name = None, None, None, view.__name__
+    operation_performed.send(sender=sender, app=app, model=model,
+        operation=name, method=method, status=status, duration=duration,
+        queries=queries, size=size)
+
+
+def observe(call, view, operation, method, outcome):
+    """Make the call and send `operation_performed` with the measurements.
+    `outcome` is given the call's result and returns the status and size.
+    If the call raises then a 500 is sent before the error is re-raised.
+    The SQL queries are counted by turning on the debug cursor for the
+    duration, which needs Django 1.2 or later.
+    """
+    debug = [(db, db.use_debug_cursor, len(db.queries))
+        for db in _connections() if hasattr(db, 'use_debug_cursor')]
+    for db, _, _ in debug:
+        db.use_debug_cursor = True
+    start = time()
+    try:
+        try:
+            result = call()
+        finally:
+            duration = time() - start
+            queries = 0
+            for db, previous, count in debug:
+                queries += len(db.queries) - count
+                db.use_debug_cursor = previous
+                if not (previous or (previous is None and settings.DEBUG)):
+                    # Don't keep the queries if they wouldn't have been kept
+                    del db.queries[count:]
+    # The error is re-raised once it has been reported
+    # pylint: disable=W0702
+    except:
+        _send(view, operation, method, 500, duration, queries, None)
+        raise
+    status, size = outcome(result)
+    _send(view, operation, method, status, duration, queries, size)
+    return result
+
+
+def measure(handler, view, operation, request, args, kwargs):
+    """Call the handler for the request and send `operation_performed`
+    with the measurements.
+    """
+    return observe(lambda: handler(request, *args, **kwargs), view,
+        operation, request.method,
+        lambda response: (response.status_code, _size(response)))
@@ -3,7 +3,7 @@
 """
 from django.core.urlresolvers import reverse
 
-from slumber._caches import DJANGO_MODEL_TO_SLUMBER_MODEL
+from slumber.server import get_slumber_model
 
 
 DATA_MAPPING = {
@@ -22,7 +22,7 @@ def to_json_data(model, instance, fieldname, fieldmeta):
         if value is None:
             return None
         else:
-            rel_to = DJANGO_MODEL_TO_SLUMBER_MODEL[type(value)]
+            rel_to = get_slumber_model(type(value))
             root = reverse('slumber.server.views.get_applications')
             return dict(type=root + rel_to.path,
                 display=unicode(value),
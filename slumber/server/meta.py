@@ -3,17 +3,29 @@
 """
 from django.conf import settings
 
+from slumber._caches import APP_PATH_TO_SLUMBER_APP
 from slumber.server.application import DjangoApp
 
 
+# Slumber's own applications are never exposed
+_INTERNAL_APPS = ['slumber.changes']
+
+
 def applications():
-    """Return the Django application wrappers for all installed apps.
+    """Return the Django application wrappers for all of the apps that
+    Slumber exposes. This is all installed apps unless SLUMBER_APPS is set.
     """
-    return [get_application(app) for app in settings.INSTALLED_APPS]
+    return [get_application(app) for app in
+        getattr(settings, 'SLUMBER_APPS', settings.INSTALLED_APPS)
+            if app not in _INTERNAL_APPS]
 
 
 def get_application(app_name):
-    """Build a Django application wrapper around an application given
-    by its name.
+    """Return the Django application wrapper around an application given
+    by its name or path. The wrapper is only built the first time.
     """
-    return DjangoApp(app_name)
+    path = app_name.replace('.', '/')
+    app = APP_PATH_TO_SLUMBER_APP.get(path, None)
+    if not app:
+        app = APP_PATH_TO_SLUMBER_APP[path] = DjangoApp(app_name)
+    return app
@@ -0,0 +1,213 @@
+"""
+    Keeps request metrics for every Slumber operation and serves them in
+    the Prometheus text format. Turn them on with `SLUMBER_METRICS=True`.
+"""
+from django.conf import settings
+from django.http import HttpResponse, Http404
+
+from bisect import bisect_left
+from threading import local, Lock
+from weakref import ref
+
+from slumber.server.signals import operation_performed
+
+
+# The upper bounds of the latency histogram buckets in seconds
+BUCKETS = sorted(getattr(settings, 'SLUMBER_METRICS_BUCKETS',
+    [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]))
+
+# Each thread counts into its own shard so that recording a request never
+# waits for a lock. The shards are added together when the metrics are read.
+# They are keyed by a weak reference to an object that only the thread holds
+# so that when the thread ends its counts move into the retired totals
+_LOCAL = local()
+_SHARDS = {}
+_RETIRED = {}
+_SHARDS_LOCK = Lock()
+
+
+class _Series(object):
+    """The counts for one application, model, operation and method in one
+    shard.
+    """
+    __slots__ = ('count', 'duration', 'buckets', 'statuses', 'errors',
+        'queries', 'size', 'sized')
+
+    def __init__(self):
+        self.count, self.duration, self.errors, self.queries = 0, 0.0, 0, 0
+        self.size, self.sized = 0, 0
+        # One more bucket than bounds for the durations above them all
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.statuses = {}
+
+
+class _Owner(object):
+    """Held only by a thread's local storage so that we find out when the
+    thread has gone.
+    """
+
+
+def _retire(owner):
+    """Move a finished thread's counts into the retired totals.
+    """
+    _SHARDS_LOCK.acquire()
+    try:
+        shard = _SHARDS.pop(owner, None)
+        if shard:
+            _add(_RETIRED, shard)
+    finally:
+        _SHARDS_LOCK.release()
+
+
+def _shard():
+    """Return this thread's shard.
+    """
+    try:
+        return _LOCAL.shard
+    except AttributeError:
+        shard = _LOCAL.shard = {}
+        owner = _LOCAL.owner = _Owner()
+        _SHARDS_LOCK.acquire()
+        try:
+            _SHARDS[ref(owner, _retire)] = shard
+        finally:
+            _SHARDS_LOCK.release()
+        return shard
+
+
+def collect(sender, app, model, operation, method, status, duration,
+        queries, size, **_kwargs):
+    """Record a request. This is connected to `operation_performed`.
+    """
+    # The sender is part of the signal API
+    # pylint: disable=W0613
+    shard = _shard()
+    key = (app or '', model or '', operation, method)
+    series = shard.get(key, None)
+    if series is None:
+        series = shard[key] = _Series()
+    series.count += 1
+    series.duration += duration
+    series.buckets[bisect_left(BUCKETS, duration)] += 1
+    series.statuses[status] = series.statuses.get(status, 0) + 1
+    if status >= 400:
+        series.errors += 1
+    series.queries += queries
+    if size is not None:
+        series.size += size
+        series.sized += 1
+
+
+def reset():
+    """Throw away everything that has been recorded.
+    """
+    _SHARDS_LOCK.acquire()
+    try:
+        for shard in _SHARDS.values():
+            shard.clear()
+        _RETIRED.clear()
+    finally:
+        _SHARDS_LOCK.release()
+
+
+def _add(result, shard):
+    """Add the counts in the shard into the result.
+    """
+    for key, series in shard.items():
+        total = result.get(key, None)
+        if total is None:
+            total = result[key] = _Series()
+        total.count += series.count
+        total.duration += series.duration
+        total.errors += series.errors
+        total.queries += series.queries
+        total.size += series.size
+        total.sized += series.sized
+        for index, count in enumerate(series.buckets):
+            total.buckets[index] += count
+        for status, count in series.statuses.items():
+            total.statuses[status] = total.statuses.get(status, 0) + count
+
+
+def totals():
+    """Return the counts for each series added up over all of the shards
+    and the threads that have finished.
+    """
+    result = {}
+    _SHARDS_LOCK.acquire()
+    try:
+        shards = _SHARDS.values()
+        _add(result, _RETIRED)
+    finally:
+        _SHARDS_LOCK.release()
+    for shard in shards:
+        _add(result, shard)
+    return result
+
+
+def _labels(key, **extra):
+    """Format the labels for a series.
+    """
+    pairs = zip(('app', 'model', 'operation', 'method'), key) + \
+        sorted(extra.items())
+    return '{%s}' % ','.join(['%s="%s"' % (name, unicode(value).replace(
+                '\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+            for name, value in pairs])
+
+
+def render():
+    """Return the metrics in the Prometheus text format.
+    """
+    series = sorted(totals().items())
+    lines = []
+    def metric(name, kind, description, samples):
+        """Add the lines for a metric.
+        """
+        lines.append('# HELP %s %s' % (name, description))
+        lines.append('# TYPE %s %s' % (name, kind))
+        lines.extend(['%s%s %s' % s for s in samples])
+    metric('slumber_requests_total', 'counter',
+        'Slumber requests by response status.',
+        [('slumber_requests_total', _labels(k, status=status), count)
+            for k, s in series for status, count in sorted(s.statuses.items())])
+    metric('slumber_errors_total', 'counter',
+        'Slumber requests with a 4xx or 5xx response.',
+        [('slumber_errors_total', _labels(k), s.errors) for k, s in series])
+    durations = []
+    for key, totalled in series:
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ['+Inf'], totalled.buckets):
+            cumulative += count
+            durations.append(('slumber_request_duration_seconds_bucket',
+                _labels(key, le=bound), cumulative))
+        durations.append(('slumber_request_duration_seconds_sum',
+            _labels(key), repr(totalled.duration)))
+        durations.append(('slumber_request_duration_seconds_count',
+            _labels(key), totalled.count))
+    metric('slumber_request_duration_seconds', 'histogram',
+        'How long Slumber requests take.', durations)
+    metric('slumber_queries_total', 'counter',
+        'SQL queries made by Slumber requests.',
+        [('slumber_queries_total', _labels(k), s.queries) for k, s in series])
+    sizes = []
+    for key, totalled in series:
+        sizes.append(('slumber_response_bytes_sum', _labels(key),
+            totalled.size))
+        sizes.append(('slumber_response_bytes_count', _labels(key),
+            totalled.sized))
+    metric('slumber_response_bytes', 'summary',
+        'The size of the Slumber response bodies that aren\'t streamed.',
+        sizes)
+    return '\n'.join(lines) + '\n'
+
+
+def get_metrics(_request):
+    """Serve the metrics.
+    """
+    if not getattr(settings, 'SLUMBER_METRICS', False):
+        raise Http404
+    return HttpResponse(render(), 'text/plain; version=0.0.4')
+
+
+if getattr(settings, 'SLUMBER_METRICS', False):
+    operation_performed.connect(collect, dispatch_uid='slumber.metrics')
@@ -1,19 +1,25 @@
 """
     Implements the server side wrapper for a Django model.
 """
+import re
+
 from django.db.models import ForeignKey
 from django.db.models.fields import FieldDoesNotExist
 
 from slumber._caches import DJANGO_MODEL_TO_SLUMBER_MODEL
+from slumber.operations.aggregate import AggregateInstances
 from slumber.operations.authenticate import AuthenticateUser
-from slumber.operations.authorization import PermissionCheck
-from slumber.operations.create import CreateInstance
-from slumber.operations.delete import DeleteInstance
+from slumber.operations.authorization import PermissionCheck, \
+    UserPermissions
+from slumber.operations.create import CreateInstance, CreateInstances
+from slumber.operations.delete import DeleteInstance, DeleteInstances
+from slumber.operations.export import ExportInstances
 from slumber.operations.instancedata import InstanceData, InstanceDataArray
 from slumber.operations.instancelist import InstanceList
-from slumber.operations.search import DereferenceInstance
-from slumber.operations.update import UpdateInstance
-from slumber.server import get_slumber_root
+from slumber.operations.search import DereferenceInstance, FilterInstances
+from slumber.operations.update import UpdateInstance, UpdateInstances
+from slumber.server import get_slumber_root, get_slumber_model
+from slumber.server.http import view_handler
 
 
 class DjangoModel(object):
@@ -27,6 +33,7 @@ class DjangoModel(object):
         self.path = app.path + '/' + self.name + '/'
 
         self._fields, self._data_arrays = {}, []
+        self._operations, self._handlers = None, None
 
     def _get_fields_and_data_arrays(self):
         """Work out what the fields we have are.
@@ -50,12 +57,15 @@ class DjangoModel(object):
         fields = {}
         for field, definition in self._fields.items():
             field_type = type(definition)
-            if field_type == ForeignKey:
+            # Foreign keys to models that aren't exposed are sent as the
+            # primary key value
+            rel_to = get_slumber_model(definition.rel.to) \
+                if field_type == ForeignKey else None
+            if rel_to:
                 fields[field] = dict(
                     name=field,
                     kind='object',
-                    type= get_slumber_root() +
-                        DJANGO_MODEL_TO_SLUMBER_MODEL[definition.rel.to].path,
+                    type= get_slumber_root() + rel_to.path,
                     verbose_name=definition.verbose_name)
             else:
                 type_name = field_type.__module__ + '.' + \
@@ -75,15 +85,46 @@ class DjangoModel(object):
     def operations(self):
         """Return all of  the operations available for this model.
         """
+        if self._operations is None:
+            self._operations = self._build_operations()
+        return self._operations
+
+    def _build_operations(self):
+        """Construct the operation instances for this model.
+        """
         base_operations = [InstanceList(self, 'instances'),
                 CreateInstance(self, 'create'),
+                CreateInstances(self, 'bulk-create'),
                 InstanceData(self, 'data'),
                 DeleteInstance(self, 'delete'),
+                DeleteInstances(self, 'bulk-delete'),
                 DereferenceInstance(self, 'get'),
-                UpdateInstance(self, 'update')] + \
+                FilterInstances(self, 'filter'),
+                AggregateInstances(self, 'aggregate'),
+                ExportInstances(self, 'export'),
+                UpdateInstance(self, 'update'),
+                UpdateInstances(self, 'bulk-update')] + \
             [InstanceDataArray(self, 'data', f) for f in self.data_arrays]
         extra_operations = []
         if self.path == 'django/contrib/auth/User/':
             extra_operations.append(AuthenticateUser(self, 'authenticate'))
             extra_operations.append(PermissionCheck(self, 'has-permission'))
+            extra_operations.append(UserPermissions(self, 'permissions'))
         return base_operations + extra_operations
+
+    def resolve(self, name, remainder):
+        """Return the view for the named operation together with the
+        arguments from the remainder of the path. If there is no matching
+        operation then the view is None.
+        """
+        if self._handlers is None:
+            self._handlers = {}
+            for op in self.operations():
+                self._handlers.setdefault(op.name, []).append(
+                    (re.compile('^%s$' % op.regex),
+                        view_handler(op.operation, op)))
+        for regex, handler in self._handlers.get(name, []):
+            match = regex.match(remainder)
+            if match:
+                return handler, match.groups()
+        return None, ()
@@ -0,0 +1,117 @@
+"""
+    Profiles Slumber operations on demand. A request is profiled if it is
+    picked by the `SLUMBER_PROFILE_RATE` sampling rate or if it sends an
+    `X-Slumber-Profile` header matching `SLUMBER_PROFILE_TOKEN`. Only the
+    requests that sent the token are told about their profile.
+"""
+from django.conf import settings
+
+from cProfile import Profile
+from errno import EEXIST
+from os import makedirs, path
+from pstats import Stats
+from random import random
+from tempfile import gettempdir
+from threading import local
+from time import strftime
+from uuid import uuid4
+
+try:
+    from django.utils.crypto import constant_time_compare
+except ImportError:
+    # Django 1.2 and earlier don't have this
+    constant_time_compare = lambda first, second: first == second
+
+
+# Worked out once so that the requests that aren't profiled cost nothing
+# more than a check of this flag
+ENABLED = bool(getattr(settings, 'SLUMBER_PROFILE_RATE', 0) or
+    getattr(settings, 'SLUMBER_PROFILE_TOKEN', None))
+# Only one profiler can run in a thread, so local requests made while
+# profiling aren't profiled themselves
+_ACTIVE = local()
+# The reasons why a request is profiled
+AUTHORIZED, SAMPLED = 'authorized', 'sampled'
+
+
+def wanted(request):
+    """Return why the request should be profiled, either AUTHORIZED or
+    SAMPLED, or None if it shouldn't be.
+    """
+    if getattr(_ACTIVE, 'profiling', False):
+        return None
+    token = getattr(settings, 'SLUMBER_PROFILE_TOKEN', None)
+    header = request.META.get('HTTP_X_SLUMBER_PROFILE', None)
+    if token and header and constant_time_compare(header, token):
+        return AUTHORIZED
+    if random() < getattr(settings, 'SLUMBER_PROFILE_RATE', 0):
+        return SAMPLED
+    return None
+
+
+def _store(profile, name):
+    """Write the profile and a text report of it into
+    `SLUMBER_PROFILE_DIRECTORY` and return the file name of the profile.
+    """
+    directory = getattr(settings, 'SLUMBER_PROFILE_DIRECTORY',
+        path.join(gettempdir(), 'slumber-profiles'))
+    try:
+        makedirs(directory)
+    except OSError, error:
+        # Another request may have made it first
+        if error.errno != EEXIST:
+            raise
+    filename = path.join(directory, '%s-%s-%s.prof' % (
+        name, strftime('%Y%m%d%H%M%S'), uuid4().hex[:8]))
+    profile.dump_stats(filename)
+    report = open(filename[:-5] + '.txt', 'w')
+    try:
+        stats = Stats(profile, stream=report)
+        stats.sort_stats('cumulative').print_stats()
+    finally:
+        report.close()
+    return filename
+
+
+def summary(profile, count=None):
+    """Return the functions that took the most cumulative time as a list
+    of strings giving the seconds, file, line and function name.
+    """
+    if count is None:
+        count = getattr(settings, 'SLUMBER_PROFILE_TOP', 10)
+    stats = Stats(profile).sort_stats('cumulative')
+    # The sorted function list isn't part of the documented API
+    # pylint: disable=E1101
+    return ['%.4f %s:%s(%s)' % (stats.stats[key][3],
+            path.basename(key[0]), key[1], key[2])
+        for key in stats.fcn_list[:count]]
+
+
+def profiled(handler, view, operation, reason):
+    """Return a handler that calls the handler under the profiler and
+    stores the profile. If the request sent the token then the response
+    gives the profile's file name in the `X-Slumber-Profile` header and
+    lists the functions that took the most time in
+    `X-Slumber-Profile-Summary`.
+    """
+    if operation:
+        name = '%s.%s.%s' % (operation.model.app.name, operation.model.name,
+            operation.name)
+    else:
+        name = view.__name__
+    def profile_handler(request, *args, **kwargs):
+        """Profile the request.
+        """
+        profile = Profile()
+        _ACTIVE.profiling = True
+        try:
+            response = profile.runcall(handler, request, *args, **kwargs)
+        finally:
+            _ACTIVE.profiling = False
+        filename = _store(profile, name)
+        if reason == AUTHORIZED:
+            response['X-Slumber-Profile'] = path.basename(filename)
+            response['X-Slumber-Profile-Summary'] = \
+                '; '.join(summary(profile))
+        return response
+    return profile_handler
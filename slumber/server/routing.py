@@ -0,0 +1,67 @@
+"""
+    Chooses the database that Slumber operations use. Reads can be spread
+    over read replicas while writes stay on the default database.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from hashlib import md5
+from random import choice
+
+
+def _pin_key(request):
+    """Return the cache key that pins the client's session to the default
+    database, or None if the client didn't say what its session is.
+    """
+    session = request.META.get('HTTP_X_SLUMBER_SESSION', None)
+    if session:
+        return 'slumber-pin-' + md5(session).hexdigest()
+    return None
+
+
+def read_database(request):
+    """Return the alias of the database that a read should use, or None for
+    the default database. One of `SLUMBER_READ_DATABASES` is chosen at
+    random unless the client's session has written recently. The choice is
+    kept on the request so that all of its reads see the same database.
+    """
+    try:
+        return request.slumber_read_database
+    except AttributeError:
+        database = request.slumber_read_database = _choose_database(request)
+        return database
+
+
+def _choose_database(request):
+    """Choose the database for the request's reads.
+    """
+    databases = getattr(settings, 'SLUMBER_READ_DATABASES', None)
+    # Anything read while handling a write must be up to date
+    if not databases or request.method != 'GET':
+        return None
+    key = _pin_key(request)
+    if key and cache.get(key):
+        return None
+    return choice(databases)
+
+
+def read_objects(request, model):
+    """Return the manager (or query set) for reading the Django model's
+    instances with. Related objects are read from the same database.
+    """
+    database = read_database(request)
+    if database:
+        return model.objects.using(database)
+    return model.objects
+
+
+def pin_session(request):
+    """Send the reads for the client's session to the default database for
+    the next `SLUMBER_READ_YOUR_WRITES` seconds so that it sees its own
+    writes even if the replicas are behind. Django's cache must be shared
+    by all of the server processes for this to work across them.
+    """
+    seconds = getattr(settings, 'SLUMBER_READ_YOUR_WRITES', 5)
+    key = _pin_key(request)
+    if key and seconds and getattr(settings, 'SLUMBER_READ_DATABASES', None):
+        cache.set(key, True, seconds)
@@ -0,0 +1,19 @@
+"""
+    Signals sent by the Slumber server.
+"""
+from django.dispatch import Signal
+
+
+# Sent with the model class as the sender when a bulk update changes
+# instances without saving them one at a time
+# pylint: disable=C0103
+bulk_updated = Signal(providing_args=['pks'])
+
+# Sent after every Slumber request when something is connected. The sender
+# is the Django model for model and instance operations and None otherwise.
+# The arguments are the application and model names (None if there aren't
+# any), the operation name, the HTTP method, the response status, the
+# duration in seconds, the number of SQL queries and the size of the body
+# in bytes (None if it is streamed)
+operation_performed = Signal(providing_args=['app', 'model', 'operation',
+    'method', 'status', 'duration', 'queries', 'size'])
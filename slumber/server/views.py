@@ -1,10 +1,11 @@
 """
     Some basic server views.
 """
-from django.http import HttpResponseRedirect, HttpResponseNotFound
+from django.http import Http404, HttpResponseRedirect, HttpResponseNotFound
 
-from slumber.server import get_slumber_root
-from slumber.server.http import view_handler
+from slumber._caches import EXPOSED_APPS
+from slumber.server import get_slumber_model, get_slumber_root
+from slumber.server.http import view_handler, wants_inline
 from slumber.server.meta import applications, get_application
 
 
@@ -17,6 +18,8 @@ def get_applications(request, response):
         appname, modelname = request.GET['model'].split('.')
         for app in applications():
             if app.name.endswith(appname) and app.models.has_key(modelname):
+                if wants_inline(request):
+                    return _model_metadata(response, app.models[modelname])
                 return HttpResponseRedirect(root + app.models[modelname].path)
         return HttpResponseNotFound()
     response['apps'] = dict([(app.name, root + app.path + '/')
@@ -37,7 +40,12 @@ def get_model(_, response, appname, modelname):
     """Return meta data about the model.
     """
     app = get_application(appname)
-    model = app.models[modelname]
+    _model_metadata(response, app.models[modelname])
+
+
+def _model_metadata(response, model):
+    """Add the meta data about the model to the response.
+    """
     response['name'] = model.name
     response['module'] = model.app.name
     response['fields'] = model.fields
@@ -47,7 +55,54 @@ def get_model(_, response, appname, modelname):
         if model.model._meta.get_field(f).unique] + \
         list(model.model._meta.unique_together)
     response['data_arrays'] = model.data_arrays
+    # Tell the client which foreign key on which model makes up each data
+    # array so that it can work them out from a replica
+    relations = {}
+    for related in model.model._meta.get_all_related_objects():
+        related_model = get_slumber_model(related.model)
+        name = related.field.related_query_name()
+        if related_model and name in model.data_arrays:
+            relations[name] = dict(
+                type=get_slumber_root() + related_model.path,
+                field=related.field.name)
+    response['data_array_relations'] = relations
     response['operations'] = dict(
         [(op.name, get_slumber_root() + op.path)
             for op in model.operations() if op.model_operation])
 
+
+def find_view(path):
+    """Work out which view handles the path (relative to the Slumber root).
+    Returns the view and the arguments it needs, or None if nothing matches.
+    """
+    if not EXPOSED_APPS.loaded:
+        EXPOSED_APPS.update([(app.path, app) for app in applications()])
+        EXPOSED_APPS.loaded = True
+    parts = path.strip('/').split('/')
+    # Application paths can nest so the longest matching path wins
+    for split in xrange(len(parts), 0, -1):
+        app = EXPOSED_APPS.get('/'.join(parts[:split]), None)
+        if app:
+            break
+    else:
+        return None, ()
+    parts = parts[split:]
+    if not parts:
+        return get_models, (app.path,)
+    model = app.models.get(parts[0], None)
+    if not model:
+        return None, ()
+    elif len(parts) == 1:
+        return get_model, (app.path, model.name)
+    view, args = model.resolve(parts[1],
+        ''.join([p + '/' for p in parts[2:]]))
+    return view, (app.path, model.name) + args
+
+
+def dispatch(request, path):
+    """Send the request to the view or operation that handles the path.
+    """
+    view, args = find_view(path)
+    if not view:
+        raise Http404
+    return view(request, *args)
@@ -40,6 +40,10 @@ class _MockClient(DictObject):
         """Empty stub so that the middleware works in tests.
         """
 
+    def _poll_changes(self):
+        """Empty stub so that the middleware works in tests.
+        """
+
 
 def mock_client(**instances):
     """Replaces the client with a mocked client that provides access to the
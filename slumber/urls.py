@@ -4,22 +4,19 @@
 """
 from django.conf.urls.defaults import patterns
 
-from slumber.server.http import view_handler
-from slumber.server.meta import applications
+# Importing the metrics starts their collection if it's turned on
+# pylint: disable=W0611
+import slumber.server.metrics
 
 
-_urls = {'^$': 'slumber.server.views.get_applications'}
-
-for app in applications():
-    _urls['^(%s)/$' % app.path] = 'slumber.server.views.get_models'
-    for model in app.models.values():
-        _urls['^(%s)/(%s)/$' % (app.path, model.name)] = \
-            'slumber.server.views.get_model'
-        for op in model.operations():
-            _urls['^(%s)/(%s)/%s/%s$' %
-                    (app.path, model.name, op.name, op.regex)] = \
-                view_handler(op.operation)
-
+# Other than the batch, change feed and metrics views, all of the paths
+# below the Slumber root are handled by a single view which then looks up
+# the application, model and operation.
 # The name urlpatterns is defined by Django and we can't change it
 # pylint: disable=C0103
-urlpatterns = patterns('', *_urls.items())
+urlpatterns = patterns('',
+    (r'^$', 'slumber.server.views.get_applications'),
+    (r'^_batch/$', 'slumber.server.batch.batch'),
+    (r'^_changes/$', 'slumber.changes.views.get_changes'),
+    (r'^_metrics/$', 'slumber.server.metrics.get_metrics'),
+    (r'^(.+/)$', 'slumber.server.views.dispatch'))
@@ -1,5 +1,14 @@
+from django.conf import settings
+
 from client import *
 from middleware import *
 from mock_client import *
 from server import *
 from views import *
+from ua import *
+
+# The change feed, and the replicas that use it, need slumber.changes which
+# the Django 1.0 test project doesn't install
+if 'slumber.changes' in settings.INSTALLED_APPS:
+    from changes import *
+    from replica import *
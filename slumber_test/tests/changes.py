@@ -0,0 +1,147 @@
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import signals
+from django.test import TestCase
+
+from mock import patch
+from simplejson import dumps, loads
+
+from slumber import client
+from slumber._caches import CLIENT_INSTANCE_CACHE, CLIENT_LOOKUP_CACHE
+from slumber.changes.models import Change, compact, CREATED, DELETED, \
+    EXPIRED, UPDATED
+from slumber.connector import changes as feed_module
+from slumber.connector.changes import ChangeFeed
+from slumber.connector.model import _remember_lookup
+from slumber.operations.bulk import has_listeners
+from slumber.server.signals import bulk_updated
+from slumber_test.models import Pizza
+
+
+class TestChangeLog(TestCase):
+    def setUp(self):
+        # Only the changes after this one are looked at
+        self.start = Change.objects.create(model='slumber_test/Shop/',
+            instance='0', kind=UPDATED).id
+
+    def feed(self, since=0):
+        response = self.client.get('/slumber/_changes/',
+            {'since': self.start + since}, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        return loads(response.content)
+
+    def test_changes_are_recorded(self):
+        p = Pizza(name='P1')
+        p.save()
+        p.name = 'P2'
+        p.save()
+        p.delete()
+        json = self.feed()
+        self.assertEqual([c['kind'] for c in json['changes']],
+            [CREATED, UPDATED, DELETED])
+        self.assertEqual(json['changes'][0]['identity'],
+            '/slumber/slumber_test/Pizza/data/1/')
+        self.assertEqual(json['last'], json['changes'][-1]['seq'])
+        self.assertFalse(json['reset'])
+        self.assertEqual(
+            self.feed(json['last'] - self.start)['changes'], [])
+
+    def test_bulk_update_is_recorded(self):
+        for i in range(3):
+            Pizza(name='P%s' % i).save()
+        since = self.feed()['last'] - self.start
+        self.client.post('/slumber/slumber_test/Pizza/bulk-update/',
+            dumps(dict(pks=[1, 3], changes=dict(for_sale=True))),
+            'application/json', HTTP_HOST='localhost')
+        self.assertEqual([(c['kind'], c['identity']) for c in
+                self.feed(since)['changes']],
+            [(UPDATED, '/slumber/slumber_test/Pizza/data/1/'),
+                (UPDATED, '/slumber/slumber_test/Pizza/data/3/')])
+
+    def test_empty_bulk_update_records_nothing(self):
+        bulk_updated.send(sender=Pizza, pks=[])
+        self.assertEqual(self.feed()['changes'], [])
+
+    def test_compaction(self):
+        p = Pizza(name='P1')
+        p.save()
+        Pizza(name='P2').save()
+        p.save()
+        compact()
+        json = self.feed()
+        self.assertEqual([(c['seq'] - self.start, c['kind'])
+                for c in json['changes']],
+            [(2, CREATED), (3, UPDATED)])
+        self.assertFalse(json['reset'])
+
+    def test_retention(self):
+        for i in range(3):
+            Pizza(name='P%s' % i).save()
+        Change.objects.filter(id__lt=self.start + 3).update(
+            time=datetime.now() - timedelta(days=30))
+        compact()
+        self.assertEqual(Change.objects.get(id=self.start + 2).kind, EXPIRED)
+        self.assertTrue(self.feed(1)['reset'])
+        json = self.feed(2)
+        self.assertFalse(json['reset'])
+        self.assertEqual([c['seq'] - self.start for c in json['changes']],
+            [3])
+
+    def test_latest(self):
+        Pizza(name='P1').save()
+        response = self.client.get('/slumber/_changes/', {'since': 'latest'},
+            HTTP_HOST='localhost')
+        json = loads(response.content)
+        self.assertEqual((json['changes'], json['last'], json['more']),
+            ([], self.start + 1, False))
+
+    def test_bulk_update_receivers_are_not_listeners(self):
+        self.assertFalse(has_listeners(signals.post_save, Pizza))
+        def receiver(**_kwargs):
+            pass
+        signals.post_save.connect(receiver, sender=Pizza)
+        try:
+            self.assertTrue(has_listeners(signals.post_save, Pizza))
+        finally:
+            signals.post_save.disconnect(receiver, sender=Pizza)
+
+
+class TestChangeFeedClient(TestCase):
+    # The test project's middleware flushes the cache after the local
+    # requests that the feed makes
+    @patch('slumber.connector.Client._flush_client_instance_cache',
+        lambda c: None)
+    def test_poll(self):
+        feed = ChangeFeed(client._directory)
+        p = Pizza(name='P1')
+        p.save()
+        with patch('slumber.connector.changes.get',
+                wraps=feed_module.get) as get:
+            self.assertEqual(feed.poll(), [])
+        self.assertEqual(get.call_count, 1)
+        self.assertTrue(feed.reset)
+        url = 'http://localhost:8000/slumber/slumber_test/Pizza/data/1/'
+        CLIENT_INSTANCE_CACHE[url] = None
+        _remember_lookup('P1', (url, 'P1', {}))
+        Pizza(name='P2').save()
+        self.assertEqual(len(feed.poll()), 1)
+        self.assertEqual(len(CLIENT_INSTANCE_CACHE), 1)
+        self.assertEqual(len(CLIENT_LOOKUP_CACHE), 1)
+        p.name = 'P3'
+        p.save()
+        changes = feed.poll()
+        self.assertEqual(changes[0]['identity'], url)
+        self.assertEqual(len(CLIENT_INSTANCE_CACHE), 0)
+        self.assertEqual(len(CLIENT_LOOKUP_CACHE), 0)
+        self.assertEqual(len(CLIENT_LOOKUP_CACHE.order), 0)
+
+    def test_middleware_polls(self):
+        called = []
+        with patch('slumber.connector.Client._poll_changes',
+                lambda c: called.append(True)):
+            with patch.object(settings, 'MIDDLEWARE_CLASSES',
+                    ['slumber.connector.middleware.ChangeFeedCache'] +
+                    list(settings.MIDDLEWARE_CLASSES)):
+                self.client.get('/')
+        self.assertTrue(called)
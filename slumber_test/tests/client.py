@@ -1,9 +1,14 @@
+from django.conf import settings
+from django.contrib.auth.models import Permission, User
 from django.test import TestCase
 
 from slumber import client
-from slumber._caches import CLIENT_INSTANCE_CACHE
-from slumber.connector import Client, DictObject
-from slumber_test.models import Pizza, PizzaPrice, PizzaSizePrice
+from slumber._caches import CLIENT_INSTANCE_CACHE, CLIENT_LOOKUP_CACHE, \
+    CLIENT_PERMISSION_CACHE
+from slumber.connector import batch, Client, DictObject, permissions, ua
+from slumber.connector.unitofwork import UnitOfWork
+from slumber.operations.aggregate import AGGREGATES
+from slumber_test.models import Pizza, PizzaPrice, PizzaSizePrice, Shop
 
 from mock import patch
 
@@ -24,7 +29,7 @@ class TestLoads(TestCase):
         self.assertTrue(hasattr(client, 'slumber_test'))
 
     def test_applications_remote(self):
-        def request(k, u):
+        def request(k, u, **_kwargs):
             self.assertEquals(u, 'http://slumber.example.com/')
             return DictObject(status=200), '''{"apps":{}}'''
         with patch('slumber.connector.ua.Http.request', self.fail):
@@ -156,3 +161,324 @@ class TestsWithPizza(TestCase):
         m1.attr = 'attribute data'
         self.assertEqual(m1.attr, 'attribute data')
         self.assertEqual(m1.attr, m2.attr)
+
+
+    def test_instance_data_is_only_fetched_once(self):
+        self.assertFalse(hasattr(self.pizza, 'not_a_field'))
+        with patch('slumber.connector.instance.get', self.fail):
+            self.assertFalse(hasattr(self.pizza, 'not_a_field'))
+            self.assertEqual(getattr(self.pizza, 'not_a_field', None), None)
+            self.assertTrue(self.pizza.for_sale)
+
+    def test_data_array_uses_loaded_metadata(self):
+        self.assertFalse(hasattr(self.pizza, 'not_a_field'))
+        urls = []
+        def get(url):
+            urls.append(url)
+            return None, dict(page=[])
+        with patch('slumber.connector.instance.get', get):
+            self.assertEqual(len(self.pizza.prices), 0)
+            self.assertEqual(len(self.pizza.prices), 0)
+        self.assertEqual(urls,
+            ['http://localhost:8000/slumber/slumber_test/Pizza/data/%s/prices/'
+                % self.s.pk])
+
+
+    def test_instances_share_a_slotted_type(self):
+        pizza2 = client.slumber_test.Pizza.get(name='S1')
+        self.assertTrue(type(self.pizza) is type(pizza2))
+        self.assertEqual(type(self.pizza).__dictoffset__, 0)
+
+
+    def test_lookup_comes_from_cache(self):
+        with patch('slumber.connector.model.get', self.fail):
+            pizza2 = client.slumber_test.Pizza.get(pk=self.s.pk)
+            self.assertEqual(unicode(pizza2), u"S1")
+            self.assertEqual(pizza2.name, u"S1")
+
+    def test_lookup_cache_is_flushed(self):
+        client._flush_client_instance_cache()
+        urls = []
+        def get(url):
+            urls.append(url)
+            return None, dict(identity='data/%s/' % self.s.pk,
+                display='S1', fields={})
+        with patch('slumber.connector.model.get', get):
+            client.slumber_test.Pizza.get(pk=self.s.pk)
+        self.assertEqual(len(urls), 1)
+
+    def test_lookup_cache_is_bounded(self):
+        Pizza(name='S2').save()
+        with patch.object(settings, 'SLUMBER_LOOKUP_CACHE_SIZE', 1,
+                create=True):
+            client.slumber_test.Pizza.get(name='S2')
+        self.assertEqual(len(CLIENT_LOOKUP_CACHE), 1)
+        self.assertEqual(CLIENT_LOOKUP_CACHE.keys()[0][1], (('name', u'S2'),))
+
+    def test_lookup_is_a_single_request(self):
+        client._flush_client_instance_cache()
+        requests = ua.STATS['requests']
+        client.slumber_test.Pizza.get(pk=self.s.pk)
+        self.assertEqual(ua.STATS['requests'], requests + 1)
+
+
+class TestBulkCreate(TestCase):
+    def test_create_many(self):
+        created, errors = client.slumber_test.Pizza.create_many([
+            dict(name='P1', for_sale=True),
+            dict(name='P2', not_a_field=True),
+            dict(name='P3', for_sale=False, max_extra_toppings=3)])
+        self.assertEqual(len(errors), 1, errors)
+        self.assertEqual(errors[0]['index'], 1)
+        self.assertIsNone(created[1])
+        self.assertEqual(unicode(created[0]), u'P1')
+        self.assertEqual(created[2].max_extra_toppings, '3')
+        self.assertEqual(Pizza.objects.count(), 2)
+
+
+class TestBulkChanges(TestCase):
+    def setUp(self):
+        for i in range(4):
+            Pizza(name='P%s' % i, for_sale=False).save()
+
+    def test_update_many_by_pk(self):
+        pks = [p.pk for p in Pizza.objects.all()[:2]]
+        self.assertEqual(
+            client.slumber_test.Pizza.update_many(dict(for_sale=True), pks), 2)
+        self.assertEqual(Pizza.objects.filter(for_sale=True).count(), 2)
+
+    def test_delete_many_by_filter(self):
+        self.assertEqual(
+            client.slumber_test.Pizza.delete_many(name__in=['P1', 'P2']), 2)
+        self.assertEqual(Pizza.objects.count(), 2)
+
+
+class TestClientBatch(TestCase):
+    def test_batch(self):
+        s = Pizza(name='S1', for_sale=True)
+        s.save()
+        url = client.slumber_test.Pizza._url
+        with patch('slumber.connector.ua._get', self.fail):
+            with client.batch() as batch:
+                model = batch.get(url)
+                pizza = batch.get(url + 'data/%s/' % s.pk)
+                missing = batch.get(url + 'data/99/')
+                with self.assertRaises(AssertionError):
+                    model.json
+        self.assertEqual(model.json['name'], 'Pizza')
+        self.assertEqual(pizza.json['display'], 'S1')
+        with self.assertRaises(AssertionError):
+            missing.json
+
+    def test_instances_are_batched(self):
+        s1 = Pizza(name='S1', for_sale=True)
+        s1.save()
+        s2 = Pizza(name='S2', for_sale=False)
+        s2.save()
+        model = client.slumber_test.Pizza
+        fetched = model.get(pk=s2.pk)
+        with patch('slumber.connector.batch.post',
+                wraps=batch.post) as post:
+            with client.batch() as queued:
+                found = queued.get_instance(model, pk=s1.pk)
+                loaded = queued.fetch(fetched)
+                missing = queued.get_instance(model, pk=99)
+        self.assertEqual(post.call_count, 1)
+        self.assertEqual(unicode(found.value), 'S1')
+        self.assertTrue(loaded.value is fetched)
+        with self.assertRaises(AssertionError):
+            missing.value
+        self.assertTrue(CLIENT_INSTANCE_CACHE.has_key(found.value._url))
+        self.assertTrue(CLIENT_INSTANCE_CACHE.has_key(fetched._url))
+        with patch('slumber.connector.ua._get', self.fail):
+            self.assertTrue(found.value.for_sale)
+            self.assertFalse(fetched.for_sale)
+            self.assertTrue(fetched._instance._data_arrays.has_key('prices'))
+            self.assertEqual(unicode(model.get(pk=s1.pk)), 'S1')
+
+
+class TestUnitOfWork(TestCase):
+    def setUp(self):
+        self.p1 = Pizza(name='P1', for_sale=True)
+        self.p1.save()
+        self.p2 = Pizza(name='P2', for_sale=True)
+        self.p2.save()
+        self.shop = Shop(name='S1')
+        self.shop.save()
+        self.model = client.slumber_test.Pizza
+
+    def test_changes_are_sent_in_one_batch(self):
+        p1, p2 = self.model.get(pk=self.p1.pk), self.model.get(pk=self.p2.pk)
+        shop = client.slumber_test.Shop.get(pk=self.shop.pk)
+        with patch('slumber.connector.batch.post',
+                wraps=batch.post) as post:
+            with client.unit_of_work():
+                p1.name = 'New P1'
+                p1.for_sale = False
+                p2.exclusive_to = shop
+        self.assertEqual(post.call_count, 1)
+        self.assertEqual(Pizza.objects.get(pk=self.p1.pk).name, 'New P1')
+        self.assertFalse(Pizza.objects.get(pk=self.p1.pk).for_sale)
+        self.assertEqual(Pizza.objects.get(pk=self.p2.pk).exclusive_to_id,
+            self.shop.pk)
+        with patch('slumber.connector.instance.get', self.fail):
+            self.assertEqual(unicode(p1), 'New P1')
+            self.assertEqual(p2.exclusive_to._url, shop._url)
+            self.assertTrue(p1._instance._data_arrays.has_key('prices'))
+
+    def test_changes_outside_unit_of_work_are_not_saved(self):
+        p1 = self.model.get(pk=self.p1.pk)
+        p1.name = 'Local'
+        with patch('slumber.connector.unitofwork.Batch', self.fail):
+            with client.unit_of_work() as work:
+                self.assertFalse(work._changes)
+        self.assertEqual(Pizza.objects.get(pk=self.p1.pk).name, 'P1')
+
+    def test_nothing_is_saved_after_an_error(self):
+        p1 = self.model.get(pk=self.p1.pk)
+        with self.assertRaises(ZeroDivisionError):
+            with client.unit_of_work():
+                p1.name = 'New P1'
+                1 / 0
+        self.assertEqual(Pizza.objects.get(pk=self.p1.pk).name, 'P1')
+
+    def test_other_servers_are_updated_directly(self):
+        p1 = self.model.get(pk=self.p1.pk)
+        with patch('slumber.connector.batch.post', self.fail):
+            with UnitOfWork('http://other.example.com/slumber/'):
+                p1.name = 'New P1'
+        self.assertEqual(Pizza.objects.get(pk=self.p1.pk).name, 'New P1')
+        self.assertEqual(unicode(p1), 'New P1')
+
+    def test_failed_update_stays_recorded(self):
+        p1, p2 = self.model.get(pk=self.p1.pk), self.model.get(pk=self.p2.pk)
+        updates = []
+        def post(url, params):
+            updates.append(url)
+            if len(updates) == 2:
+                raise ZeroDivisionError
+            return ua.post(url, params)
+        work = UnitOfWork('http://other.example.com/slumber/')
+        with self.assertRaises(ZeroDivisionError):
+            with patch('slumber.connector.unitofwork.post', post):
+                with work:
+                    p1.name = 'New P1'
+                    p2.name = 'New P2'
+        names = [Pizza.objects.get(pk=p.pk).name for p in (self.p1, self.p2)]
+        self.assertEqual(sorted(names), ['New P1', 'P2']
+            if names[0] == 'New P1' else ['New P2', 'P1'])
+        self.assertEqual(len(work._changes), 1)
+        self.assertEqual(work._changes.keys()[0].replace('/data/', '/update/'),
+            updates[1])
+
+
+class TestQuery(TestCase):
+    def setUp(self):
+        for i in range(15):
+            Pizza(name='P%02d' % i, for_sale=bool(i % 2)).save()
+
+    def test_filter(self):
+        query = client.slumber_test.Pizza.filter(for_sale=True)
+        with patch('slumber.connector.query.get', self.fail):
+            query = query.filter(name__gt='P04').order_by('-name')
+        self.assertEqual([unicode(p) for p in query],
+            ['P13', 'P11', 'P09', 'P07', 'P05'])
+        self.assertEqual([unicode(p) for p in client.slumber_test.Pizza.filter(
+                for_sale=False, name__lt='P05').order_by('name')],
+            ['P00', 'P02', 'P04'])
+
+    def test_paging(self):
+        pizzas = list(client.slumber_test.Pizza.filter(
+            name__startswith='P').order_by('name'))
+        self.assertEqual(len(pizzas), 15)
+        self.assertEqual(unicode(pizzas[-1]), 'P14')
+        self.assertEqual(type(pizzas[0]).__name__, 'slumber_test.Pizza')
+
+    def test_count(self):
+        if not AGGREGATES:
+            # Django 1.0 has no aggregation
+            return
+        self.assertEqual(client.slumber_test.Pizza.filter(for_sale=True).count(), 7)
+        self.assertEqual(
+            client.slumber_test.Pizza.filter(for_sale=False).count(), 8)
+        self.assertEqual(client.slumber_test.Pizza.aggregate(min='name'),
+            {'name__min': 'P00'})
+
+    def test_export(self):
+        pizzas = client.slumber_test.Pizza.export(for_sale=True)
+        first = pizzas.next()
+        self.assertEqual(unicode(first), 'P01')
+        with patch('slumber.connector.instance.get', self.fail):
+            self.assertEqual(first.name, 'P01')
+        self.assertEqual(len(list(pizzas)), 6)
+        self.assertEqual(len(list(
+            client.slumber_test.Pizza.export(for_sale=False))), 8)
+
+
+class TestPermissions(TestCase):
+    def setUp(self):
+        self.user = User(username='test-user')
+        self.user.save()
+        permission = Permission(content_type_id=1,
+            name='Can something', codename='can_something')
+        permission.save()
+        self.user.user_permissions.add(permission)
+        self.url = 'http://localhost:8000/slumber/django/contrib/auth/' \
+            'User/data/%s/' % self.user.pk
+
+    def tearDown(self):
+        permissions.forget()
+
+    def test_checks_use_one_request(self):
+        with patch('slumber.connector.permissions.get',
+                wraps=permissions.get) as get:
+            self.assertTrue(permissions.has_perm(self.url,
+                'auth.can_something'))
+            self.assertFalse(permissions.has_perm(self.url, 'auth.other'))
+            self.assertTrue(permissions.has_perms(self.url,
+                ['auth.can_something']))
+            self.assertEqual(permissions.get_all_permissions(self.url),
+                set(['auth.can_something']))
+        self.assertEqual(get.call_count, 1)
+
+    def test_cache_is_used_until_it_expires(self):
+        permissions.has_perm(self.url, 'auth.can_something')
+        self.user.user_permissions.clear()
+        self.assertTrue(permissions.has_perm(self.url, 'auth.can_something'))
+        permissions.forget(self.url)
+        self.assertFalse(permissions.has_perm(self.url, 'auth.can_something'))
+
+    @patch.object(settings, 'SLUMBER_PERMISSION_CACHE_TTL', -1, create=True)
+    def test_cache_expires(self):
+        permissions.has_perm(self.url, 'auth.can_something')
+        self.user.user_permissions.clear()
+        self.assertFalse(permissions.has_perm(self.url, 'auth.can_something'))
+
+    @patch.object(settings, 'SLUMBER_PERMISSION_CACHE_SIZE', 2, create=True)
+    def test_oldest_users_are_evicted(self):
+        urls = [self.url]
+        for name in ['user-2', 'user-3']:
+            user = User(username=name)
+            user.save()
+            urls.append(self.url.replace('/%s/' % self.user.pk,
+                '/%s/' % user.pk))
+        for url in urls:
+            permissions.has_perm(url, 'auth.can_something')
+        self.assertEqual(sorted(CLIENT_PERMISSION_CACHE.keys()),
+            sorted(urls[1:]))
+        permissions.forget(urls[1])
+        self.assertEqual(CLIENT_PERMISSION_CACHE.keys(), urls[2:])
+        self.assertEqual(list(CLIENT_PERMISSION_CACHE.order), urls[2:])
+
+    def test_superusers_and_inactive_users(self):
+        self.user.is_superuser = True
+        self.user.save()
+        self.assertTrue(permissions.has_perm(self.url, 'auth.other'))
+        permissions.forget()
+        self.user.is_active = False
+        self.user.save()
+        self.assertFalse(permissions.has_perm(self.url, 'auth.can_something'))
+
+    def test_client_instance(self):
+        user = client.django.contrib.auth.User.get(username='test-user')
+        self.assertTrue(permissions.has_perm(user, 'auth.can_something'))
@@ -1,7 +1,18 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.http import HttpResponse
 from django.test import TestCase
 
 from mock import patch
 
+from slumber import client
+from slumber.connector import permissions
+from slumber.connector.accounting import Account, current, pattern, \
+    RepeatedRequests
+from slumber.connector.dictobject import DictObject
+from slumber.connector.middleware import Accounting
+from slumber_test.models import Pizza
+
 
 class TestMiddleware(TestCase):
     def test_request(self):
@@ -11,3 +22,90 @@ class TestMiddleware(TestCase):
         with patch('slumber.connector.Client._flush_client_instance_cache', flush_cache):
             response = self.client.get('/')
         self.assertTrue(called)
+
+
+class TestAccounting(TestCase):
+    def setUp(self):
+        self.pizzas = [Pizza.objects.create(name='P%s' % n) for n in range(3)]
+        # Make sure the model's details are already known
+        client.slumber_test.Pizza.get(pk=self.pizzas[0].pk)
+        client._flush_client_instance_cache()
+
+    def fetch(self):
+        for pizza in self.pizzas:
+            client.slumber_test.Pizza.get(pk=pizza.pk)
+
+    def test_pattern(self):
+        self.assertEquals(pattern('http://localhost/slumber/app/Model/data/12/'),
+            'http://localhost/slumber/app/Model/data/{pk}/')
+        self.assertEquals(
+            pattern('http://localhost/slumber/app/Model/data/12/toppings/'),
+            'http://localhost/slumber/app/Model/data/{pk}/toppings/')
+        self.assertEquals(pattern('http://localhost/slumber/app/Model/get/?pk=3'),
+            'http://localhost/slumber/app/Model/get/')
+
+    def test_requests_are_counted(self):
+        with Account() as account:
+            self.assertEquals(current(), account)
+            self.fetch()
+        self.assertEquals(current(), None)
+        self.assertEquals(account.requests, 3, account.patterns)
+        self.assertTrue(account.bytes > 0)
+        self.assertTrue(account.seconds > 0)
+        self.assertEquals(account.patterns, {
+            'http://localhost:8000/slumber/slumber_test/Pizza/get/': 3})
+
+    def test_cache_hits(self):
+        user = User.objects.create(username='test-user')
+        url = 'http://localhost:8000/slumber/django/contrib/auth/' \
+            'User/data/%s/' % user.pk
+        with Account() as account:
+            permissions.has_perm(url, 'auth.can_something')
+            permissions.has_perm(url, 'auth.can_something')
+        permissions.forget()
+        self.assertEquals(account.requests, 1)
+        self.assertEquals((account.hits, account.misses), (1, 1))
+
+    def test_repeated_requests_warn(self):
+        warnings = []
+        with patch.object(settings, 'SLUMBER_REPEATED_REQUESTS', 2,
+                create=True):
+            with patch('slumber.connector.accounting.LOGGER.warning',
+                    lambda *a: warnings.append(a)):
+                with Account() as account:
+                    self.fetch()
+            self.assertEquals(account.repeated(), {
+                'http://localhost:8000/slumber/slumber_test/Pizza/get/': 3})
+        self.assertEquals(len(warnings), 1)
+
+    def test_repeated_requests_can_fail(self):
+        with patch.object(settings, 'SLUMBER_REPEATED_REQUESTS', 2,
+                create=True):
+            with patch.object(settings, 'SLUMBER_REPEATED_REQUESTS_FAIL',
+                    True, create=True):
+                with Account():
+                    self.assertRaises(RepeatedRequests, self.fetch)
+
+    def test_middleware(self):
+        middleware, request = Accounting(), DictObject(path='/view/')
+        middleware.process_request(request)
+        self.fetch()
+        logged = []
+        with patch.object(settings, 'SLUMBER_ACCOUNTING_HEADER', True,
+                create=True):
+            with patch.object(settings, 'SLUMBER_ACCOUNTING_LOG', True,
+                    create=True):
+                with patch('slumber.connector.accounting.LOGGER.info',
+                        lambda *a: logged.append(a)):
+                    response = middleware.process_response(request,
+                        HttpResponse())
+        self.assertEquals(current(), None)
+        self.assertTrue(response['X-Slumber-Requests'].startswith(
+            'requests=3 bytes='), response['X-Slumber-Requests'])
+        self.assertEquals(logged[0][1], '/view/')
+
+    def test_middleware_without_settings(self):
+        middleware, request = Accounting(), DictObject(path='/view/')
+        middleware.process_request(request)
+        response = middleware.process_response(request, HttpResponse())
+        self.assertFalse(response.has_header('X-Slumber-Requests'))
@@ -0,0 +1,100 @@
+from datetime import date
+
+from django.test import TestCase
+
+from mock import patch
+from simplejson import loads
+
+from slumber._caches import CLIENT_REPLICAS
+from slumber.connector import Client
+from slumber_test.models import Pizza, PizzaPrice
+
+
+def _no_requests(*a, **kw):
+    raise AssertionError("Request made for %s" % (a,))
+
+
+class TestReplica(TestCase):
+    def setUp(self):
+        self.pizza = Pizza(name='P1', for_sale=True)
+        self.pizza.save()
+        PizzaPrice(pizza=self.pizza, date=date(2011, 1, 1)).save()
+        PizzaPrice(pizza=self.pizza, date=date(2011, 2, 1)).save()
+        connector = Client()
+        self.models = connector.slumber_test
+        self.replica = connector.replicate(
+            self.models.Pizza, self.models.PizzaPrice)
+
+    def tearDown(self):
+        CLIENT_REPLICAS.clear()
+
+    def test_model_metadata_has_relations(self):
+        response = self.client.get('/slumber/slumber_test/Pizza/',
+            HTTP_HOST='localhost')
+        self.assertEqual(loads(response.content)['data_array_relations'],
+            dict(prices=dict(type='/slumber/slumber_test/PizzaPrice/',
+                field='pizza')))
+
+    @patch('slumber.connector.model.get', _no_requests)
+    @patch('slumber.connector.instance.get', _no_requests)
+    def test_get_from_replica(self):
+        pizza = self.models.Pizza.get(name='P1')
+        self.assertEqual(pizza.id, self.pizza.pk)
+        self.assertTrue(pizza.for_sale)
+        self.assertEqual(unicode(pizza), 'P1')
+        self.assertEqual(self.models.Pizza.get(pk=self.pizza.pk)._url,
+            pizza._url)
+
+    @patch('slumber.connector.model.get', _no_requests)
+    @patch('slumber.connector.instance.get', _no_requests)
+    def test_data_array_from_replica(self):
+        pizza = self.models.Pizza.get(name='P1')
+        self.assertEqual([p.date for p in pizza.prices],
+            ['2011-02-01', '2011-01-01'])
+        self.assertEqual(pizza.prices[0].pizza.name, 'P1')
+
+    def test_unsupported_lookups_go_to_server(self):
+        self.replica.refresh()
+        pizza = self.models.Pizza.get(name__iexact='p1')
+        self.assertEqual(pizza.name, 'P1')
+
+    def test_refresh(self):
+        Pizza(name='P2').save()
+        self.pizza.name = 'P3'
+        self.pizza.save()
+        self.replica.refresh()
+        with patch('slumber.connector.model.get', _no_requests):
+            self.assertEqual(self.models.Pizza.get(name='P2').name, 'P2')
+            self.assertEqual(
+                self.models.Pizza.get(pk=self.pizza.pk).name, 'P3')
+        self.pizza.delete()
+        self.replica.refresh()
+        self.assertEqual(self.replica.get(
+            self.models.Pizza, pk=self.pizza.pk), None)
+
+    def test_stale_replica_refreshes(self):
+        Pizza(name='P2').save()
+        self.replica.refreshed = 0
+        self.assertTrue(self.replica.get(self.models.Pizza, name='P2'))
+
+    def test_failed_refresh_is_a_miss(self):
+        Pizza(name='P2').save()
+        self.replica.refreshed = 0
+        since = self.replica._feed.since
+        with patch('slumber.connector.replica.stream', _no_requests):
+            self.assertEqual(
+                self.replica.get(self.models.Pizza, name='P1'), None)
+            self.assertEqual(self.models.Pizza.get(name='P2').name, 'P2')
+        # The changes will be fetched again
+        self.assertEqual(self.replica._feed.since, since)
+        self.assertTrue(self.replica.get(self.models.Pizza, name='P2'))
+
+    def test_reads_during_a_refresh_go_to_the_server(self):
+        self.replica.refreshed = 0
+        self.replica._refreshing.acquire()
+        try:
+            with patch('slumber.connector.replica.stream', _no_requests):
+                self.assertEqual(
+                    self.replica.get(self.models.Pizza, name='P1'), None)
+        finally:
+            self.replica._refreshing.release()
@@ -0,0 +1,352 @@
+from django.conf import settings
+
+from socket import error as SocketError, timeout
+from StringIO import StringIO
+from threading import Event, Thread
+from time import sleep, time
+from unittest2 import TestCase
+from urllib2 import URLError
+
+from mock import patch
+
+from slumber._caches import CLIENT_BACKENDS, CLIENT_CIRCUIT_BREAKERS
+from slumber.connector import Client, hedge, ua
+from slumber.connector.backends import add_pool, find_pool
+from slumber.connector.dictobject import DictObject
+from slumber.connector.retry import CircuitOpen, get_breaker
+
+
+class TestCoalescing(TestCase):
+    def test_concurrent_gets_share_one_request(self):
+        started, release = Event(), Event()
+        calls, results = [], []
+        def request(_http, url, **_kwargs):
+            calls.append(url)
+            started.set()
+            release.wait(5)
+            return DictObject(status=200), '''{"apps":{}}'''
+        def fetch():
+            results.append(ua.get('http://slumber.example.com/'))
+        coalesced = ua.STATS['coalesced']
+        with patch('slumber.connector.ua.Http.request', request):
+            first = Thread(target=fetch)
+            first.start()
+            started.wait(5)
+            second = Thread(target=fetch)
+            second.start()
+            while ua.STATS['coalesced'] == coalesced:
+                second.join(0.01)
+            release.set()
+            first.join(5)
+            second.join(5)
+        self.assertEqual(calls, ['http://slumber.example.com/'])
+        self.assertEqual(len(results), 2)
+        self.assertTrue(results[0] is results[1])
+        self.assertEqual(ua.STATS['coalesced'], coalesced + 1)
+
+    def test_flight_is_removed_after_an_error(self):
+        def request(_http, url, **_kwargs):
+            return DictObject(status=404), ''
+        with patch('slumber.connector.ua.Http.request', request):
+            with self.assertRaises(AssertionError):
+                ua.get('http://slumber.example.com/')
+        self.assertFalse(ua._IN_FLIGHT)
+
+
+class TestStreaming(TestCase):
+    def test_lines_split_across_chunks(self):
+        self.assertEqual(list(ua._split_lines(['{"a"', ': 1}\n{"b": 2', '}\n'])),
+            ['{"a": 1}', '{"b": 2}'])
+
+
+class TestBackends(TestCase):
+    def setUp(self):
+        self.primary = add_pool(['http://primary.example.com/slumber/',
+            'http://replica1.example.com/slumber/',
+            'http://replica2.example.com/slumber/'])
+        self.pool = find_pool(self.primary)
+        self.calls = []
+
+    def tearDown(self):
+        CLIENT_BACKENDS.clear()
+        CLIENT_CIRCUIT_BREAKERS.clear()
+
+    def request(self, status=200, failing=()):
+        def request(_http, url, method='GET', **_kwargs):
+            self.calls.append((method, url))
+            for host in failing:
+                if url.startswith(host):
+                    raise SocketError("Connection refused")
+            return DictObject(status=status), '''{"apps":{}}'''
+        return request
+
+    def test_reads_go_to_least_busy_replica(self):
+        self.pool.replicas[0].outstanding = 1
+        with patch('slumber.connector.ua.Http.request', self.request()):
+            ua.get(self.primary + 'app/')
+        self.assertEqual(self.calls,
+            [('GET', 'http://replica2.example.com/slumber/app/')])
+        self.assertEqual(self.pool.replicas[1].requests, 1)
+        self.assertEqual(self.pool.replicas[1].outstanding, 0)
+
+    def test_latency_breaks_ties(self):
+        self.pool.replicas[0].latency = 0.5
+        self.assertEqual(self.pool.candidates(),
+            [self.pool.replicas[1], self.pool.replicas[0], self.pool.primary])
+
+    def test_writes_go_to_primary(self):
+        with patch('slumber.connector.ua.Http.request', self.request()):
+            ua.post(self.primary + 'app/Model/create/', {})
+        self.assertEqual(self.calls,
+            [('POST', 'http://primary.example.com/slumber/app/Model/create/')])
+
+    def test_failed_replica_is_ejected(self):
+        with patch('slumber.connector.ua.Http.request',
+                self.request(failing=['http://replica1'])):
+            ua.get(self.primary + 'app/')
+            ua.get(self.primary + 'app/')
+        self.assertEqual([url for _, url in self.calls], [
+            'http://replica1.example.com/slumber/app/',
+            'http://replica2.example.com/slumber/app/',
+            'http://replica2.example.com/slumber/app/'])
+        self.assertEqual(self.pool.replicas[0].failures, 1)
+        self.pool.replicas[0].ejected_until = 0
+        self.assertEqual(self.pool.candidates()[0], self.pool.replicas[0])
+
+    @patch.object(settings, 'SLUMBER_RETRIES', 0, create=True)
+    def test_server_errors_fail_over(self):
+        with patch('slumber.connector.ua.Http.request',
+                self.request(status=503)):
+            with self.assertRaises(ua.ServerError):
+                ua.get(self.primary + 'app/')
+        self.assertEqual(len(self.calls), 3)
+
+    def test_open_circuit_fails_over(self):
+        get_breaker('http://replica1.example.com/').opened = time()
+        with patch('slumber.connector.ua.Http.request', self.request()):
+            ua.get(self.primary + 'app/')
+        self.assertEqual(self.calls,
+            [('GET', 'http://replica2.example.com/slumber/app/')])
+        self.assertEqual(self.pool.replicas[0].outstanding, 0)
+        self.assertEqual(self.pool.replicas[0].failures, 0)
+
+    def test_circuit_open_when_every_breaker_is(self):
+        for host in ['primary', 'replica1', 'replica2']:
+            get_breaker('http://%s.example.com/' % host).opened = time()
+        with patch('slumber.connector.ua.Http.request', self.request()):
+            with self.assertRaises(CircuitOpen):
+                ua.get(self.primary + 'app/')
+        self.assertEqual(self.calls, [])
+
+    def test_streams_fail_over(self):
+        get_breaker('http://replica2.example.com/').opened = time()
+        def urlopen(request, timeout):
+            self.calls.append(('GET', request.get_full_url()))
+            if request.get_full_url().startswith('http://replica1.'):
+                raise URLError("Connection refused")
+            body = StringIO('{"a": 1}\n{"a": 2}\n')
+            body.getcode = lambda: 200
+            return body
+        with patch('slumber.connector.ua.urlopen', urlopen):
+            self.assertEqual(list(ua.stream(self.primary + 'app/')),
+                [{'a': 1}, {'a': 2}])
+        self.assertEqual(self.calls, [
+            ('GET', 'http://replica1.example.com/slumber/app/'),
+            ('GET', 'http://primary.example.com/slumber/app/')])
+        self.assertEqual(self.pool.replicas[0].failures, 1)
+        self.assertEqual(get_breaker('http://replica1.example.com/').failures,
+            1)
+
+    def test_client_with_several_servers(self):
+        with patch('slumber.connector.ua.Http.request', self.request()):
+            connector = Client([self.primary, 'http://replica3/slumber/'])
+            self.assertEqual(connector._directory, self.primary)
+
+
+class TestRetries(TestCase):
+    def setUp(self):
+        self.calls = []
+        self.budget = ua.RETRY_BUDGET.balance
+
+    def tearDown(self):
+        CLIENT_CIRCUIT_BREAKERS.clear()
+        ua.RETRY_BUDGET.balance = self.budget
+
+    def request(self, *results):
+        results = list(results)
+        def request(_http, url, *_args, **_kwargs):
+            self.calls.append(url)
+            result = results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return DictObject(status=result), '''{"apps":{}}'''
+        return request
+
+    @patch('slumber.connector.ua.sleep', lambda s: None)
+    def test_get_is_retried(self):
+        with patch('slumber.connector.ua.Http.request',
+                self.request(timeout(), 502, 200)):
+            ua.get('http://slumber.example.com/')
+        self.assertEqual(len(self.calls), 3)
+
+    @patch('slumber.connector.ua.sleep', lambda s: None)
+    def test_retries_are_limited(self):
+        with patch('slumber.connector.ua.Http.request',
+                self.request(500, 500, 500, 200)):
+            with self.assertRaises(ua.ServerError):
+                ua.get('http://slumber.example.com/')
+        self.assertEqual(len(self.calls), 3)
+
+    def test_client_errors_are_not_retried(self):
+        with patch('slumber.connector.ua.Http.request', self.request(404)):
+            with self.assertRaises(AssertionError):
+                ua.get('http://slumber.example.com/')
+        self.assertEqual(len(self.calls), 1)
+
+    @patch('slumber.connector.ua.sleep', lambda s: None)
+    def test_retry_budget(self):
+        ua.RETRY_BUDGET.balance = 0
+        with patch('slumber.connector.ua.Http.request',
+                self.request(500, 200)):
+            with self.assertRaises(ua.ServerError):
+                ua.get('http://slumber.example.com/')
+        self.assertEqual(len(self.calls), 1)
+
+    @patch.object(settings, 'SLUMBER_DEADLINE', 0, create=True)
+    def test_deadline(self):
+        with patch('slumber.connector.ua.Http.request',
+                self.request(500, 200)):
+            with self.assertRaises(ua.ServerError):
+                ua.get('http://slumber.example.com/')
+        self.assertEqual(len(self.calls), 1)
+
+    @patch.object(settings, 'SLUMBER_RETRIES', 0, create=True)
+    @patch.object(settings, 'SLUMBER_CIRCUIT_FAILURES', 2, create=True)
+    def test_circuit_breaker(self):
+        url = 'http://slumber.example.com/'
+        with patch('slumber.connector.ua.Http.request',
+                self.request(500, 500, 200, 200)):
+            for _ in range(2):
+                with self.assertRaises(ua.ServerError):
+                    ua.get(url)
+            with self.assertRaises(CircuitOpen):
+                ua.get(url)
+            self.assertEqual(len(self.calls), 2)
+            breaker = CLIENT_CIRCUIT_BREAKERS['slumber.example.com']
+            breaker.opened -= 60
+            ua.get(url)
+            self.assertEqual(breaker.opened, None)
+            ua.get(url)
+        self.assertEqual(len(self.calls), 4)
+
+    def test_any_error_is_recorded(self):
+        from httplib import HTTPException
+        url = 'http://slumber.example.com/'
+        breaker = get_breaker(url)
+        breaker.opened = 0
+        with patch('slumber.connector.ua.Http.request',
+                self.request(HTTPException())):
+            with self.assertRaises(HTTPException):
+                ua.get(url)
+        self.assertFalse(breaker.trial)
+        self.assertTrue(breaker.opened > 0)
+
+    def test_half_open_circuit_allows_one_trial(self):
+        breaker = get_breaker('http://slumber.example.com/')
+        breaker.opened = 0
+        breaker.allow()
+        with self.assertRaises(CircuitOpen):
+            breaker.allow()
+        breaker.record(False)
+        with self.assertRaises(CircuitOpen):
+            breaker.allow()
+
+
+class TestHedging(TestCase):
+    def setUp(self):
+        self.latencies = hedge.LATENCIES
+        hedge.LATENCIES = hedge.Latencies()
+        for _ in range(20):
+            hedge.LATENCIES.add(0.001)
+        self.release = Event()
+        self.calls = []
+        def request(_http, url, **_kwargs):
+            self.calls.append(url)
+            if len(self.calls) == 1:
+                # The first request is slow
+                self.release.wait(5)
+                return DictObject(status=200), '''{"slow":true}'''
+            return DictObject(status=200), '''{"slow":false}'''
+        self.request = request
+
+    def tearDown(self):
+        self.release.set()
+        hedge.LATENCIES = self.latencies
+        CLIENT_BACKENDS.clear()
+
+    @patch.object(settings, 'SLUMBER_HEDGE', True, create=True)
+    def test_slow_request_is_hedged(self):
+        stats = dict(hedge.STATS)
+        with patch('slumber.connector.ua.Http.request', self.request):
+            _, json = ua.get('http://slumber.example.com/hedge/')
+        self.assertFalse(json['slow'])
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(hedge.STATS['hedged'], stats['hedged'] + 1)
+        self.assertEqual(hedge.STATS['wins'], stats['wins'] + 1)
+
+    @patch.object(settings, 'SLUMBER_HEDGE', True, create=True)
+    def test_hedge_goes_to_another_replica(self):
+        primary = add_pool(['http://primary.example.com/slumber/',
+            'http://replica1.example.com/slumber/',
+            'http://replica2.example.com/slumber/'])
+        with patch('slumber.connector.ua.Http.request', self.request):
+            ua.get(primary + 'hedge/')
+        self.assertEqual(len(set(self.calls)), 2)
+
+    @patch.object(settings, 'SLUMBER_HEDGE', True, create=True)
+    def test_hedges_are_limited(self):
+        balance = hedge.BUDGET.balance
+        hedge.BUDGET.balance = 0
+        try:
+            self.release.set()
+            with patch('slumber.connector.ua.Http.request', self.request):
+                _, json = ua.get('http://slumber.example.com/hedge/')
+            self.assertTrue(json['slow'])
+            self.assertEqual(len(self.calls), 1)
+        finally:
+            hedge.BUDGET.balance = balance
+
+    def test_failure_waits_for_a_hedge_that_is_starting(self):
+        hedging, failed = Event(), Event()
+        count = hedge._count
+        def slow_count(name):
+            if name == 'hedged':
+                # Let the first attempt's failure arrive before the hedge
+                # request is made
+                hedging.set()
+                failed.wait(5)
+                sleep(0.05)
+            count(name)
+        attempts = []
+        def attempt(url):
+            attempts.append(url)
+            if len(attempts) == 1:
+                hedging.wait(5)
+                failed.set()
+                raise ua.ServerError(url, 500)
+            return 'hedge'
+        with patch('slumber.connector.hedge._count', slow_count):
+            self.assertEqual(hedge.hedged(attempt, 'http://example.com/'),
+                'hedge')
+        self.assertEqual(len(attempts), 2)
+
+    def test_delay_is_a_percentile(self):
+        latencies = hedge.Latencies(minimum=10)
+        for ms in range(1, 11):
+            self.assertEqual(latencies.delay(), None)
+            latencies.add(ms / 100.0)
+        self.assertEqual(latencies.delay(), 0.1)
+        with patch.object(settings, 'SLUMBER_HEDGE_PERCENTILE', 50,
+                create=True):
+            latencies._delay = None
+            self.assertEqual(latencies.delay(), 0.06)
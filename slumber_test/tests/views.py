@@ -1,9 +1,27 @@
-from simplejson import loads
+from os import listdir
+from os.path import join
+from pstats import Stats
+from shutil import rmtree
+from simplejson import dumps, loads
+from tempfile import mkdtemp
 
+from django.conf import settings
 from django.contrib.auth.models import User, Permission
-from django.test import TestCase
+from django.core.cache import cache
+from django.db.models import signals
+from django.test import TestCase, TransactionTestCase
 
-from slumber_test.models import Pizza, PizzaPrice
+from mock import patch
+
+from slumber._caches import APP_PATH_TO_SLUMBER_APP, \
+    DJANGO_MODEL_TO_SLUMBER_MODEL, EXPOSED_APPS
+from slumber.operations.aggregate import AGGREGATES
+from slumber.server import get_slumber_model, metrics, profiling
+from slumber.server.application import DjangoApp
+from slumber.server.meta import get_application
+from slumber.server.model import DjangoModel
+from slumber.server.signals import operation_performed
+from slumber_test.models import Pizza, PizzaPrice, Shop
 
 
 def _perform(client, method, url, data):
@@ -31,12 +49,67 @@ class TestViewErrors(ViewTests):
         response, json = self.do_post('/slumber/slumber_test/Pizza/instances/', {})
         self.assertEquals(response.status_code, 403)
 
+    def test_unknown_paths(self):
+        for url in ['/slumber/not_an_app/', '/slumber/slumber_test/NotAModel/',
+                '/slumber/slumber_test/Pizza/not-an-operation/',
+                '/slumber/slumber_test/Pizza/data/1/not_a_data_array/']:
+            response = self.client.get(url, HTTP_HOST='localhost')
+            self.assertEquals(response.status_code, 404, url)
+
     def test_invalid_method(self):
         response = self.client.get('/slumber/slumber_test/Pizza/instances/',
             REQUEST_METHOD='PURGE', HTTP_HOST='localhost', REMOTE_ADDR='127.0.0.1')
         self.assertEquals(response.status_code, 403, response.content)
 
 
+class TestExposedApps(ViewTests):
+    def setUp(self):
+        self.caches = [(c, c.copy()) for c in
+            [APP_PATH_TO_SLUMBER_APP, DJANGO_MODEL_TO_SLUMBER_MODEL,
+                EXPOSED_APPS]]
+        for cache, _ in self.caches:
+            cache.clear()
+        EXPOSED_APPS.loaded = False
+
+    def tearDown(self):
+        for cache, saved in self.caches:
+            cache.clear()
+            cache.update(saved)
+        EXPOSED_APPS.loaded = bool(EXPOSED_APPS)
+
+    def test_slumber_apps_limits_directory(self):
+        with patch.object(settings, 'SLUMBER_APPS', ['slumber_test'],
+                create=True):
+            response, json = self.do_get('/slumber/')
+            self.assertEquals(json['apps'].keys(), ['slumber_test'])
+            response, json = self.do_get('/slumber/django/contrib/auth/')
+            self.assertEquals(response.status_code, 404)
+
+    def test_every_exposed_app_is_routable(self):
+        get_application('slumber_test')
+        response, json = self.do_get('/slumber/django/contrib/auth/')
+        self.assertEquals(response.status_code, 200)
+
+    def test_other_apps_are_not_routable(self):
+        with patch.object(settings, 'SLUMBER_APPS', ['slumber_test'],
+                create=True):
+            get_application('django.contrib.auth')
+            response, json = self.do_get('/slumber/django/contrib/auth/')
+            self.assertEquals(response.status_code, 404)
+
+    def test_foreign_key_to_hidden_model(self):
+        with patch.object(settings, 'SLUMBER_APPS', ['slumber_test.no_models'],
+                create=True):
+            self.assertIsNone(get_slumber_model(Shop))
+            pizza = DjangoModel(DjangoApp('slumber_test'), Pizza)
+            self.assertEquals(pizza.fields['exclusive_to']['kind'], 'value')
+
+    def test_models_are_built_on_first_use(self):
+        app = DjangoApp('slumber_test')
+        self.assertIsNone(app._models)
+        self.assertTrue(app.models.has_key('Pizza'))
+
+
 class TestBasicViews(ViewTests):
 
     def test_applications(self):
@@ -50,6 +123,13 @@ class TestBasicViews(ViewTests):
         self.assertEquals(response['Location'],
             'http://localhost/slumber/slumber_test/Pizza/')
 
+    def test_model_search_inline(self):
+        response, json = self.do_get('/slumber/',
+            {'model': 'slumber_test.Pizza', '_inline': '1'})
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(json['name'], 'Pizza')
+        self.assertEquals(json['module'], 'slumber_test')
+
     def test_model_search_invalid(self):
         response, json = self.do_get('/slumber/', {'model': 'nota.model'})
         self.assertEquals(response.status_code, 404)
@@ -154,6 +234,194 @@ class TestBasicViews(ViewTests):
         self.assertFalse(Pizza.objects.all()[0].for_sale)
 
 
+    def test_bulk_create(self):
+        shop = Shop(name='Shop')
+        shop.save()
+        response = self.client.post('/slumber/slumber_test/Pizza/bulk-create/',
+            dumps([dict(name='P1', for_sale=True, exclusive_to=shop.pk),
+                    dict(name='P2', for_sale=True, max_extra_toppings='x'),
+                    dict(name='P3', for_sale=False)]),
+            'application/json', HTTP_HOST='localhost')
+        self.assertEquals(response.status_code, 200, response.content)
+        json = loads(response.content)
+        self.assertEquals([c['index'] for c in json['created']], [0, 2])
+        self.assertEquals(json['created'][0]['identity'],
+            '/slumber/slumber_test/Pizza/data/%s/' % json['created'][0]['pk'])
+        self.assertEquals(json['errors'][0]['index'], 1)
+        self.assertTrue(json['errors'][0]['errors'].has_key(
+            'max_extra_toppings'), json['errors'])
+        self.assertEquals(Pizza.objects.get(name='P1').exclusive_to, shop)
+        self.assertEquals(Pizza.objects.count(), 2)
+
+    def test_bulk_create_in_chunks(self):
+        with patch.object(settings, 'SLUMBER_BULK_CHUNK_SIZE', 2, create=True):
+            response = self.client.post(
+                '/slumber/slumber_test/Pizza/bulk-create/',
+                dumps([dict(name='P%s' % i) for i in range(5)]),
+                'application/json', HTTP_HOST='localhost')
+        json = loads(response.content)
+        self.assertEquals(len(json['created']), 5)
+        self.assertEquals(Pizza.objects.count(), 5)
+
+    def test_bulk_create_bad_body(self):
+        response = self.client.post('/slumber/slumber_test/Pizza/bulk-create/',
+            '{"name": "P1"}', 'application/json', HTTP_HOST='localhost')
+        self.assertEquals(response.status_code, 400)
+
+
+    def do_bulk(self, operation, body):
+        response = self.client.post('/slumber/slumber_test/Pizza/%s/' %
+            operation, dumps(body), 'application/json', HTTP_HOST='localhost')
+        if response.status_code == 200:
+            return response, loads(response.content)
+        return response, {}
+
+    def test_bulk_update_by_filter(self):
+        shop = Shop(name='Shop')
+        shop.save()
+        for i in range(5):
+            Pizza(name='P%s' % i, for_sale=True).save()
+        response, json = self.do_bulk('bulk-update', dict(
+            filter={'name__in': ['P1', 'P3']},
+            changes=dict(for_sale=False, exclusive_to=shop.pk)))
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(json['updated'], 2)
+        self.assertEquals([p.name for p in
+                Pizza.objects.filter(for_sale=False, exclusive_to=shop)],
+            ['P1', 'P3'])
+
+    def test_bulk_update_saves_when_signals_are_connected(self):
+        for i in range(3):
+            Pizza(name='P%s' % i, for_sale=True).save()
+        saved = []
+        def receiver(sender, instance, **kwargs):
+            saved.append(instance.pk)
+        signals.post_save.connect(receiver, sender=Pizza)
+        try:
+            with patch.object(settings, 'SLUMBER_BULK_CHUNK_SIZE', 2,
+                    create=True):
+                response, json = self.do_bulk('bulk-update',
+                    dict(pks=[1, 2, 3], changes=dict(name__x=1)))
+                self.assertEquals(response.status_code, 400)
+                response, json = self.do_bulk('bulk-update',
+                    dict(pks=[1, 2, 3], changes=dict(for_sale=False)))
+        finally:
+            signals.post_save.disconnect(receiver, sender=Pizza)
+        self.assertEquals(json['updated'], 3)
+        self.assertEquals(sorted(saved), [1, 2, 3])
+        self.assertEquals(Pizza.objects.filter(for_sale=False).count(), 3)
+
+    def test_bulk_requests_must_choose_instances(self):
+        response, json = self.do_bulk('bulk-update',
+            dict(changes=dict(for_sale=False)))
+        self.assertEquals(response.status_code, 400)
+        response, json = self.do_bulk('bulk-delete', dict(filter={}))
+        self.assertEquals(response.status_code, 400)
+        response, json = self.do_bulk('bulk-delete',
+            dict(filter={'exclusive_to__name': 'Shop'}))
+        self.assertEquals(response.status_code, 400)
+
+    def test_bulk_delete(self):
+        s = Pizza(name='P', for_sale=True)
+        s.save()
+        PizzaPrice(pizza=s, date='2010-01-01').save()
+        Pizza(name='Q', for_sale=True).save()
+        response, json = self.do_bulk('bulk-delete', dict(pks=[s.pk, 99]))
+        self.assertEquals(json['deleted'], 1)
+        self.assertEquals(Pizza.objects.count(), 1)
+        self.assertEquals(PizzaPrice.objects.count(), 0)
+
+
+    def test_filter(self):
+        for i in range(12):
+            Pizza(name='P%02d' % i, for_sale=i < 6).save()
+        url = '/slumber/slumber_test/Pizza/filter/'
+        response, json = self.do_get(url,
+            {'for_sale': 'True', 'order_by': '-name'})
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals([p['display'] for p in json['page']],
+            ['P05', 'P04', 'P03', 'P02', 'P01', 'P00'])
+        self.assertFalse(json.has_key('next_page'))
+        response, json = self.do_get(url, {'id__in': '1,3,5,7',
+            'order_by': 'name', 'limit': '3'})
+        self.assertEquals([p['pk'] for p in json['page']], [1, 3, 5])
+        self.assertTrue(json['next_page'].startswith(url), json['next_page'])
+        response, json = self.do_get(json['next_page'])
+        self.assertEquals([p['pk'] for p in json['page']], [7])
+
+    def test_filter_converts_values(self):
+        for i in range(4):
+            Pizza(name='P%s' % i, for_sale=i < 1).save()
+        url = '/slumber/slumber_test/Pizza/filter/'
+        for value in [False, 'False', '0']:
+            response, json = self.do_get(url, {'for_sale': value})
+            self.assertEquals([p['display'] for p in json['page']],
+                ['P1', 'P2', 'P3'], value)
+        response, json = self.do_get(url, {'for_sale__in': 'False,True'})
+        self.assertEquals(len(json['page']), 4)
+        response, json = self.do_get(url, {'for_sale': 'maybe'})
+        self.assertEquals(response.status_code, 400)
+        response, json = self.do_get(url, {'id__in': '1,x'})
+        self.assertEquals(response.status_code, 400)
+
+    def test_filter_errors(self):
+        url = '/slumber/slumber_test/Pizza/filter/'
+        for query in [{'exclusive_to__name': 'x'}, {'name__regex': '.*'},
+                {'order_by': 'for_sale'}, {'start': 'x'}, {'start': '-1'},
+                {'limit': '-5'}, {'limit': '0'}, {'limit': '1.5'}]:
+            response, json = self.do_get(url, query)
+            self.assertEquals(response.status_code, 400, query)
+
+
+    def test_aggregate(self):
+        if not AGGREGATES:
+            # Django 1.0 has no aggregation
+            return
+        for i in range(6):
+            Pizza(name='P%s' % i, for_sale=i < 2, max_extra_toppings=i).save()
+        url = '/slumber/slumber_test/Pizza/aggregate/'
+        response, json = self.do_get(url, {'count': '',
+            'sum': 'max_extra_toppings', 'max': 'name,max_extra_toppings'})
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(json['aggregates'], {'count': 6,
+            'max_extra_toppings__sum': 15, 'name__max': 'P5',
+            'max_extra_toppings__max': 5})
+        response, json = self.do_get(url, {'count': '', 'group_by': 'for_sale',
+            'avg': 'max_extra_toppings', 'name__in': 'P0,P1,P2,P3'})
+        self.assertEquals(json['groups'], [
+            {'for_sale': False, 'count': 2, 'max_extra_toppings__avg': 2.5},
+            {'for_sale': True, 'count': 2, 'max_extra_toppings__avg': 0.5}])
+
+    def test_aggregate_errors(self):
+        url = '/slumber/slumber_test/Pizza/aggregate/'
+        for query in [{}, {'sum': 'not_a_field'}, {'sum': 'exclusive_to'},
+                {'sum': 'name'}, {'avg': 'name'},
+                {'count': '', 'group_by': 'prices'}]:
+            response, json = self.do_get(url, query)
+            self.assertEquals(response.status_code, 400, query)
+
+
+    def test_export(self):
+        shop = Shop(name='Shop')
+        shop.save()
+        for i in range(5):
+            Pizza(name='P%s' % i, for_sale=True,
+                exclusive_to=shop if i == 2 else None).save()
+        with patch.object(settings, 'SLUMBER_EXPORT_CHUNK_SIZE', 2,
+                create=True):
+            response = self.client.get('/slumber/slumber_test/Pizza/export/',
+                {'name__in': 'P1,P2,P3,P4'}, HTTP_HOST='localhost')
+            lines = [loads(l) for l in response.content.splitlines()]
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(response['Content-Type'], 'application/x-ndjson')
+        self.assertEquals([l['display'] for l in lines],
+            ['P1', 'P2', 'P3', 'P4'])
+        self.assertEquals(lines[0]['identity'],
+            '/slumber/slumber_test/Pizza/data/2/')
+        self.assertEquals(lines[1]['fields']['exclusive_to']['data']['display'],
+            'Shop object')
+
+
     def test_update_instance(self):
         s = Pizza(name='S1', for_sale=True)
         s.save()
@@ -164,6 +432,49 @@ class TestBasicViews(ViewTests):
         self.assertEquals(n.name, "New pizza")
 
 
+    def test_update_instance_converts_values(self):
+        shop = Shop(name='Shop')
+        shop.save()
+        s = Pizza(name='S1', for_sale=True)
+        s.save()
+        self.do_post('/slumber/slumber_test/Pizza/update/%s/' % s.pk, {
+            'for_sale': 'False', 'exclusive_to': shop.pk})
+        n = Pizza.objects.get(pk=s.pk)
+        self.assertFalse(n.for_sale)
+        self.assertEquals(n.exclusive_to, shop)
+        self.do_post('/slumber/slumber_test/Pizza/update/%s/' % s.pk, {
+            'exclusive_to': ''})
+        self.assertEquals(Pizza.objects.get(pk=s.pk).exclusive_to, None)
+        response, _ = self.do_post(
+            '/slumber/slumber_test/Pizza/update/%s/' % s.pk, {
+                'max_extra_toppings': 'many'})
+        self.assertEquals(response.status_code, 400)
+
+
+    def test_update_instance_inline(self):
+        s = Pizza(name='S1', for_sale=True)
+        s.save()
+        response = self.client.post('/slumber/slumber_test/Pizza/update/1/',
+            {'name': 'New pizza'}, HTTP_HOST='localhost',
+            HTTP_X_SLUMBER_INLINE='1')
+        self.assertEquals(response.status_code, 200)
+        json = loads(response.content)
+        self.assertEquals(json['identity'], '/slumber/slumber_test/Pizza/data/1/')
+        self.assertEquals(json['fields']['name']['data'], 'New pizza')
+
+
+    def test_get_instance_inline(self):
+        s = Pizza(name='S1', for_sale=True)
+        s.save()
+        response = self.client.get('/slumber/slumber_test/Pizza/get/',
+            {'name': s.name}, HTTP_HOST='localhost', HTTP_X_SLUMBER_INLINE='1')
+        self.assertEquals(response.status_code, 200)
+        json = loads(response.content)
+        self.assertEquals(json['identity'],
+            '/slumber/slumber_test/Pizza/data/%s/' % s.pk)
+        self.assertEquals(json['display'], 'S1')
+
+
     def test_get_instance(self):
         s = Pizza(name='S1', for_sale=True)
         s.save()
@@ -259,6 +570,78 @@ class TestBasicViews(ViewTests):
             Pizza.objects.get(pk=s.pk)
 
 
+class TestBatch(ViewTests):
+    def do_batch(self, body):
+        response = self.client.post('/slumber/_batch/', dumps(body),
+            'application/json', HTTP_HOST='localhost')
+        return response, loads(response.content)
+
+    def test_batch(self):
+        s = Pizza(name='S1', for_sale=True)
+        s.save()
+        response, json = self.do_batch(dict(requests=[
+            dict(path='/slumber/slumber_test/Pizza/'),
+            dict(path='slumber_test/Pizza/data/%s/' % s.pk),
+            dict(path='/slumber/slumber_test/Pizza/get/?name=S1'),
+            dict(path='/slumber/slumber_test/Pizza/data/99/'),
+            dict(path='/slumber/not_an_app/'),
+            dict(method='POST', path='/slumber/slumber_test/Pizza/update/1/',
+                params=dict(name='S2')),
+            dict(method='POST', path='/slumber/slumber_test/Pizza/bulk-create/',
+                body=[dict(name='S3')])]))
+        self.assertEquals(response.status_code, 200)
+        statuses = [r['_meta']['status'] for r in json['responses']]
+        self.assertEquals(statuses, [200, 200, 200, 404, 404, 200, 200])
+        self.assertEquals(json['responses'][0]['name'], 'Pizza')
+        self.assertEquals(json['responses'][1]['display'], 'S1')
+        self.assertEquals(json['responses'][2]['identity'],
+            '/slumber/slumber_test/Pizza/data/%s/' % s.pk)
+        self.assertEquals(json['responses'][5]['display'], 'S2')
+        self.assertEquals(len(json['responses'][6]['created']), 1)
+
+    def test_batch_errors_are_reported_per_request(self):
+        def fail(*args):
+            raise RuntimeError("Broken")
+        with patch('slumber.operations.instancelist.InstanceList.get', fail):
+            response, json = self.do_batch(dict(requests=[
+                dict(method='POST', path='/slumber/slumber_test/Pizza/create/',
+                    params=dict(name='S1')),
+                dict(path='/slumber/slumber_test/Pizza/data/x/'),
+                dict(path='/slumber/slumber_test/Pizza/instances/'),
+                dict(path='/slumber/slumber_test/Pizza/')]))
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals([r['_meta']['status'] for r in json['responses']],
+            [200, 400, 500, 200])
+        self.assertEquals(json['responses'][2]['_meta']['message'], 'Broken')
+        self.assertEquals(Pizza.objects.count(), 1)
+
+    def test_batch_must_be_posted(self):
+        response = self.client.get('/slumber/_batch/', HTTP_HOST='localhost')
+        self.assertEquals(response.status_code, 403)
+
+
+class TestBatchTransaction(TransactionTestCase):
+    def do_batch(self, body):
+        response = self.client.post('/slumber/_batch/', dumps(body),
+            'application/json', HTTP_HOST='localhost')
+        return response, loads(response.content)
+
+    def test_batch_transaction_stops_at_failure(self):
+        for create in [
+                dict(method='POST', path='/slumber/slumber_test/Pizza/create/',
+                    params=dict(name='S1')),
+                dict(method='POST',
+                    path='/slumber/slumber_test/Pizza/bulk-create/',
+                    body=[dict(name='S1')])]:
+            response, json = self.do_batch(dict(transaction=True, requests=[
+                create, dict(path='/slumber/slumber_test/Pizza/data/99/'),
+                dict(path='/slumber/slumber_test/Pizza/')]))
+            self.assertEquals(response.status_code, 409)
+            self.assertEquals(len(json['responses']), 2)
+            self.assertEquals(json['responses'][0]['_meta']['status'], 200)
+            self.assertEquals(Pizza.objects.count(), 0, create['path'])
+
+
 class TestUserViews(ViewTests):
     authn = '/slumber/django/contrib/auth/User/authenticate/'
     perm = '/slumber/django/contrib/auth/User/has-permission/%s/%s/'
@@ -309,3 +692,364 @@ class TestUserViews(ViewTests):
         response, json = self.do_get(self.perm % (self.user.pk, 'auth.can_something'))
         self.assertEquals(response.status_code, 200)
         self.assertEquals(json['is-allowed'], False, json)
+
+
+class TestReadRouting(ViewTests):
+    def setUp(self):
+        self.pizza = Pizza(name='P1')
+        self.pizza.save()
+        self.chosen = []
+        def choose(databases):
+            self.chosen.append(databases)
+            return databases[0]
+        self.choice = patch('slumber.server.routing.choice', choose)
+        self.choice.start()
+        self.databases = patch.object(settings, 'SLUMBER_READ_DATABASES',
+            ['default'], create=True)
+        self.databases.start()
+
+    def tearDown(self):
+        self.choice.stop()
+        self.databases.stop()
+        cache.clear()
+
+    def test_reads_use_read_databases(self):
+        response, json = self.do_get(
+            '/slumber/slumber_test/Pizza/data/%s/' % self.pizza.pk)
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(json['fields']['name']['data'], 'P1')
+        self.assertEquals(self.chosen, [['default']])
+
+    def test_writes_use_default_database(self):
+        response = self.client.post(
+            '/slumber/slumber_test/Pizza/update/%s/' % self.pizza.pk,
+            {'name': 'P2'}, HTTP_HOST='localhost', HTTP_X_SLUMBER_INLINE='1')
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(self.chosen, [])
+
+    def test_writes_pin_the_session(self):
+        self.client.post(
+            '/slumber/slumber_test/Pizza/update/%s/' % self.pizza.pk,
+            {'name': 'P2'}, HTTP_HOST='localhost',
+            HTTP_X_SLUMBER_SESSION='session-1')
+        self.client.get('/slumber/slumber_test/Pizza/data/%s/' %
+            self.pizza.pk, HTTP_HOST='localhost',
+            HTTP_X_SLUMBER_SESSION='session-1')
+        self.assertEquals(self.chosen, [])
+        self.client.get('/slumber/slumber_test/Pizza/data/%s/' %
+            self.pizza.pk, HTTP_HOST='localhost',
+            HTTP_X_SLUMBER_SESSION='session-2')
+        self.assertEquals(self.chosen, [['default']])
+
+    def test_a_request_reads_from_one_database(self):
+        aliases, used = ['replica1', 'replica2'], []
+        def choose(databases):
+            # A different replica each time it is asked
+            self.chosen.append(databases)
+            return databases[len(self.chosen) % 2]
+        def using(alias):
+            used.append(alias)
+            return Pizza.objects.all()
+        with patch.object(settings, 'SLUMBER_READ_DATABASES', aliases):
+            with patch('slumber.server.routing.choice', choose):
+                with patch.object(Pizza.objects, 'using', using):
+                    response, json = self.do_get(
+                        '/slumber/slumber_test/Pizza/get/',
+                        dict(pk=self.pizza.pk, _inline=1))
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(json['display'], 'P1')
+        self.assertEquals(self.chosen, [aliases])
+        self.assertEquals(used, ['replica2', 'replica2'])
+
+    def test_no_read_databases(self):
+        with patch.object(settings, 'SLUMBER_READ_DATABASES', []):
+            self.do_get('/slumber/slumber_test/Pizza/data/%s/' %
+                self.pizza.pk)
+        self.assertEquals(self.chosen, [])
+
+
+class TestUserPermissions(ViewTests):
+    url = '/slumber/django/contrib/auth/User/permissions/%s/'
+
+    def setUp(self):
+        self.user = User(username='test-user')
+        self.user.save()
+        self.permission = Permission(content_type_id=1,
+            name='Can something', codename='can_something')
+        self.permission.save()
+        self.user.user_permissions.add(self.permission)
+
+    def test_permission_set(self):
+        response, json = self.do_get(self.url % self.user.pk)
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(json['permissions'], ['auth.can_something'])
+        self.assertTrue(json['is_active'])
+        self.assertFalse(json['is_superuser'])
+        self.assertFalse(json['_meta'].has_key('headers'))
+
+    def test_many_checks(self):
+        response, json = self.do_get(self.url % self.user.pk,
+            {'permission': ['auth.can_something', 'auth.other']})
+        self.assertEquals(json['is-allowed'],
+            {'auth.can_something': True, 'auth.other': False})
+
+    def test_etag(self):
+        response = self.client.get(self.url % self.user.pk,
+            HTTP_HOST='localhost')
+        etag = response['ETag']
+        response = self.client.get(self.url % self.user.pk,
+            HTTP_HOST='localhost', HTTP_IF_NONE_MATCH=etag)
+        self.assertEquals(response.status_code, 304)
+        self.user.user_permissions.clear()
+        response = self.client.get(self.url % self.user.pk,
+            HTTP_HOST='localhost', HTTP_IF_NONE_MATCH=etag)
+        self.assertEquals(response.status_code, 200)
+        self.assertNotEquals(response['ETag'], etag)
+
+
+class TestInstrumentation(ViewTests):
+    def setUp(self):
+        self.pizza = Pizza(name='P1')
+        self.pizza.save()
+        self.sent = []
+        operation_performed.connect(self.collect)
+
+    def tearDown(self):
+        operation_performed.disconnect(self.collect)
+
+    def collect(self, sender, **kwargs):
+        kwargs.pop('signal')
+        kwargs['sender'] = sender
+        self.sent.append(kwargs)
+
+    def test_operation(self):
+        url = '/slumber/slumber_test/Pizza/data/%s/' % self.pizza.pk
+        response = self.client.get(url, HTTP_HOST='localhost')
+        self.assertEquals(len(self.sent), 1)
+        sent = self.sent[0]
+        self.assertTrue(sent['duration'] >= 0)
+        self.assertTrue(sent['queries'] >= 1)
+        del sent['duration'], sent['queries']
+        self.assertEquals(sent, dict(sender=Pizza, app='slumber_test',
+            model='Pizza', operation='data', method='GET', status=200,
+            size=len(response.content)))
+
+    def test_other_views(self):
+        self.client.get('/slumber/', HTTP_HOST='localhost')
+        self.assertEquals(self.sent[0]['sender'], None)
+        self.assertEquals(self.sent[0]['operation'], 'get_applications')
+
+    def test_errors_and_streams(self):
+        self.do_post('/slumber/slumber_test/Pizza/update/%s/' %
+            self.pizza.pk, {'max_extra_toppings': 'many'})
+        self.assertEquals(self.sent[0]['status'], 400)
+        self.client.get('/slumber/slumber_test/Pizza/export/',
+            HTTP_HOST='localhost')
+        self.assertEquals(self.sent[1]['size'], None)
+
+    def test_queries_are_not_kept(self):
+        from django.db import connection
+        self.client.get('/slumber/slumber_test/Pizza/data/%s/' %
+            self.pizza.pk, HTTP_HOST='localhost')
+        self.assertEquals(connection.queries, [])
+
+    def test_errors_are_measured(self):
+        def fail(*args):
+            raise RuntimeError("Broken")
+        with patch('slumber.operations.instancedata.InstanceData.get', fail):
+            self.assertRaises(RuntimeError, self.client.get,
+                '/slumber/slumber_test/Pizza/data/%s/' % self.pizza.pk,
+                HTTP_HOST='localhost')
+        self.assertEquals(len(self.sent), 1)
+        self.assertEquals((self.sent[0]['operation'], self.sent[0]['status'],
+            self.sent[0]['size']), ('data', 500, None))
+
+    def test_batch_requests_are_measured(self):
+        self.client.post('/slumber/_batch/', dumps(dict(requests=[
+                dict(path='slumber_test/Pizza/data/%s/' % self.pizza.pk),
+                dict(path='slumber_test/Pizza/data/99/')])),
+            'application/json', HTTP_HOST='localhost')
+        self.assertEquals([(s['operation'], s['status'], s['size'])
+                for s in self.sent[:2]],
+            [('data', 200, None), ('data', 404, None)])
+        self.assertEquals(self.sent[0]['sender'], Pizza)
+        self.assertEquals(self.sent[2]['operation'], 'batch')
+
+    def test_nothing_is_measured_without_receivers(self):
+        operation_performed.disconnect(self.collect)
+        with patch('slumber.server.http.measure', self.fail):
+            self.do_get('/slumber/slumber_test/Pizza/data/%s/' %
+                self.pizza.pk)
+
+
+class TestMetrics(ViewTests):
+    def setUp(self):
+        self.pizza = Pizza(name='P1')
+        self.pizza.save()
+        metrics.reset()
+        operation_performed.connect(metrics.collect,
+            dispatch_uid='slumber.metrics')
+
+    def tearDown(self):
+        operation_performed.disconnect(dispatch_uid='slumber.metrics')
+        metrics.reset()
+
+    def scrape(self):
+        with patch.object(settings, 'SLUMBER_METRICS', True, create=True):
+            response = self.client.get('/slumber/_metrics/',
+                HTTP_HOST='localhost')
+        self.assertEquals(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        return response.content.split('\n')
+
+    def test_off_by_default(self):
+        response = self.client.get('/slumber/_metrics/',
+            HTTP_HOST='localhost')
+        self.assertEquals(response.status_code, 404)
+
+    def test_requests_are_counted(self):
+        url = '/slumber/slumber_test/Pizza/data/%s/' % self.pizza.pk
+        self.client.get(url, HTTP_HOST='localhost')
+        response = self.client.get(url, HTTP_HOST='localhost')
+        self.do_post('/slumber/slumber_test/Pizza/update/%s/' %
+            self.pizza.pk, {'max_extra_toppings': 'many'})
+        lines = self.scrape()
+        labels = 'app="slumber_test",model="Pizza",operation="data",' \
+            'method="GET"'
+        self.assertTrue('# TYPE slumber_requests_total counter' in lines)
+        self.assertTrue('slumber_requests_total{%s,status="200"} 2' %
+            labels in lines, lines)
+        self.assertTrue('slumber_request_duration_seconds_count{%s} 2' %
+            labels in lines, lines)
+        self.assertTrue(
+            'slumber_request_duration_seconds_bucket{%s,le="+Inf"} 2' %
+                labels in lines, lines)
+        self.assertTrue('slumber_response_bytes_sum{%s} %s' %
+            (labels, 2 * len(response.content)) in lines, lines)
+        self.assertTrue('slumber_errors_total{%s} 0' % labels in lines)
+        self.assertTrue('slumber_errors_total{app="slumber_test",'
+            'model="Pizza",operation="update",method="POST"} 1' in lines)
+
+    def test_histogram_buckets(self):
+        with patch.object(metrics, 'BUCKETS', [0.1, 1.0]):
+            metrics.reset()
+            for duration in [0.05, 0.1, 0.5, 2.0]:
+                metrics.collect(None, app='a', model=None, operation='op',
+                    method='GET', status=200, duration=duration, queries=1,
+                    size=None)
+            lines = self.scrape()
+        labels = 'app="a",model="",operation="op",method="GET"'
+        buckets = [l for l in lines
+            if l.startswith('slumber_request_duration_seconds_bucket')]
+        self.assertEquals(buckets, [
+            'slumber_request_duration_seconds_bucket{%s,le="0.1"} 2' % labels,
+            'slumber_request_duration_seconds_bucket{%s,le="1.0"} 3' % labels,
+            'slumber_request_duration_seconds_bucket{%s,le="+Inf"} 4' % labels])
+        self.assertTrue('slumber_queries_total{%s} 4' % labels in lines)
+        self.assertTrue('slumber_response_bytes_count{%s} 0' % labels in lines)
+
+    def test_threads_are_added_together(self):
+        from threading import Thread
+        def record():
+            for _ in range(100):
+                metrics.collect(None, app='a', model='M', operation='op',
+                    method='GET', status=200, duration=0.001, queries=0,
+                    size=10)
+        threads = [Thread(target=record) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEquals(metrics.totals()[('a', 'M', 'op', 'GET')].count, 400)
+
+    def test_finished_threads_are_retired(self):
+        from threading import Thread
+        def record():
+            metrics.collect(None, app='a', model='M', operation='op',
+                method='GET', status=200, duration=0.001, queries=0, size=10)
+        shards = len(metrics._SHARDS)
+        for _ in range(20):
+            thread = Thread(target=record)
+            thread.start()
+            thread.join()
+        self.assertTrue(len(metrics._SHARDS) <= shards + 1, metrics._SHARDS)
+        self.assertEquals(metrics.totals()[('a', 'M', 'op', 'GET')].count, 20)
+        metrics.reset()
+        self.assertEquals(metrics.totals(), {})
+
+    def test_bookkeeping_overhead(self):
+        from time import time
+        start = time()
+        for _ in xrange(10000):
+            metrics.collect(None, app='a', model='M', operation='op',
+                method='GET', status=200, duration=0.01, queries=2, size=100)
+        # Recording a request should cost a few microseconds, far less than
+        # the request itself
+        self.assertTrue((time() - start) / 10000 < 0.0001)
+
+
+class TestProfiling(ViewTests):
+    def setUp(self):
+        self.pizza = Pizza(name='P1')
+        self.pizza.save()
+        self.url = '/slumber/slumber_test/Pizza/data/%s/' % self.pizza.pk
+        self.directory = mkdtemp()
+        self.patches = [patch.object(profiling, 'ENABLED', True),
+            patch.object(settings, 'SLUMBER_PROFILE_DIRECTORY',
+                self.directory, create=True),
+            patch.object(settings, 'SLUMBER_PROFILE_TOKEN', 'secret',
+                create=True)]
+        for patcher in self.patches:
+            patcher.start()
+
+    def tearDown(self):
+        for patcher in self.patches:
+            patcher.stop()
+        rmtree(self.directory)
+
+    def test_not_profiled_when_off(self):
+        profiling.ENABLED = False
+        with patch('slumber.server.profiling.wanted', self.fail):
+            response = self.client.get(self.url, HTTP_HOST='localhost',
+                HTTP_X_SLUMBER_PROFILE='secret')
+        self.assertFalse(response.has_header('X-Slumber-Profile'))
+
+    def test_needs_the_token(self):
+        response = self.client.get(self.url, HTTP_HOST='localhost',
+            HTTP_X_SLUMBER_PROFILE='wrong')
+        self.assertEquals(response.status_code, 200)
+        self.assertFalse(response.has_header('X-Slumber-Profile'))
+        self.assertEquals(listdir(self.directory), [])
+
+    def test_profiled_with_token(self):
+        response = self.client.get(self.url, HTTP_HOST='localhost',
+            HTTP_X_SLUMBER_PROFILE='secret')
+        self.assertEquals(response.status_code, 200)
+        filename = response['X-Slumber-Profile']
+        self.assertTrue(filename.startswith('slumber_test.Pizza.data-'),
+            filename)
+        self.assertEquals(sorted(listdir(self.directory)),
+            sorted([filename, filename[:-5] + '.txt']))
+        Stats(join(self.directory, filename))
+        top = response['X-Slumber-Profile-Summary'].split('; ')
+        self.assertEquals(len(top), 10)
+        self.assertTrue('http.py' in response['X-Slumber-Profile-Summary'])
+
+    def test_sampled(self):
+        with patch.object(settings, 'SLUMBER_PROFILE_RATE', 1, create=True):
+            response = self.client.get(self.url, HTTP_HOST='localhost')
+        # Only the requests that sent the token are told about the profile
+        self.assertFalse(response.has_header('X-Slumber-Profile'))
+        self.assertFalse(response.has_header('X-Slumber-Profile-Summary'))
+        self.assertEquals(len(listdir(self.directory)), 2)
+        with patch.object(settings, 'SLUMBER_PROFILE_RATE', 0, create=True):
+            response = self.client.get(self.url, HTTP_HOST='localhost')
+        self.assertEquals(len(listdir(self.directory)), 2)
+
+    def test_directory_is_made_once(self):
+        rmtree(self.directory)
+        for _ in range(2):
+            response = self.client.get(self.url, HTTP_HOST='localhost',
+                HTTP_X_SLUMBER_PROFILE='secret')
+            self.assertEquals(response.status_code, 200)
+        self.assertEquals(len(listdir(self.directory)), 4)
@@ -0,0 +1,116 @@
+"""
+    Measures read throughput as read replicas are added to a service. Each
+    server is a separate single threaded process, like `runserver`, and
+    they all share one SQLite database. Every request is made to take 20
+    milliseconds longer to stand in for the database work a real server
+    would do.
+"""
+import common
+
+import os
+from multiprocessing import Process
+from tempfile import mkstemp
+from threading import Thread
+from time import sleep, time
+from wsgiref.simple_server import make_server, WSGIRequestHandler
+
+from django.conf import settings
+
+
+# Simulated work per request in seconds
+DELAY = 0.02
+# The number of client threads making requests
+THREADS = 8
+# The number of requests made for each measurement
+REQUESTS = 400
+FIRST_PORT = 8101
+
+
+class _QuietHandler(WSGIRequestHandler):
+    """Don't log every request.
+    """
+    def log_message(self, *_args):
+        pass
+
+
+def _serve(port):
+    """Run one server until the process is killed.
+    """
+    from django.core.handlers.wsgi import WSGIHandler
+    django = WSGIHandler()
+    def application(environ, start_response):
+        """Add the simulated work to every request.
+        """
+        sleep(DELAY)
+        return django(environ, start_response)
+    make_server('127.0.0.1', port, application,
+        handler_class=_QuietHandler).serve_forever()
+
+
+def _start(count):
+    """Start the server processes and wait for them to accept requests.
+    """
+    from slumber.connector import ua
+    processes = []
+    for port in range(FIRST_PORT, FIRST_PORT + count):
+        process = Process(target=_serve, args=(port,))
+        process.start()
+        processes.append(process)
+    for port in range(FIRST_PORT, FIRST_PORT + count):
+        for _ in xrange(100):
+            try:
+                ua.get('http://127.0.0.1:%s/slumber/' % port)
+                break
+            except Exception:
+                sleep(0.05)
+    return processes
+
+
+def measure(servers):
+    """Return the number of reads per second that the client manages.
+    """
+    from slumber._caches import CLIENT_BACKENDS
+    from slumber.connector import ua
+    from slumber.connector.backends import add_pool
+    processes = _start(servers)
+    try:
+        CLIENT_BACKENDS.clear()
+        primary = add_pool(['http://127.0.0.1:%s/slumber/' % port
+            for port in range(FIRST_PORT, FIRST_PORT + servers)])
+        url = primary + 'slumber_test/Pizza/data/1/?request=%s'
+        def reader(numbers):
+            """Make the requests.
+            """
+            for number in numbers:
+                ua.get(url % number)
+        threads = [Thread(target=reader, args=(range(t, REQUESTS, THREADS),))
+            for t in range(THREADS)]
+        start = time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return REQUESTS / (time() - start)
+    finally:
+        for process in processes:
+            process.terminate()
+            process.join()
+
+
+if __name__ == '__main__':
+    handle, database = mkstemp(suffix='.sqlite')
+    os.close(handle)
+    settings.DATABASES['default']['NAME'] = database
+    try:
+        from django.core.management import call_command
+        call_command('syncdb', interactive=False, verbosity=0)
+        from slumber_test.models import Pizza
+        Pizza(name='Benchmark').save()
+        # Reads only go to the primary when there are no replicas
+        results = [('replicas', 'reads/second')]
+        for replicas in [0, 1, 2, 4]:
+            results.append((replicas, '%.0f' % measure(replicas + 1)))
+        common.report('Read throughput with %s client threads' % THREADS,
+            *results)
+    finally:
+        os.remove(database)
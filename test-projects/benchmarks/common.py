@@ -0,0 +1,29 @@
+"""
+    Shared set up for the Slumber benchmarks. The benchmarks run inside
+    the Django 1.3 test project.
+"""
+import os
+import sys
+from time import time
+
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path[0:0] = [ROOT, os.path.join(ROOT, 'test-projects')]
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django1_3.settings')
+
+
+def timed(function, repeat=1):
+    """Return the average number of seconds a call to the function takes.
+    """
+    start = time()
+    for _ in xrange(repeat):
+        function()
+    return (time() - start) / repeat
+
+
+def report(title, *rows):
+    """Print a simple table of results.
+    """
+    print title
+    for row in rows:
+        print '   ', ' '.join([str(c).rjust(14) for c in row])
@@ -0,0 +1,45 @@
+"""
+    Measures the memory used by the client when it materializes large
+    result sets, for example a long data array.
+"""
+import gc
+import sys
+
+import common
+
+from slumber.connector.dictobject import DictObject
+from slumber.connector.instance import get_instance
+
+
+def _size(obj):
+    """The size of an object including its attribute dictionary.
+    """
+    size = sys.getsizeof(obj)
+    if type(obj).__dictoffset__:
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def materialize(rows):
+    """Build the instance proxies in the same way a data array does and
+    return how many classes and bytes were needed.
+    """
+    model = DictObject(module='slumber_test', name='PizzaPrice')
+    gc.collect()
+    before = len(gc.get_objects())
+    instances = [get_instance(model,
+            'http://localhost:8000/slumber/slumber_test/PizzaPrice/data/%s/'
+                % pk, 'PizzaPrice object')
+        for pk in xrange(rows)]
+    types = set([type(i) for i in instances])
+    size = sum([_size(i) for i in instances]) + \
+        sum([sys.getsizeof(t) for t in types])
+    return len(types), size, len(gc.get_objects()) - before
+
+
+if __name__ == '__main__':
+    results = [('rows', 'classes', 'bytes', 'bytes/row', 'gc objects')]
+    for rows in [100, 1000, 10000, 100000]:
+        types, size, objects = materialize(rows)
+        results.append((rows, types, size, size / rows, objects))
+    common.report('Instance proxy memory', *results)
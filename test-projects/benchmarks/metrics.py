@@ -0,0 +1,44 @@
+"""
+    Measures what recording the metrics adds to each request, both on its
+    own and as part of a whole request through the test client.
+"""
+import common
+
+from django.test.client import Client
+from django.test.utils import setup_test_environment
+from django.db import connection
+
+from slumber.server import metrics
+from slumber.server.signals import operation_performed
+from slumber_test.models import Pizza
+
+
+def main():
+    """Run the benchmark.
+    """
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    pizza = Pizza.objects.create(name='Benchmark')
+    client = Client()
+    url = '/slumber/slumber_test/Pizza/data/%s/' % pizza.pk
+    def request():
+        """Fetch an instance's data.
+        """
+        client.get(url, HTTP_HOST='localhost')
+    def record():
+        """Record one request.
+        """
+        metrics.collect(None, app='slumber_test', model='Pizza',
+            operation='data', method='GET', status=200, duration=0.01,
+            queries=1, size=500)
+    without = common.timed(request, 500)
+    operation_performed.connect(metrics.collect)
+    with_metrics = common.timed(request, 500)
+    common.report('Metrics overhead (microseconds)',
+        ('collect', 'request', 'with metrics'),
+        ('%.1f' % (common.timed(record, 100000) * 1e6),
+            '%.1f' % (without * 1e6), '%.1f' % (with_metrics * 1e6)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+    Measures how long it takes to resolve a Slumber URL as the number of
+    models grows. The old style of one URL pattern per operation is
+    resolved alongside the single dispatch view for comparison.
+"""
+import common
+
+from django.conf.urls.defaults import patterns
+from django.core.urlresolvers import RegexURLResolver
+
+from slumber._caches import EXPOSED_APPS
+from slumber.server.http import view_handler
+from slumber.server.model import DjangoModel
+from slumber.server.views import find_view
+from slumber_test.models import Pizza
+
+
+class _App(object):
+    """A stand in for an application with lots of models.
+    """
+    def __init__(self, path, count):
+        self.name = path.replace('/', '.')
+        self.path = path
+        self.models = {}
+        for number in xrange(count):
+            model = DjangoModel(self, Pizza)
+            model.name = 'Model%s' % number
+            model.path = path + '/' + model.name + '/'
+            self.models[model.name] = model
+
+
+def _pattern_resolver(app):
+    """Build the URL resolver in the way that slumber.urls used to.
+    """
+    urls = {}
+    for model in app.models.values():
+        urls['^(%s)/(%s)/$' % (app.path, model.name)] = \
+            'slumber.server.views.get_model'
+        for op in model.operations():
+            urls['^(%s)/(%s)/%s/%s$' % (app.path, model.name, op.name,
+                op.regex)] = view_handler(op.operation)
+    return RegexURLResolver(r'^/', patterns('', *urls.items()))
+
+
+def measure(count):
+    """Return the resolution times for the two approaches.
+    """
+    app = _App('benchmark', count)
+    exposed, loaded = dict(EXPOSED_APPS), EXPOSED_APPS.loaded
+    EXPOSED_APPS.clear()
+    EXPOSED_APPS[app.path] = app
+    EXPOSED_APPS.loaded = True
+    try:
+        resolver = _pattern_resolver(app)
+        paths = ['benchmark/Model%s/data/1/prices/' % n
+            for n in xrange(0, count, max(1, count / 10))]
+        def old():
+            for path in paths:
+                resolver.resolve('/' + path)
+        def new():
+            for path in paths:
+                assert find_view(path)[0]
+        return common.timed(old, 20) / len(paths), \
+            common.timed(new, 20) / len(paths)
+    finally:
+        EXPOSED_APPS.clear()
+        EXPOSED_APPS.update(exposed)
+        EXPOSED_APPS.loaded = loaded
+
+
+if __name__ == '__main__':
+    results = [('models', 'patterns (us)', 'dispatch (us)')]
+    for count in [1, 10, 100, 500, 1000]:
+        old, new = measure(count)
+        results.append((count, '%.1f' % (old * 1e6), '%.1f' % (new * 1e6)))
+    common.report('URL resolution time per request', *results)
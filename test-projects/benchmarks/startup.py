@@ -0,0 +1,51 @@
+"""
+    Measures how long it takes to import Slumber and to serve the first
+    request. Each measurement is made in a fresh Python process so that
+    nothing is already imported.
+"""
+import os
+import subprocess
+import sys
+
+import common
+
+
+_MEASURE = '''
+import common
+from time import time
+start = time()
+%s
+print time() - start
+'''
+
+_FIRST_REQUEST = '''
+from django.test.client import Client
+from django.test.utils import setup_test_environment
+setup_test_environment()
+start = time()
+response = Client().get('%s', HTTP_HOST='localhost')
+assert response.status_code == 200, response
+'''
+
+
+def measure(code, repeat=5):
+    """Run the code in a new process and return the best time it reported.
+    """
+    times = []
+    for _ in xrange(repeat):
+        output = subprocess.Popen([sys.executable, '-c', _MEASURE % code],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdout=subprocess.PIPE).communicate()[0]
+        times.append(float(output.strip().split()[-1]))
+    return min(times)
+
+
+if __name__ == '__main__':
+    results = [('', 'seconds')]
+    for title, code in [
+            ('import slumber', 'import slumber'),
+            ('import urls', 'import slumber.urls'),
+            ('directory', _FIRST_REQUEST % '/slumber/'),
+            ('model', _FIRST_REQUEST % '/slumber/slumber_test/Pizza/')]:
+        results.append((title, '%.4f' % measure(code)))
+    common.report('Start up time', *results)
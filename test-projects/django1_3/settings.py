@@ -128,6 +128,9 @@ INSTALLED_APPS = (
     # Needed to get the Django nose test runner working
     'django_nose',
 
+    # Slumber's change log
+    'slumber.changes',
+
     # Slumber test applications
     'slumber_test',
     'slumber_test.no_models'